@@ -3,13 +3,15 @@
 import os
 
 import pandas
-import seaborn
-from matplotlib import pyplot
 from pandas.plotting import scatter_matrix
 
 from exper.constant import RAW_DATA_FILE, HOUSING_DATA_URL, PLOT_DIR
 from exper.data_handling import ApiHandler
 from exper.utils import set_plotting_style
+from exper.utils.lazy import lazy_import
+
+seaborn = lazy_import("seaborn")
+pyplot = lazy_import("matplotlib.pyplot")
 
 
 def exploratory_data_analysis(data: pandas.DataFrame) -> None:
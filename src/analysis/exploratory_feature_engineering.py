@@ -4,12 +4,14 @@ import os
 
 import numpy
 import pandas
-import seaborn
-from matplotlib import pyplot
 
 from exper.constant import RAW_DATA_FILE, HOUSING_DATA_URL, PLOT_DIR
 from exper.data_handling import ApiHandler
 from exper.utils import set_plotting_style
+from exper.utils.lazy import lazy_import
+
+seaborn = lazy_import("seaborn")
+pyplot = lazy_import("matplotlib.pyplot")
 
 
 def exploratory_feature_engineering(data: pandas.DataFrame) -> None:
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Shared helpers for the benchmarks.
+
+The pipeline fitted on synthetic districts, see `src.common.synthetic`, so the benchmarks run offline, and the latency
+statistics reported by all of them.
+"""
+import numpy
+
+from sklearn.linear_model import LinearRegression
+
+from src.common.synthetic import make_districts, make_target
+from src.experiments.california_preprocessor import CaliforniaPreprocessor
+from src.microservice.api.inference import InferencePipeline
+
+
+def fit_pipeline(n_rows: int = 2_000, version: str = "synthetic") -> InferencePipeline:
+    """
+    Fit a :class:`CaliforniaPreprocessor` and a linear regression on synthetic districts.
+
+    :param n_rows: number of districts to fit on
+    :type n_rows: int
+
+    :param version: version of the pipeline
+    :type version: str
+
+    :return: fitted pipeline
+    :rtype: InferencePipeline
+    """
+    districts = make_districts(n_rows=n_rows)
+
+    preprocessor = CaliforniaPreprocessor()
+    preprocessor.preprocess(data=districts, transform_data=False)
+    model = LinearRegression().fit(X=preprocessor.transformer.transform(X=districts), y=make_target(districts))
+
+    return InferencePipeline(preprocessor=preprocessor, model=model, version=version)
+
+
+def latency_stats(latencies: list[float] | numpy.ndarray, elapsed: float) -> dict:
+    """
+    Summarize request latencies.
+
+    :param latencies: latency in seconds of every request
+    :type latencies: list[float] | numpy.ndarray
+
+    :param elapsed: wall time in seconds of the whole run
+    :type elapsed: float
+
+    :return: throughput in requests per second and latency percentiles in milliseconds
+    :rtype: dict
+    """
+    latencies = numpy.asarray(latencies) * 1e3
+
+    return {
+        "requests": int(latencies.size),
+        "throughput_rps": round(latencies.size / elapsed, 2),
+        "p50_ms": round(float(numpy.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(numpy.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(numpy.percentile(latencies, 99)), 3),
+        "p999_ms": round(float(numpy.percentile(latencies, 99.9)), 3),
+    }
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the fused preprocessor kernel against the ColumnTransformer of the CaliforniaPreprocessor.
+
+Usage:
+    python -m src.benchmarks.fused_preprocessor --repeat 50
+"""
+import argparse
+import time
+
+import numpy
+
+from src.benchmarks.common import fit_pipeline
+from src.common.synthetic import make_districts
+
+BATCH_SIZES = [1, 64, 10_000]
+
+
+def best_time(funct, repeat: int) -> float:
+    """Best wall time in seconds of `repeat` calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        funct()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("Fused preprocessor benchmark")
+    parser.add_argument("--repeat", type=int, default=50, help="Calls per batch size, the best one is reported")
+    args = parser.parse_args()
+
+    pipeline = fit_pipeline()
+    transformer = pipeline.transformer
+    kernel = pipeline.preprocessor.compile()
+
+    print(f"{'batch size':>10}{'transformer (ms)':>20}{'fused (ms)':>14}{'speedup':>10}{'max abs diff':>16}")
+    for batch_size in BATCH_SIZES:
+        districts = make_districts(n_rows=batch_size, seed=batch_size)
+
+        max_diff = numpy.abs(transformer.transform(X=districts) - kernel.transform(X=districts)).max()
+        sklearn_time = best_time(lambda: transformer.transform(X=districts), repeat=args.repeat)
+        fused_time = best_time(lambda: kernel.transform(X=districts), repeat=args.repeat)
+
+        print(
+            f"{batch_size:>10}{sklearn_time * 1e3:>20.3f}{fused_time * 1e3:>14.3f}"
+            f"{sklearn_time / fused_time:>9.1f}x{max_diff:>16.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Import-time benchmark of the main entry points with `python -X importtime`.
+
+Each entry point is imported in a fresh interpreter and its cumulative import time is compared with its budget. The
+heavy optional dependencies (keras, TensorFlow, matplotlib and seaborn) must not be imported by any of them, they're
+loaded lazily when used. The command exits with status 1 if any budget is exceeded.
+
+Usage:
+    python -m src.benchmarks.import_time --repeat 3
+"""
+import argparse
+import os
+import pathlib
+import subprocess
+import sys
+
+ROOT_DIR = pathlib.Path(__file__).parents[2]
+
+# budget in seconds of the cumulative import time of each entry point
+BUDGETS = {
+    "exper": 3.0,
+    "src.experiments.california_preprocessor": 3.0,
+    "src.microservice.api.endpoint": 3.0,
+    "src.main": 3.0,
+    "pipeline.utils.pipeline": 1.0,
+}
+FORBIDDEN_MODULES = ["keras", "tensorflow", "matplotlib", "seaborn"]
+
+
+def import_time(module: str) -> tuple[float, list[tuple[float, str]], list[str]]:
+    """Import `module` in a fresh interpreter with `-X importtime`.
+
+    Args:
+        module (str): module to import
+
+    Returns:
+        tuple: cumulative import time in seconds, the (self seconds, module) imported and the forbidden modules that
+            were imported
+    """
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(ROOT_DIR / "src"), str(ROOT_DIR)])}
+    code = f"import sys, {module}; print(','.join(m for m in {FORBIDDEN_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+
+    if result.returncode:
+        raise RuntimeError(f"Import of {module} failed:\n{result.stderr[-2000:]}")
+
+    # the entry point and its parent packages are the top-level lines, without indentation
+    parents = {".".join(module.split(".")[: idx + 1]) for idx in range(module.count(".") + 1)}
+    modules, cumulative = [], 0.0
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        modules.append((int(self_us) / 1e6, name.strip()))
+
+        if name.strip() in parents and not name[1:].startswith(" "):
+            cumulative += int(cumulative_us) / 1e6
+
+    return cumulative, modules, [name for name in result.stdout.strip().split(",") if name]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("Import-time benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per entry point, the best one is reported")
+    parser.add_argument("--top", type=int, default=5, help="Slowest modules shown per entry point")
+    args = parser.parse_args()
+
+    failed = False
+
+    print(f"{'entry point':<50}{'import (s)':>12}{'budget (s)':>12}  status")
+    for module, budget in BUDGETS.items():
+        runs = [import_time(module=module) for _ in range(args.repeat)]
+        cumulative, modules, forbidden = min(runs, key=lambda run: run[0])
+
+        status = "ok"
+        if cumulative > budget:
+            status = "OVER BUDGET"
+        if forbidden:
+            status = f"imports {', '.join(forbidden)}"
+        failed = failed or status != "ok"
+
+        print(f"{module:<50}{cumulative:>12.3f}{budget:>12.3f}  {status}")
+        for seconds, name in sorted(modules, reverse=True)[: args.top]:
+            print(f"{'':<4}{name:<46}{seconds:>12.3f}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
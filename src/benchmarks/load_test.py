@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Load test of the prediction service.
+
+Sends a mix of single-row and batch `/predict` requests with synthetic districts, either to the Flask app in-process or
+to a running service, and reports the throughput, latency percentiles and error rate. The report is saved to JSON so
+runs with different batching, cache or worker settings can be compared.
+
+Two arrival models are supported:
+    - closed loop (`--rate 0`): `--concurrency` clients send their next request as soon as they get a response
+    - open loop (`--rate R`): requests arrive at R per second no matter how fast the service answers, and the latency
+      is measured from the scheduled arrival, so a stalled service isn't hidden by fewer requests being sent
+
+Usage:
+    python -m src.benchmarks.load_test --requests 5000 --concurrency 32 --batch-fraction 0.1 --output report.json
+    python -m src.benchmarks.load_test --url http://localhost:80 --rate 500 --duration 30
+"""
+import argparse
+import http.client
+import itertools
+import json
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import numpy
+
+from src.benchmarks.common import fit_pipeline, latency_stats
+from src.common.synthetic import make_districts
+
+# sends one request body and returns its status code
+Sender = Callable[[bytes], int]
+
+
+def make_bodies(n_bodies: int, batch_fraction: float, batch_size: int, seed: int = 42) -> list[tuple[str, bytes]]:
+    """
+    Make the JSON bodies of the requests, a ``batch_fraction`` share of them with ``batch_size`` rows.
+
+    :param n_bodies: number of distinct bodies, they're reused cyclically
+    :type n_bodies: int
+
+    :param batch_fraction: share of batch requests, between 0 and 1
+    :type batch_fraction: float
+
+    :param batch_size: rows of a batch request
+    :type batch_size: int
+
+    :param seed: random seed
+    :type seed: int
+
+    :return: kind of request ("single" or "batch") and its body
+    :rtype: list[tuple[str, bytes]]
+    """
+    rng = numpy.random.default_rng(seed)
+    bodies = []
+
+    for idx in range(n_bodies):
+        kind = "batch" if rng.random() < batch_fraction else "single"
+        rows = make_districts(n_rows=batch_size if kind == "batch" else 1, seed=seed + idx)
+        bodies.append((kind, json.dumps(rows.to_dict(orient="records")).encode()))
+
+    return bodies
+
+
+def in_process_sender(app) -> Sender:
+    """Send the requests to the Flask app with one test client per thread."""
+    local = threading.local()
+
+    def send(body: bytes) -> int:
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+
+        return local.client.post("/predict", data=body, content_type="application/json").status_code
+
+    return send
+
+
+def http_sender(url: str, timeout: float = 30.0) -> Sender:
+    """Send the requests to a running service with one keep-alive connection per thread."""
+    parsed = urlparse(url)
+    local = threading.local()
+
+    def send(body: bytes) -> int:
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+
+        try:
+            local.conn.request("POST", "/predict", body=body, headers={"Content-Type": "application/json"})
+            response = local.conn.getresponse()
+            response.read()
+            return response.status
+
+        except (OSError, http.client.HTTPException):
+            local.conn.close()
+            del local.conn
+            raise
+
+    return send
+
+
+def run_load_test(
+    send: Sender,
+    bodies: list[tuple[str, bytes]],
+    n_requests: int,
+    concurrency: int,
+    rate: float = 0.0,
+    duration: Optional[float] = None,
+) -> dict:
+    """
+    Drive the service and summarize the results.
+
+    :param send: function sending one body and returning the status code
+    :type send: Sender
+
+    :param bodies: bodies sent cyclically, see :func:`make_bodies`
+    :type bodies: list[tuple[str, bytes]]
+
+    :param n_requests: number of requests, ignored if ``duration`` is set
+    :type n_requests: int
+
+    :param concurrency: number of client threads
+    :type concurrency: int
+
+    :param rate: arrival rate in requests per second of an open loop, 0 for a closed loop
+    :type rate: float
+
+    :param duration: seconds to send requests for, instead of a number of requests
+    :type duration: float | None
+
+    :return: overall statistics with the error rate, and statistics per kind of request
+    :rtype: dict
+    """
+    lock = threading.Lock()
+    results: list[tuple[str, float, bool]] = []
+    counter = itertools.count()
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def request(idx: int, scheduled: float) -> None:
+        kind, body = bodies[idx % len(bodies)]
+
+        try:
+            ok = send(body) < 400
+        except Exception:
+            ok = False
+
+        with lock:
+            results.append((kind, time.perf_counter() - scheduled, ok))
+
+    def more(idx: int) -> bool:
+        return time.perf_counter() < deadline if deadline else idx < n_requests
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if rate > 0:
+            # open loop, the latency includes the time queued waiting for a free client
+            idx = 0
+            while more(idx):
+                scheduled = start + idx / rate
+                time.sleep(max(0.0, scheduled - time.perf_counter()))
+                executor.submit(request, idx, scheduled)
+                idx += 1
+
+        else:
+
+            def client() -> None:
+                while True:
+                    idx = next(counter)
+                    if not more(idx):
+                        return
+                    request(idx, time.perf_counter())
+
+            for _ in range(concurrency):
+                executor.submit(client)
+
+    elapsed = time.perf_counter() - start
+
+    return {
+        **summarize(results=results, elapsed=elapsed),
+        "by_kind": {
+            kind: summarize(results=[result for result in results if result[0] == kind], elapsed=elapsed)
+            for kind in sorted({result[0] for result in results})
+        },
+    }
+
+
+def summarize(results: list[tuple[str, float, bool]], elapsed: float) -> dict:
+    """Latency statistics of the successful requests and the error rate of all of them."""
+    latencies = [latency for _, latency, ok in results if ok]
+    errors = len(results) - len(latencies)
+
+    stats = latency_stats(latencies=latencies, elapsed=elapsed) if latencies else {"requests": 0}
+    stats["requests"] = len(results)
+    stats["errors"] = errors
+    stats["error_rate"] = round(errors / len(results), 4) if results else 0.0
+
+    return stats
+
+
+def setup_app(env: str, micro_batching: bool, cache: bool):
+    """Flask app with a pipeline fitted on synthetic districts and the settings of `env`."""
+    from src.microservice.api.config import CONFIGS
+    from src.microservice.api.endpoint import app
+    from src.microservice.api.model_utils import create_admission_controller, create_cache, start_micro_batcher
+
+    app.config.from_object(CONFIGS[env])
+    app.config.update(CACHE_BACKEND="memory" if cache else None)
+
+    pipeline = fit_pipeline()
+    if app.config["COMPILE_PREPROCESSOR"]:
+        pipeline.compile()
+    app.extensions["inference_pipeline"] = pipeline
+
+    create_cache(app=app)
+    create_admission_controller(app=app)
+    if micro_batching:
+        start_micro_batcher(app=app)
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("Load test of the prediction service")
+    parser.add_argument("--url", default=None, help="URL of a running service, by default the app runs in-process")
+    parser.add_argument("--env", default="staging", help="Config of the in-process app, see config.CONFIGS")
+    parser.add_argument("--no-micro-batching", action="store_true", help="Disable the micro-batcher in-process")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the prediction cache in-process")
+    parser.add_argument("--requests", type=int, default=5_000, help="Number of requests")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run instead of --requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of client threads")
+    parser.add_argument("--rate", type=float, default=0.0, help="Open-loop arrivals per second, 0 for closed loop")
+    parser.add_argument("--batch-fraction", type=float, default=0.0, help="Share of batch requests")
+    parser.add_argument("--batch-size", type=int, default=64, help="Rows of a batch request")
+    parser.add_argument("--distinct-bodies", type=int, default=1_000, help="Distinct bodies, fewer hit the cache more")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the synthetic districts")
+    parser.add_argument("--output", default=None, help="JSON file to save the report to")
+    args = parser.parse_args()
+
+    if args.url:
+        send = http_sender(url=args.url)
+    else:
+        app = setup_app(env=args.env, micro_batching=not args.no_micro_batching, cache=not args.no_cache)
+        send = in_process_sender(app=app)
+
+    bodies = make_bodies(
+        n_bodies=args.distinct_bodies, batch_fraction=args.batch_fraction, batch_size=args.batch_size, seed=args.seed
+    )
+    stats = run_load_test(
+        send=send,
+        bodies=bodies,
+        n_requests=args.requests,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        duration=args.duration,
+    )
+
+    report = {"started_at": datetime.now().isoformat(timespec="seconds"), "config": vars(args), "stats": stats}
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the micro-batching of single-row predictions.
+
+Compares the throughput and p99 latency of concurrent single-row requests scored one by one against the same requests
+coalesced by the :class:`MicroBatcher`.
+
+Usage:
+    python -m src.benchmarks.micro_batching --requests 2000 --concurrency 32 --batch-size 32 --wait-ms 5
+"""
+import argparse
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import pandas
+
+from src.benchmarks.common import fit_pipeline, latency_stats
+from src.common.synthetic import make_districts
+from src.microservice.api.batching import MicroBatcher
+
+
+def run(predict: Callable[[pandas.DataFrame], object], rows: list[pandas.DataFrame], concurrency: int) -> dict:
+    """Send every row as one request from `concurrency` client threads."""
+
+    def timed_request(row: pandas.DataFrame) -> float:
+        start = time.perf_counter()
+        predict(row)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(timed_request, rows))
+
+    return latency_stats(latencies=latencies, elapsed=time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("Micro-batching benchmark")
+    parser.add_argument("--requests", type=int, default=2_000, help="Number of single-row requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of concurrent clients")
+    parser.add_argument("--batch-size", type=int, default=32, help="Rows that flush a micro-batch")
+    parser.add_argument("--wait-ms", type=float, default=5.0, help="Flush window in milliseconds")
+    args = parser.parse_args()
+
+    pipeline = fit_pipeline()
+    districts = make_districts(n_rows=args.requests, seed=7)
+    rows = [districts.iloc[[idx]] for idx in range(len(districts))]
+
+    unbatched = run(predict=pipeline.predict, rows=rows, concurrency=args.concurrency)
+
+    batcher = MicroBatcher(predict=pipeline.predict, max_batch_size=args.batch_size, max_wait_ms=args.wait_ms).start()
+    batched = run(predict=batcher.predict, rows=rows, concurrency=args.concurrency)
+    batcher.stop()
+
+    print(f"{'mode':<12}{'throughput (req/s)':>20}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for mode, stats in (("unbatched", unbatched), ("batched", batched)):
+        print(f"{mode:<12}{stats['throughput_rps']:>20}{stats['p50_ms']:>12}{stats['p99_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main()
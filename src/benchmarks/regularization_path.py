@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the warm-started regularization path search against the brute-force grid of `modelling`.
+
+Both search the same 11 `l1_ratio` x 3 `C` grid over 5 folds on synthetic districts labelled by whether their
+house value is over the median. The CPU time only counts the benchmark process, so both run with one job by default.
+
+Usage:
+    python -m src.benchmarks.regularization_path --rows 5000
+"""
+import argparse
+import time
+import warnings
+
+import numpy
+
+from src.common.synthetic import make_districts, make_target
+from src.pipeline.build_model import get_search
+from src.pipeline.utils.data_transformations import get_preprocessor
+
+
+def make_labelled_districts(n_rows: int, seed: int = 42):
+    """Make synthetic districts and a noisy binary target of whether their house value is over the median."""
+    districts = make_districts(n_rows=n_rows, seed=seed)
+    value = make_target(districts) * numpy.random.default_rng(seed).lognormal(sigma=0.3, size=n_rows)
+
+    return districts, (value > value.median()).astype(int).rename("target")
+
+
+def run_search(search: str, districts, target, n_jobs: int) -> dict:
+    """Fit a search and get its wall time, CPU time and best grid point."""
+    preprocessor = get_preprocessor(
+        categorical_columns=districts.select_dtypes(include=["O", "object"]).columns.tolist(),
+        numerical_columns=districts.select_dtypes(include="number").columns.tolist(),
+    ).set_params(n_jobs=None, verbose=False, numerical__verbose=False, categorical__verbose=False)
+    model = get_search(preprocessor=preprocessor, search=search)
+
+    if search == "grid":
+        model.set_params(verbose=False, classifier__n_jobs=n_jobs, classifier__verbose=0)
+        report = model["classifier"]
+    else:
+        model.set_params(n_jobs=n_jobs)
+        report = model
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    with warnings.catch_warnings():
+        # deprecated parameters of the LogisticRegression of the grid
+        warnings.simplefilter("ignore", category=FutureWarning)
+        model.fit(X=districts, y=target)
+
+    return {
+        "wall_seconds": time.perf_counter() - wall,
+        "cpu_seconds": time.process_time() - cpu,
+        "best_params": {key: report.best_params_[key] for key in ("C", "l1_ratio")},
+        "best_score": report.best_score_,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("Regularization path search benchmark")
+    parser.add_argument("--rows", type=int, default=5_000, help="Synthetic districts to search on")
+    parser.add_argument("--n-jobs", type=int, default=1, help="Jobs of both searches")
+    args = parser.parse_args()
+
+    districts, target = make_labelled_districts(n_rows=args.rows)
+
+    print(f"{'search':>8}{'wall (s)':>12}{'cpu (s)':>12}{'best C':>10}{'best l1_ratio':>16}{'best roc_auc':>16}")
+    results = {}
+    for search in ["grid", "path"]:
+        results[search] = result = run_search(search=search, districts=districts, target=target, n_jobs=args.n_jobs)
+        print(
+            f"{search:>8}{result['wall_seconds']:>12.3f}{result['cpu_seconds']:>12.3f}"
+            f"{result['best_params']['C']:>10}{result['best_params']['l1_ratio']:>16}{result['best_score']:>16.5f}"
+        )
+
+    print(f"\nCPU time speedup {results['grid']['cpu_seconds'] / results['path']['cpu_seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Synthetic district rows shaped like the California Census data, so the tests and benchmarks run offline."""
+import numpy
+import pandas
+
+from exper.constant import OCEAN_PROXIMITY
+
+
+def make_districts(n_rows: int, seed: int = 42) -> pandas.DataFrame:
+    """Make synthetic district rows with the schema of the California Census data.
+
+    Args:
+        n_rows (int): number of districts
+        seed (int, optional): random seed. Defaults to 42.
+
+    Returns:
+        pandas.DataFrame: districts without the target variable
+    """
+    rng = numpy.random.default_rng(seed)
+    households = rng.integers(50, 2000, n_rows).astype(float)
+    total_rooms = households * rng.uniform(3, 8, n_rows)
+
+    return pandas.DataFrame(
+        {
+            "longitude": rng.uniform(-124.3, -114.3, n_rows),
+            "latitude": rng.uniform(32.5, 42.0, n_rows),
+            "housing_median_age": rng.integers(1, 52, n_rows).astype(float),
+            "total_rooms": total_rooms,
+            "total_bedrooms": total_rooms * rng.uniform(0.15, 0.3, n_rows),
+            "population": households * rng.uniform(2, 4, n_rows),
+            "households": households,
+            "median_income": rng.uniform(0.5, 15.0, n_rows),
+            "ocean_proximity": rng.choice(OCEAN_PROXIMITY, n_rows),
+        }
+    ).astype({"ocean_proximity": object})
+
+
+def make_target(districts: pandas.DataFrame) -> pandas.Series:
+    """Make a synthetic `median_house_value` for the districts."""
+    return (districts["median_income"] * 40_000 + 50_000).rename("median_house_value")
@@ -10,3 +10,5 @@ DATA_DIR = ARTIFACT_DIR / "data"
 MODEL_DIR = ARTIFACT_DIR / "models"
 PLOT_DIR = ARTIFACT_DIR / "plots"
 RAW_DATA_FILE = DATA_DIR / "california_census.csv"
+# categories of ocean_proximity in the sorted order of the fitted OneHotEncoder, the one-hot layout follows it
+OCEAN_PROXIMITY = ["<1H OCEAN", "INLAND", "ISLAND", "NEAR BAY", "NEAR OCEAN"]
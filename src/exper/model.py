@@ -1,16 +1,18 @@
 # -*- coding: utf-8 -*-
 """Model definition for experiments."""
 
-from typing import Union, Type, Dict, List
+from typing import TYPE_CHECKING, Union, Type, Dict, List
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 
-
-import keras
 import numpy
 import pandas
 import sklearn
 
+if TYPE_CHECKING:
+    # only for the annotations, importing keras loads TensorFlow
+    import keras
+
 
 @dataclass
 class Metrics:
@@ -35,7 +37,7 @@ class Model(ABC):
 
     name: str = ""
 
-    def __init__(self, model: Union[Type[sklearn.base], Type[keras.Model]]):
+    def __init__(self, model: Union[Type[sklearn.base], Type["keras.Model"]]):
         """Initialize the model.
 
         Args:
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Lazy imports of heavy optional dependencies.
+
+keras (and with it TensorFlow), matplotlib, seaborn and scipy take seconds and hundreds of MB to import. Modules that
+only need them in some functions bind them with `lazy_import` at module level, so the import happens on the first
+attribute access instead of when the module is imported.
+"""
+import importlib
+import sys
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Placeholder of a module imported on the first access to one of its attributes.
+
+    Args:
+        name (str): absolute name of the module, e.g. "matplotlib.pyplot"
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lock"] = threading.Lock()
+        self.__dict__["_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        """Import the module the first time it's needed."""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self.__dict__["_module"] = importlib.import_module(self.__name__)
+
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self) -> list[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Module `name`, imported on the first access to one of its attributes.
+
+    If the module was already imported, it's returned as is.
+
+    Args:
+        name (str): absolute name of the module, e.g. "keras" or "scipy.stats"
+
+    Returns:
+        types.ModuleType: the module or a `LazyModule` placeholder
+    """
+    return sys.modules.get(name) or LazyModule(name)
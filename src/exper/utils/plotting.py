@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 """Plot utils."""
-import matplotlib
-import seaborn
+from .lazy import lazy_import
+
+matplotlib = lazy_import("matplotlib")
+seaborn = lazy_import("seaborn")
 
 
 def set_plotting_style() -> None:
@@ -106,6 +106,17 @@ class CaliforniaPreprocessor(Preprocessor):
 
         return data
 
+    def compile(self):
+        """Compile the fitted transformer into a fused NumPy kernel with the same output.
+
+        Returns:
+            FusedPreprocessor: kernel to transform the data faster than `transformer.transform`
+        """
+        # imported here because fused_preprocessor depends on this module
+        from .fused_preprocessor import compile_preprocessor
+
+        return compile_preprocessor(transformer=self.transformer)
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""Fused NumPy kernel compiled from a fitted CaliforniaPreprocessor transformer.
+
+The `ColumnTransformer` of the `CaliforniaPreprocessor` runs every branch on its own: column selection, imputation,
+the function and the scaling, each one allocating intermediate frames. For small batches that overhead costs far more
+than the arithmetic itself. `compile_preprocessor` reads the fitted parameters (medians, means, scales, centroids and
+categories) and emits a `FusedPreprocessor` that computes the same output on a contiguous float array, written in
+place into an output buffer the caller can reuse across calls.
+"""
+from dataclasses import dataclass
+
+import numpy
+import pandas
+
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+from exper import ClusterSimilarityEncoder
+from .california_preprocessor import columns_ratio
+
+
+@dataclass
+class NumericBlock:
+    """Numerical branch of the fused kernel.
+
+    Args:
+        kind (str): operation of the branch, one of "ratio", "log", "identity" or "rbf"
+        slots (slice): columns of the gathered input used by the branch
+        output (slice): columns of the output written by the branch
+        centers (numpy.ndarray, optional): cluster centroids of a "rbf" branch
+        gamma (float, optional): gamma of a "rbf" branch
+    """
+
+    kind: str
+    slots: slice
+    output: slice
+    centers: numpy.ndarray | None = None
+    gamma: float = 1.0
+
+
+@dataclass
+class CategoricalBlock:
+    """Categorical branch of the fused kernel, a one-hot encoding by table lookup.
+
+    Args:
+        column (str): input column
+        categories (numpy.ndarray): categories learned by the encoder
+        fill_code (int): code of the value imputed to missing categories, -1 if they aren't imputed
+        output (slice): columns of the output written by the branch
+    """
+
+    column: str
+    categories: numpy.ndarray
+    fill_code: int
+    output: slice
+
+    def __post_init__(self):
+        # the last row is the encoding of unknown categories, all zeros as with `handle_unknown="ignore"`
+        self.table = numpy.vstack([numpy.eye(len(self.categories)), numpy.zeros((1, len(self.categories)))])
+        self.lookup = {category: code for code, category in enumerate(self.categories)}
+
+    def encode(self, values: pandas.Series | numpy.ndarray) -> numpy.ndarray:
+        """Map the categories to their row of the lookup table."""
+        unknown = len(self.categories)
+        # as the SimpleImputer, only NaN values are imputed, None is encoded as an unknown category
+        missing = self.fill_code if self.fill_code >= 0 else unknown
+
+        return numpy.fromiter(
+            (self.lookup.get(value, missing if value != value else unknown) for value in values),
+            dtype=numpy.intp,
+            count=len(values),
+        )
+
+
+class FusedPreprocessor:
+    """Single-pass kernel equivalent to a fitted `ColumnTransformer` of the `CaliforniaPreprocessor`.
+
+    Create it with `compile_preprocessor`.
+
+    Attributes:
+        numerical_columns (list[str]): order of the columns of the float input array
+        feature_names_out (numpy.ndarray): names of the output features, the same as the compiled transformer
+    """
+
+    def __init__(
+        self,
+        numerical_columns: list[str],
+        gather: numpy.ndarray,
+        fill: numpy.ndarray,
+        numeric_blocks: list[NumericBlock],
+        categorical_blocks: list[CategoricalBlock],
+        offset: numpy.ndarray,
+        scale: numpy.ndarray,
+        feature_names_out: numpy.ndarray,
+    ):
+        self.numerical_columns = numerical_columns
+        self.gather = gather
+        self.fill = fill
+        self.impute = ~numpy.isnan(fill)
+        self.numeric_blocks = numeric_blocks
+        self.categorical_blocks = categorical_blocks
+        self.offset = offset
+        self.inv_scale = 1.0 / scale
+        self.feature_names_out = feature_names_out
+
+    @property
+    def n_features_out(self) -> int:
+        return self.offset.size
+
+    def transform_array(
+        self, x: numpy.ndarray, codes: list[numpy.ndarray], out: numpy.ndarray | None = None
+    ) -> numpy.ndarray:
+        """Transform a contiguous float array.
+
+        Args:
+            x (numpy.ndarray): float64 array with the `numerical_columns`
+            codes (list[numpy.ndarray]): encoded categories per categorical branch, see `CategoricalBlock.encode`
+            out (numpy.ndarray, optional): output array of shape (n_rows, n_features_out), e.g. a buffer a
+                long-lived thread reuses across calls. By default, a new array is allocated.
+
+        Returns:
+            numpy.ndarray: transformed features, `out` if it's given
+        """
+        n_rows = x.shape[0]
+        out = numpy.empty((n_rows, self.n_features_out)) if out is None else out
+        gathered = numpy.empty((n_rows, self.gather.size))
+
+        numpy.take(x, self.gather, axis=1, out=gathered)
+        numpy.copyto(gathered, self.fill, where=numpy.isnan(gathered) & self.impute)
+
+        for block in self.numeric_blocks:
+            values = gathered[:, block.slots]
+
+            if block.kind == "ratio":
+                numpy.divide(values[:, 0], values[:, 1], out=out[:, block.output.start])
+
+            elif block.kind == "log":
+                numpy.log(values, out=out[:, block.output])
+
+            elif block.kind == "identity":
+                out[:, block.output] = values
+
+            else:
+                if numpy.isnan(values).any():
+                    # as sklearn's rbf_kernel, the coordinates aren't imputed
+                    raise ValueError("Input contains NaN.")
+
+                # squared euclidean distances to the centroids as sklearn's rbf_kernel
+                distances = numpy.einsum("ij,ij->i", values, values)[:, None] - 2.0 * values @ block.centers.T
+                distances += numpy.einsum("ij,ij->i", block.centers, block.centers)[None, :]
+                numpy.maximum(distances, 0.0, out=distances)
+                numpy.multiply(distances, -block.gamma, out=out[:, block.output])
+                numpy.exp(out[:, block.output], out=out[:, block.output])
+
+        numpy.subtract(out, self.offset, out=out)
+        numpy.multiply(out, self.inv_scale, out=out)
+
+        for block, block_codes in zip(self.categorical_blocks, codes):
+            numpy.take(block.table, block_codes, axis=0, out=out[:, block.output])
+
+        return out
+
+    def transform(self, X: pandas.DataFrame, out: numpy.ndarray | None = None) -> numpy.ndarray:
+        """Transform district rows, equivalent to the `transform` of the compiled `ColumnTransformer`.
+
+        Args:
+            X (pandas.DataFrame): district rows
+            out (numpy.ndarray, optional): output array, see `transform_array`
+
+        Returns:
+            numpy.ndarray: transformed features
+        """
+        x = numpy.empty((len(X), len(self.numerical_columns)))
+        # column by column is faster than converting the selected frame
+        for idx, col in enumerate(self.numerical_columns):
+            x[:, idx] = X[col].to_numpy()
+
+        codes = [block.encode(X[block.column].to_numpy()) for block in self.categorical_blocks]
+
+        return self.transform_array(x=x, codes=codes, out=out)
+
+    def get_feature_names_out(self) -> numpy.ndarray:
+        return self.feature_names_out
+
+
+def _split_pipeline(estimator) -> tuple[SimpleImputer | None, list, StandardScaler | None]:
+    """Split a branch in its optional imputer, the steps in between and its optional scaler."""
+    if estimator == "passthrough":
+        return None, [], None
+
+    steps = [step for _, step in estimator.steps] if isinstance(estimator, Pipeline) else [estimator]
+
+    imputer = steps.pop(0) if steps and isinstance(steps[0], SimpleImputer) else None
+    scaler = steps.pop() if steps and isinstance(steps[-1], StandardScaler) else None
+
+    return imputer, steps, scaler
+
+
+def _numeric_kind(steps: list) -> str:
+    """Operation of the steps between the imputer and the scaler of a numerical branch."""
+    if not steps:
+        return "identity"
+
+    if len(steps) == 1 and isinstance(steps[0], FunctionTransformer):
+        if steps[0].func is columns_ratio:
+            return "ratio"
+
+        if steps[0].func is numpy.log:
+            return "log"
+
+    if len(steps) == 1 and isinstance(steps[0], ClusterSimilarityEncoder):
+        return "rbf"
+
+    raise ValueError(f"Steps {steps} can't be compiled into the fused kernel")
+
+
+def compile_preprocessor(transformer: ColumnTransformer) -> FusedPreprocessor:
+    """Compile a fitted `ColumnTransformer` of the `CaliforniaPreprocessor` into a `FusedPreprocessor`.
+
+    Supported branches are pipelines made of an optional `SimpleImputer`, one of the ratio or log
+    `FunctionTransformer` or nothing, and an optional `StandardScaler`, the `ClusterSimilarityEncoder`, and a
+    `SimpleImputer` followed by a `OneHotEncoder` with `handle_unknown="ignore"`.
+
+    Args:
+        transformer (sklearn.compose.ColumnTransformer): fitted transformer, e.g. `CaliforniaPreprocessor.transformer`
+
+    Raises:
+        ValueError: if a branch has steps that can't be compiled
+
+    Returns:
+        FusedPreprocessor: kernel with the same output as `transformer.transform`
+    """
+    names_in = list(transformer.feature_names_in_)
+    feature_names_out = transformer.get_feature_names_out()
+    n_features_out = len(feature_names_out)
+
+    gather, fill = [], []
+    numeric_blocks, categorical_blocks = [], []
+    offset, scale = numpy.zeros(n_features_out), numpy.ones(n_features_out)
+    numerical_columns: list[str] = []
+
+    for name, estimator, columns in transformer.transformers_:
+        output = transformer.output_indices_[name]
+
+        if estimator == "drop" or output.start == output.stop:
+            continue
+
+        columns = [names_in[col] if isinstance(col, (int, numpy.integer)) else col for col in columns]
+        imputer, steps, scaler = _split_pipeline(estimator=estimator)
+
+        if len(steps) == 1 and isinstance(steps[0], OneHotEncoder):
+            encoder = steps[0]
+            if encoder.drop is not None or encoder.handle_unknown != "ignore" or len(columns) != 1:
+                raise ValueError(f"OneHotEncoder of branch {name} can't be compiled into the fused kernel")
+
+            categories = encoder.categories_[0]
+            fill_code = -1
+            if imputer is not None:
+                fill_code = int(numpy.flatnonzero(categories == imputer.statistics_[0])[0])
+
+            categorical_blocks.append(
+                CategoricalBlock(column=columns[0], categories=categories, fill_code=fill_code, output=output)
+            )
+            continue
+
+        kind = _numeric_kind(steps=steps)
+
+        for col in columns:
+            if col not in numerical_columns:
+                numerical_columns.append(col)
+
+        slots = slice(len(gather), len(gather) + len(columns))
+        gather.extend(numerical_columns.index(col) for col in columns)
+        fill.extend(imputer.statistics_ if imputer is not None else [numpy.nan] * len(columns))
+
+        block = NumericBlock(kind=kind, slots=slots, output=output)
+        if kind == "rbf":
+            block.centers = numpy.ascontiguousarray(steps[0]._kmeans.cluster_centers_, dtype=numpy.float64)
+            block.gamma = steps[0].gamma
+        numeric_blocks.append(block)
+
+        if scaler is not None:
+            if scaler.with_mean:
+                offset[output] = scaler.mean_
+            if scaler.with_std:
+                scale[output] = scaler.scale_
+
+    return FusedPreprocessor(
+        numerical_columns=numerical_columns,
+        gather=numpy.asarray(gather, dtype=numpy.intp),
+        fill=numpy.asarray(fill, dtype=numpy.float64),
+        numeric_blocks=numeric_blocks,
+        categorical_blocks=categorical_blocks,
+        offset=offset,
+        scale=scale,
+        feature_names_out=feature_names_out,
+    )
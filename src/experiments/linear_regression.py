@@ -3,9 +3,8 @@
 import os
 import warnings
 from copy import copy
-from typing import Union, Type
+from typing import TYPE_CHECKING, Union, Type
 
-import keras
 import numpy
 import pandas
 import sklearn
@@ -15,6 +14,9 @@ from sklearn.model_selection import validation_curve
 
 from exper import Model
 
+if TYPE_CHECKING:
+    import keras
+
 
 class LinearRegress(Model):
     """Linear Regression Model for experimentation.
@@ -26,7 +28,7 @@ class LinearRegress(Model):
 
     name = "Linear Regression"
 
-    def __init__(self, model: Union[Type[sklearn.base], Type[keras.Model]]):
+    def __init__(self, model: Union[Type[sklearn.base], Type["keras.Model"]]):
         """Initialize the model.
 
         Args:
@@ -4,15 +4,17 @@ import os
 from typing import Type
 
 import numpy
-from scipy import stats
-from matplotlib import pyplot
 
 from exper import Experiment, Preprocessor, Model
+from exper.utils.lazy import lazy_import
 from exper.utils.plotting import set_plotting_style
 from exper.constant import HOUSING_DATA_URL, RAW_DATA_FILE, target, PLOT_DIR
 from exper.data_handling import ApiHandler, DataHandler
 from .california_preprocessor import CaliforniaPreprocessor
 
+stats = lazy_import("scipy.stats")
+pyplot = lazy_import("matplotlib.pyplot")
+
 
 class LRvsNNExperiment(Experiment):
 
@@ -3,7 +3,6 @@
 from copy import copy
 from typing import Union, Type
 
-import keras
 import numpy
 import pandas
 import sklearn
@@ -11,6 +10,9 @@ import sklearn
 from sklearn.model_selection import train_test_split
 
 from exper import Model
+from exper.utils.lazy import lazy_import
+
+keras = lazy_import("keras")
 
 
 class NeuralNetwork(Model):
@@ -23,7 +25,7 @@ class NeuralNetwork(Model):
 
     name = "Neural Network"
 
-    def __init__(self, model: Union[Type[sklearn.base], Type[keras.Model]]):
+    def __init__(self, model: Union[Type[sklearn.base], Type["keras.Model"]]):
         """Initialize the model.
 
         Args:
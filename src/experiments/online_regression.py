@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""Online SGD Regression Exper Model, trained incrementally with `partial_fit` over chunks of rows."""
+from typing import Iterable, Optional, Union
+
+import numpy
+import pandas
+
+from sklearn.linear_model import SGDRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from exper import Model, Preprocessor
+from exper.constant import OCEAN_PROXIMITY
+
+# (numerator, denominator) of the combined features of the CaliforniaPreprocessor
+RATIOS = {
+    "bedrooms_ratio": ("total_bedrooms", "total_rooms"),
+    "rooms_per_house": ("total_rooms", "households"),
+    "people_per_house": ("population", "households"),
+}
+LOG_COLUMNS = ["total_bedrooms", "total_rooms", "population", "households", "median_income"]
+
+METRICS = {
+    "mse": mean_squared_error,
+    "rmse": lambda y_true, y_pred: numpy.sqrt(mean_squared_error(y_true, y_pred)),
+    "mae": mean_absolute_error,
+}
+
+
+class OnlinePreprocessor(Preprocessor):
+    """Preprocessor of the California districts whose statistics are updated chunk by chunk.
+
+    The numerical features are the ones of the CaliforniaPreprocessor but the geospatial clusters: the ratios of the
+    combined features, the log of the skewed ones and the rest as they are, all standardized with the running mean
+    and variance of the chunks seen so far. Missing values are imputed with that running mean. The categories are
+    one-hot encoded with a fixed vocabulary, so the number of features never changes between chunks, and unknown
+    categories are all zeros.
+
+    Args:
+        categories (dict[str, list[str]], optional): vocabulary of each categorical column. Defaults to the one of
+            `ocean_proximity`.
+    """
+
+    def __init__(self, categories: Optional[dict[str, list[str]]] = None):
+        self.categories = categories if categories is not None else {"ocean_proximity": OCEAN_PROXIMITY}
+        self.scaler = StandardScaler()
+        self.numerical_columns: list[str] = []
+
+    def _numerical_features(self, data: pandas.DataFrame) -> pandas.DataFrame:
+        """Make the ratio and log features and keep the other numerical columns, not scaled yet."""
+        features = {name: data[num] / data[den] for name, (num, den) in RATIOS.items()}
+        features.update({f"log_{col}": numpy.log(data[col]) for col in LOG_COLUMNS})
+
+        remainder = data.drop(columns=[*LOG_COLUMNS, *self.categories]).select_dtypes(include="number")
+        features.update({col: remainder[col] for col in remainder.columns})
+
+        return pandas.DataFrame(features).replace([numpy.inf, -numpy.inf], numpy.nan)
+
+    def partial_fit(self, data: pandas.DataFrame) -> "OnlinePreprocessor":
+        """Update the running statistics with a chunk of rows.
+
+        Args:
+            data (pandas.DataFrame): chunk of districts without the target variable
+
+        Returns:
+            OnlinePreprocessor: itself
+        """
+        numerical = self._numerical_features(data=data)
+
+        if not self.numerical_columns:
+            self.numerical_columns = numerical.columns.tolist()
+
+        # the missing values are ignored by the running mean and variance
+        self.scaler.partial_fit(X=numerical[self.numerical_columns].to_numpy(dtype=numpy.float64))
+
+        return self
+
+    def transform(self, data: pandas.DataFrame) -> numpy.ndarray:
+        """Transform a chunk of rows with the statistics seen so far.
+
+        Args:
+            data (pandas.DataFrame): chunk of districts without the target variable
+
+        Returns:
+            numpy.ndarray: scaled numerical features followed by the one-hot encoded categories
+        """
+        numerical = self.scaler.transform(
+            X=self._numerical_features(data=data)[self.numerical_columns].to_numpy(dtype=numpy.float64)
+        )
+        # the running mean is 0 once scaled
+        numerical = numpy.nan_to_num(numerical, nan=0.0)
+
+        one_hot = [
+            (data[col].to_numpy()[:, None] == numpy.asarray(vocabulary, dtype=object)).astype(numpy.float64)
+            for col, vocabulary in self.categories.items()
+        ]
+
+        return numpy.hstack([numerical, *one_hot])
+
+    def get_feature_names_out(self) -> list[str]:
+        """Get the names of the transformed features."""
+        return self.numerical_columns + [
+            f"{col}_{category}" for col, vocabulary in self.categories.items() for category in vocabulary
+        ]
+
+    def preprocess(self, data: pandas.DataFrame, transform_data: bool = True) -> pandas.DataFrame:
+        """Preprocess the data
+
+        Args:
+            data (pandas.DataFrame): Data to be preprocessed
+            transform_data (optional, bool): By default False. If true the data will preprocess. Otherwise, it won't.
+
+        Returns:
+            pandas.DataFrame: data preprocessed and transformed if transform_data is True
+        """
+        self.partial_fit(data=data)
+
+        if transform_data:
+            data = pandas.DataFrame(data=self.transform(data=data), columns=self.get_feature_names_out())
+
+        return data
+
+
+class OnlineRegress(Model):
+    """Online SGD Regression Model for experimentation.
+
+    The preprocessor and the regressor are updated with each chunk of rows, so new districts are folded into the
+    model without a full retrain and the whole data is never in memory. The target is standardized with its running
+    mean and variance too, SGD diverges with the scale of the house values.
+
+    Attributes:
+        model (sklearn.linear_model.SGDRegressor): model object
+        preprocessor (OnlinePreprocessor): preprocessor updated with the same chunks as the model
+        metrics (Metrics): metrics per epoch during training
+    """
+
+    name = "Online SGD Regression"
+
+    def __init__(self, model: Optional[SGDRegressor] = None, preprocessor: Optional[OnlinePreprocessor] = None):
+        """Initialize the model.
+
+        Args:
+            model (sklearn.linear_model.SGDRegressor, optional): regressor with `partial_fit`. Defaults to an
+                SGDRegressor with an inverse scaling learning rate.
+            preprocessor (OnlinePreprocessor, optional): preprocessor of the features. Defaults to a new one.
+        """
+        super().__init__(model if model is not None else SGDRegressor(eta0=0.01, random_state=42))
+        self.preprocessor = preprocessor if preprocessor is not None else OnlinePreprocessor()
+        self.target_scaler = StandardScaler()
+        self.n_rows_seen = 0
+
+    def partial_fit(self, x: pandas.DataFrame, y: Union[pandas.Series, numpy.ndarray]) -> "OnlineRegress":
+        """Fold a chunk of rows into the preprocessor and the model.
+
+        Args:
+            x (pandas.DataFrame): chunk of districts
+            y (pandas.Series | numpy.ndarray): target of the chunk
+
+        Returns:
+            OnlineRegress: itself
+        """
+        y = numpy.asarray(y, dtype=numpy.float64).reshape(-1, 1)
+
+        self.preprocessor.partial_fit(data=x)
+        self.target_scaler.partial_fit(X=y)
+
+        self.model.partial_fit(X=self.preprocessor.transform(data=x), y=self.target_scaler.transform(X=y).ravel())
+        self.n_rows_seen += len(x)
+
+        return self
+
+    def fit_chunks(self, chunks: Iterable[pandas.DataFrame], target: str) -> "OnlineRegress":
+        """Fold every chunk of an iterator into the model, e.g. the chunks of `iter_artifact_chunks`.
+
+        Args:
+            chunks (Iterable[pandas.DataFrame]): chunks of districts with the target variable
+            target (str): name of the target variable
+
+        Returns:
+            OnlineRegress: itself
+        """
+        for chunk in chunks:
+            chunk = chunk.dropna(subset=[target])
+            if len(chunk):
+                self.partial_fit(x=chunk.drop(columns=target), y=chunk[target])
+
+        return self
+
+    def predict(self, x: pandas.DataFrame) -> numpy.ndarray:
+        """Predict the target of the districts.
+
+        Args:
+            x (pandas.DataFrame): districts
+
+        Returns:
+            numpy.ndarray: predictions in the scale of the target
+        """
+        predictions = self.model.predict(X=self.preprocessor.transform(data=x))
+
+        return self.target_scaler.inverse_transform(X=predictions.reshape(-1, 1)).ravel()
+
+    def fit(
+        self,
+        x: numpy.ndarray | pandas.DataFrame | pandas.Series,
+        y: numpy.ndarray | pandas.DataFrame | pandas.Series,
+        param_range: list | numpy.ndarray,
+        param: str,
+        eval_metrics: str | list[str],
+        test_size: float = 0.3,
+        chunk_size: int = 1_000,
+    ) -> None:
+        """Train the model streaming the train set in chunks, once per epoch, and gather the metrics of each epoch.
+
+        The first epoch folds the chunks into the preprocessor and target statistics too, the next ones only into the
+        model, with the train set transformed once with the final statistics, so the rows are counted once.
+
+        Args:
+            x (numpy.ndarray | pandas.DataFrame | pandas.Series): input features, the raw districts
+            y (numpy.ndarray | pandas.DataFrame | pandas.Series): target variable
+            param_range (list | numpy.ndarray): epochs, the last one is the number of passes over the train set
+            param (str): parameter to vary in the range `param_range`, only "epochs" or "iterations"
+            eval_metrics (str | list[str]): metrics to calculate the performance of the model
+            test_size (optional, float): By default 0.3. Percentage of data to be used for the test set.
+                0 > test_size > 1.
+            chunk_size (optional, int): By default 1000. Rows per call to `partial_fit`.
+        """
+        self.param_range = param_range
+        self.eval_metrics = [eval_metrics] if isinstance(eval_metrics, str) else eval_metrics
+        self.param = param
+
+        if param not in ("epochs", "iterations"):
+            raise ValueError(f"Invalid param {param} for an online model, valid values are ['epochs', 'iterations']")
+
+        x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=test_size, random_state=42)
+        self.metrics.train = {metric: [] for metric in self.eval_metrics}
+        self.metrics.test = {metric: [] for metric in self.eval_metrics}
+
+        print(f"\nTraining {self.name} model and gather metrics for each of {self.param} ...")
+        features, target = None, None
+        for epoch in range(int(self.param_range[-1])):
+            if epoch == 0:
+                for start in range(0, len(x_train), chunk_size):
+                    self.partial_fit(
+                        x=x_train.iloc[start : start + chunk_size], y=y_train.iloc[start : start + chunk_size]
+                    )
+
+                features = self.preprocessor.transform(data=x_train)
+                y_column = numpy.asarray(y_train, dtype=numpy.float64).reshape(-1, 1)
+                target = self.target_scaler.transform(X=y_column).ravel()
+            else:
+                for start in range(0, len(features), chunk_size):
+                    self.model.partial_fit(X=features[start : start + chunk_size], y=target[start : start + chunk_size])
+
+            train_pred, test_pred = self.predict(x=x_train), self.predict(x=x_test)
+            for metric in self.eval_metrics:
+                self.metrics.train[metric].append(METRICS[metric](y_train, train_pred))
+                self.metrics.test[metric].append(METRICS[metric](y_test, test_pred))
@@ -4,7 +4,6 @@
 
 # -*- coding: utf-8 -*-
 """Main script with the solution of the exercises."""
-import keras
 import numpy
 import pandas
 
@@ -12,6 +11,7 @@ from sklearn.linear_model import Lasso
 
 from exper.constant import RAW_DATA_FILE, HOUSING_DATA_URL
 from exper.data_handling import ApiHandler
+from exper.utils.lazy import lazy_import
 
 from src.analysis.exploratory_data_analysis import exploratory_data_analysis
 from src.analysis.exploratory_feature_engineering import exploratory_feature_engineering
@@ -21,6 +21,8 @@ from src.experiments.lr_vs_nn_experiment import LRvsNNExperiment
 from src.experiments.linear_regression import LinearRegress
 from src.experiments.neural_network import NeuralNetwork
 
+keras = lazy_import("keras")
+
 # to show all columns without cuts
 pandas.set_option("display.max_columns", None)
 
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.admission
+   :synopsis: Admission control of the prediction requests, so an overloaded worker sheds load early instead of
+              queueing until the clients time out.
+
+              At most ``max_in_flight`` requests are handled at once and at most ``max_queued`` wait for a slot.
+              The rest are rejected at once with 429, and requests whose deadline passes while they wait, or before
+              their rows are scored, are dropped with 503. Both answers carry a ``Retry-After`` header.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from src.microservice.api.metrics import REGISTRY
+
+REJECTIONS = {
+    reason: REGISTRY.counter("prediction_rejections_total", "Requests shed by admission control", reason=reason)
+    for reason in ("overloaded", "deadline")
+}
+
+
+class Rejected(Exception):
+    """
+    Request shed by admission control.
+
+    :param reason: ``"overloaded"`` if the queue is full or ``"deadline"`` if the deadline passed
+    :type reason: str
+
+    :param message: description of the rejection returned to the client
+    :type message: str
+    """
+
+    def __init__(self, reason: str, message: str) -> None:
+        super().__init__(message)
+        self.reason = reason
+
+    @property
+    def status(self) -> int:
+        """HTTP status of the rejection, 429 if overloaded and 503 if the deadline passed."""
+        return 429 if self.reason == "overloaded" else 503
+
+
+def request_deadline(timeout_ms: Optional[float]) -> Optional[float]:
+    """
+    Deadline of a request on the :func:`time.monotonic` clock.
+
+    :param timeout_ms: milliseconds the client waits for the response, e.g. the ``X-Request-Timeout-Ms`` header
+    :type timeout_ms: float | None
+
+    :return: the deadline, None if there is no timeout
+    :rtype: float | None
+    """
+    return None if not timeout_ms else time.monotonic() + float(timeout_ms) / 1e3
+
+
+def check_deadline(deadline: Optional[float]) -> None:
+    """
+    Drop work whose deadline already passed, before spending inference on it.
+
+    :param deadline: deadline on the :func:`time.monotonic` clock, None for no deadline
+    :type deadline: float | None
+
+    :raises Rejected: if the deadline passed
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        raise Rejected(reason="deadline", message="Request deadline exceeded")
+
+
+class AdmissionController:
+    """
+    Bounded number of requests in flight with a bounded queue of requests waiting for a slot, see the module
+    documentation.
+
+    :param max_in_flight: requests handled at once
+    :type max_in_flight: int
+
+    :param max_queued: requests waiting for a slot, further requests are rejected at once
+    :type max_queued: int
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int = 0) -> None:
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be greater than 0, got {max_in_flight}")
+
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self._in_flight = 0
+        self._queued = 0
+        self._slot_free = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests being handled."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return self._queued
+
+    def acquire(self, deadline: Optional[float] = None) -> None:
+        """
+        Take a slot, waiting in the queue until one is free or ``deadline`` passes.
+
+        :param deadline: deadline of the request on the :func:`time.monotonic` clock, None to wait without limit
+        :type deadline: float | None
+
+        :raises Rejected: if the queue is full or the deadline passes while waiting
+        """
+        with self._slot_free:
+            if self._in_flight >= self.max_in_flight:
+                if self._queued >= self.max_queued:
+                    raise Rejected(
+                        reason="overloaded",
+                        message=f"Overloaded, {self._in_flight} requests in flight and {self._queued} queued",
+                    )
+
+                self._queued += 1
+                try:
+                    while self._in_flight >= self.max_in_flight:
+                        timeout = None if deadline is None else deadline - time.monotonic()
+                        if timeout is not None and timeout <= 0:
+                            raise Rejected(reason="deadline", message="Request deadline exceeded waiting for a slot")
+                        self._slot_free.wait(timeout=timeout)
+                finally:
+                    self._queued -= 1
+
+            self._in_flight += 1
+
+    def release(self) -> None:
+        """Free a slot taken by :meth:`acquire`."""
+        with self._slot_free:
+            self._in_flight -= 1
+            self._slot_free.notify()
+
+    @contextmanager
+    def admit(self, deadline: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold a slot for the block, see :meth:`acquire`.
+
+        :raises Rejected: if the request isn't admitted
+        """
+        self.acquire(deadline=deadline)
+
+        try:
+            yield
+        finally:
+            self.release()
@@ -7,8 +7,19 @@
 """
 
 # API actions
-from endpoint import app
-from src.microservice.api.model_utils import get_logger
+from src.microservice.api.endpoint import app
+from src.microservice.api.model_utils import (
+    create_admission_controller,
+    create_cache,
+    create_model_router,
+    get_logger,
+    load_pipeline,
+    open_feature_store,
+    start_micro_batcher,
+    start_model_reloader,
+    start_shadow_scorer,
+    warm_up,
+)
 
 from logging import INFO
 
@@ -21,22 +32,45 @@ if __name__ == "__main__":
 
     logger.info(f"\t-> Starting Service using environment {fenv}")
     if fenv == "staging":
-        app.config.from_object("config.StagingConfig")
+        app.config.from_object("src.microservice.api.config.StagingConfig")
 
     elif fenv == "production":
-        app.config.from_object("config.ProductionConfig")
+        app.config.from_object("src.microservice.api.config.ProductionConfig")
 
     elif fenv == "development":
-        app.config.from_object("config.DevelopmentConfig")
+        app.config.from_object("src.microservice.api.config.DevelopmentConfig")
 
     else:
         logger.exception(Exception(f"Invalid FLASK_ENV {fenv}"))
 
     del fenv
 
+    logger = get_logger(level=app.config["LOGGER_LEVEL"])
+
     print(
         f"Using db {app.config['DB_NAME']} from Server {app.config['DB_SERVER']}"
         + f" with driver {app.config['DB_DRIVER']}"
     )
 
+    pipeline = load_pipeline(app=app)
+    logger.info(f"\t-> Loaded model {pipeline.version} from {app.config['MODEL_PATH']}")
+
+    warm_up(app=app, pipeline=pipeline)
+
+    create_model_router(app=app)
+
+    open_feature_store(app=app)
+
+    create_cache(app=app)
+
+    create_admission_controller(app=app)
+
+    if app.config["MICRO_BATCHING"]:
+        start_micro_batcher(app=app)
+
+    if app.config["MODEL_RELOAD"]:
+        start_model_reloader(app=app)
+
+    start_shadow_scorer(app=app)
+
     app.run(host=str(app.config["HOST"]), port=int(app.config["PORT"]))
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.batching
+   :synopsis: Micro-batching of small prediction requests, so concurrent single-row requests share one predict call.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import queue
+import threading
+import time
+
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+import numpy
+import pandas
+
+from src.microservice.api.admission import check_deadline
+from src.microservice.api.metrics import BATCH_ROWS
+
+# sentinel to stop the flushing thread
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Queue of pending prediction requests flushed as one matrix when ``max_batch_size`` rows are queued or
+    ``max_wait_ms`` milliseconds passed since the first request of the batch arrived, whatever happens first.
+
+    Each caller gets back its own rows of the result.
+
+    :param predict: function scoring a batch of district rows, e.g. :meth:`InferencePipeline.predict`
+    :type predict: Callable[[pandas.DataFrame], numpy.ndarray]
+
+    :param max_batch_size: number of rows that triggers a flush
+    :type max_batch_size: int
+
+    :param max_wait_ms: maximum time in milliseconds a request waits for other requests to join its batch
+    :type max_wait_ms: float
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[pandas.DataFrame], numpy.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be greater than 0, got {max_batch_size}")
+
+        self.predict_batch = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the flushing thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting to be flushed."""
+        return self._queue.qsize()
+
+    def start(self) -> "MicroBatcher":
+        """Start the background thread that flushes the batches."""
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Flush the pending requests and stop the background thread.
+
+        :param timeout: seconds to wait for the thread to finish
+        :type timeout: float
+        """
+        if self.running:
+            self._queue.put(_STOP)
+            self._thread.join(timeout=timeout)
+
+        self._thread = None
+
+    def submit(
+        self,
+        data: pandas.DataFrame,
+        predict: Optional[Callable[[pandas.DataFrame], numpy.ndarray]] = None,
+        deadline: Optional[float] = None,
+    ) -> Future:
+        """
+        Queue district rows to be scored in the next batch.
+
+        :param data: district rows, usually a single one
+        :type data: pandas.DataFrame
+
+        :param predict: function scoring the rows instead of the one of the batcher, e.g. the pipeline a request
+            started with while a new model version is swapped in. Rows of different functions are scored apart
+        :type predict: Callable[[pandas.DataFrame], numpy.ndarray]
+
+        :param deadline: deadline of the request on the :func:`time.monotonic` clock, the rows are dropped without
+            being scored if it passed when the batch is flushed
+        :type deadline: float | None
+
+        :return: future resolved with the predictions of ``data``
+        :rtype: concurrent.futures.Future
+        """
+        if not self.running:
+            raise RuntimeError("MicroBatcher is not running, call start() first")
+
+        future: Future = Future()
+        self._queue.put((data, future, predict or self.predict_batch, deadline))
+
+        return future
+
+    def predict(
+        self,
+        data: pandas.DataFrame,
+        timeout: Optional[float] = None,
+        predict: Optional[Callable[[pandas.DataFrame], numpy.ndarray]] = None,
+        deadline: Optional[float] = None,
+    ) -> numpy.ndarray:
+        """
+        Score district rows together with the other requests queued in the same time window.
+
+        :param data: district rows
+        :type data: pandas.DataFrame
+
+        :param timeout: seconds to wait for the result
+        :type timeout: float
+
+        :param predict: function scoring the rows instead of the one of the batcher, see :meth:`submit`
+        :type predict: Callable[[pandas.DataFrame], numpy.ndarray]
+
+        :param deadline: deadline of the request, see :meth:`submit`
+        :type deadline: float | None
+
+        :raises admission.Rejected: if the deadline passed before the rows were scored
+        :return: one prediction per row of ``data``
+        :rtype: numpy.ndarray
+        """
+        return self.submit(data=data, predict=predict, deadline=deadline).result(timeout=timeout)
+
+    def _run(self) -> None:
+        """Collect requests until the batch is full or the flush window ends, then score them together."""
+        stop = False
+
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            n_rows = len(item[0])
+            deadline = time.monotonic() + self.max_wait_ms / 1e3
+
+            while n_rows < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+                if item is _STOP:
+                    stop = True
+                    break
+
+                batch.append(item)
+                n_rows += len(item[0])
+
+            self._flush(batch=batch)
+
+    def _flush(self, batch: list[tuple[pandas.DataFrame, Future, Callable, Optional[float]]]) -> None:
+        """
+        Score the rows of each predict function of the batch in one call and hand each caller its own slice. The rows
+        of the callers whose deadline passed are dropped.
+        """
+        groups: dict[Callable, list[tuple[pandas.DataFrame, Future]]] = {}
+        for data, future, predict, deadline in batch:
+            try:
+                check_deadline(deadline=deadline)
+            except Exception as err:
+                future.set_exception(err)
+                continue
+
+            groups.setdefault(predict, []).append((data, future))
+
+        for predict, items in groups.items():
+            self._flush_group(predict=predict, items=items)
+
+    @staticmethod
+    def _flush_group(
+        predict: Callable[[pandas.DataFrame], numpy.ndarray], items: list[tuple[pandas.DataFrame, Future]]
+    ) -> None:
+        """Score the rows of the callers sharing the same predict function."""
+        try:
+            data = items[0][0] if len(items) == 1 else pandas.concat([data for data, _ in items], ignore_index=True)
+            BATCH_ROWS.observe(len(data))
+            predictions = predict(data)
+
+        except Exception as err:
+            for _, future in items:
+                future.set_exception(err)
+            return
+
+        offset = 0
+        for data, future in items:
+            future.set_result(predictions[offset : offset + len(data)])
+            offset += len(data)
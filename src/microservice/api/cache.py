@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.cache
+   :synopsis: Bounded prediction cache keyed on canonicalized district rows and the model version, with LRU and TTL
+              eviction. :class:`MemoryPredictionCache` lives in the process, :class:`SQLitePredictionCache` is shared
+              by all the workers of the host through a local SQLite file.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional, Union
+
+import numpy
+import pandas
+
+from src.microservice.api.constants import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERICAL_COLUMNS
+
+# keys bound per statement, below the SQLITE_MAX_VARIABLE_NUMBER of any SQLite build (999 before 3.32)
+SQLITE_MAX_KEYS = 900
+
+# writes of a process between two sweeps of the expired and over the cap entries of the SQLite cache
+SQLITE_SWEEP_EVERY = 256
+
+
+def canonicalize(data: pandas.DataFrame, decimals: int = 6) -> pandas.DataFrame:
+    """
+    Canonical form of district rows: columns in :data:`FEATURE_COLUMNS` order, numerical values rounded to
+    ``decimals`` and categorical values stripped and upper-cased.
+
+    The model scores the canonical rows, so a cached prediction is exactly the one the model returns for any row with
+    the same canonical form.
+
+    :param data: district rows
+    :type data: pandas.DataFrame
+
+    :param decimals: decimals kept of the numerical values
+    :type decimals: int
+
+    :return: canonicalized copy of the rows
+    :rtype: pandas.DataFrame
+    """
+    # + 0.0 turns -0.0 into 0.0, both must have the same key
+    columns = {col: numpy.round(data[col].to_numpy(dtype=numpy.float64), decimals) + 0.0 for col in NUMERICAL_COLUMNS}
+
+    for col in CATEGORICAL_COLUMNS:
+        values = [value.strip().upper() if isinstance(value, str) else value for value in data[col].to_numpy()]
+        columns[col] = numpy.array(values, dtype=object)
+
+    return pandas.DataFrame(columns, columns=FEATURE_COLUMNS, index=data.index, copy=False)
+
+
+def row_keys(data: pandas.DataFrame, model_version: str) -> list[str]:
+    """
+    Hash each canonicalized district row together with the model version, so a new model never hits the
+    predictions of the previous one.
+
+    :param data: canonicalized district rows, see :func:`canonicalize`
+    :type data: pandas.DataFrame
+
+    :param model_version: version of the model scoring the rows
+    :type model_version: str
+
+    :return: one hex key per row
+    :rtype: list[str]
+    """
+    numerical = numpy.column_stack([data[col].to_numpy(dtype=numpy.float64) for col in NUMERICAL_COLUMNS])
+    # every NaN has the same bytes
+    numerical = numpy.where(numpy.isnan(numerical), numpy.nan, numerical)
+    categorical = numpy.column_stack([data[col].to_numpy(dtype=object).astype(str) for col in CATEGORICAL_COLUMNS])
+    version = model_version.encode()
+
+    keys = []
+    for num_row, cat_row in zip(numerical, categorical):
+        row_hash = hashlib.blake2b(version, digest_size=16)
+        row_hash.update(num_row.tobytes())
+        row_hash.update("\x1f".join(cat_row).encode())
+        keys.append(row_hash.hexdigest())
+
+    return keys
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a prediction cache.
+
+    Args:
+        hits (int): lookups that found a valid entry
+        misses (int): lookups without entry or with an expired one
+        evictions (int): entries removed to respect the maximum number of entries
+        expirations (int): entries removed because their TTL passed
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Hits over lookups."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class PredictionCache(ABC):
+    """
+    Bounded cache of predictions with LRU and TTL eviction.
+
+    :param max_entries: maximum number of entries, the least recently used ones are evicted first
+    :type max_entries: int
+
+    :param ttl: seconds an entry is valid after being stored
+    :type ttl: float
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl: float = 3600.0) -> None:
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be greater than 0, got {max_entries}")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def get_many(self, keys: list[str]) -> list[Optional[float]]:
+        """
+        Look up the predictions of the keys.
+
+        :param keys: row keys, see :func:`row_keys`
+        :type keys: list[str]
+
+        :return: the cached prediction or None per key
+        :rtype: list[float | None]
+        """
+
+    @abstractmethod
+    def set_many(self, keys: list[str], values: Union[list[float], numpy.ndarray]) -> None:
+        """
+        Store the predictions of the keys.
+
+        :param keys: row keys, see :func:`row_keys`
+        :type keys: list[str]
+
+        :param values: prediction per key
+        :type values: list[float] | numpy.ndarray
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all the entries."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of entries."""
+
+    def to_dict(self) -> dict:
+        """Counters, hit rate and size of the cache."""
+        return {**asdict(self.stats), "hit_rate": round(self.stats.hit_rate, 4), "size": len(self)}
+
+
+class MemoryPredictionCache(PredictionCache):
+    """In-process :class:`PredictionCache` backed by an ordered dictionary."""
+
+    def __init__(self, max_entries: int = 100_000, ttl: float = 3600.0) -> None:
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def get_many(self, keys: list[str]) -> list[Optional[float]]:
+        now = time.monotonic()
+        values = []
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+
+                if entry is not None and entry[1] <= now:
+                    del self._entries[key]
+                    self.stats.expirations += 1
+                    entry = None
+
+                if entry is None:
+                    self.stats.misses += 1
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    values.append(entry[0])
+
+        return values
+
+    def set_many(self, keys: list[str], values: Union[list[float], numpy.ndarray]) -> None:
+        expires_at = time.monotonic() + self.ttl
+
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = (float(value), expires_at)
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLitePredictionCache(PredictionCache):
+    """
+    :class:`PredictionCache` stored in a local SQLite file, so all the worker processes of a host share it.
+
+    Each thread of each process uses its own connection, so the cache can be created before forking the workers.
+    The counters are the ones of the current process.
+
+    The expired entries and the least recently used ones over ``max_entries`` aren't deleted on every write, which
+    would scan the table each time, but every ``sweep_every`` writes of the process, or earlier once the rows it
+    wrote since the last sweep may take the table over the cap. Between two sweeps the table can hold expired rows,
+    which are never returned, and the rows other processes wrote over the cap.
+
+    :param path: file path of the SQLite database
+    :type path: str
+
+    :param sweep_every: writes between two sweeps
+    :type sweep_every: int
+    """
+
+    def __init__(
+        self, path: str, max_entries: int = 100_000, ttl: float = 3600.0, sweep_every: int = SQLITE_SWEEP_EVERY
+    ) -> None:
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.path = str(path)
+        self.sweep_every = sweep_every
+        self._local = threading.local()
+
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS predictions "
+            "(key TEXT PRIMARY KEY, value REAL NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS predictions_last_access ON predictions (last_access);"
+            "CREATE INDEX IF NOT EXISTS predictions_expires_at ON predictions (expires_at);"
+        )
+        # upper bound of the rows, counted at each sweep and increased by the rows written since
+        self._size = len(self)
+        self._writes = 0
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """Connection of the current thread and process, SQLite connections must not cross a fork."""
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+
+        return self._local.conn
+
+    def get_many(self, keys: list[str]) -> list[Optional[float]]:
+        if not keys:
+            return []
+
+        now = time.time()
+        conn = self._connection
+        rows = {}
+
+        for start in range(0, len(keys), SQLITE_MAX_KEYS):
+            chunk = keys[start : start + SQLITE_MAX_KEYS]
+            query = f"SELECT key, value FROM predictions WHERE key IN ({','.join('?' * len(chunk))}) AND expires_at > ?"
+            rows.update(conn.execute(query, (*chunk, now)).fetchall())
+
+        hits = list(rows)
+        for start in range(0, len(hits), SQLITE_MAX_KEYS):
+            chunk = hits[start : start + SQLITE_MAX_KEYS]
+            conn.execute(
+                f"UPDATE predictions SET last_access = ? WHERE key IN ({','.join('?' * len(chunk))})", (now, *chunk)
+            )
+
+        values = [rows.get(key) for key in keys]
+
+        with self._lock:
+            self.stats.hits += len(rows)
+            self.stats.misses += len(keys) - len(rows)
+
+        return values
+
+    def set_many(self, keys: list[str], values: Union[list[float], numpy.ndarray]) -> None:
+        if not keys:
+            return
+
+        now = time.time()
+        conn = self._connection
+
+        with self._lock:
+            self._writes += 1
+            self._size += len(keys)
+            sweep = self._writes % self.sweep_every == 0 or self._size > self.max_entries
+
+        expired = evicted = 0
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                [(key, float(value), now + self.ttl, now) for key, value in zip(keys, values)],
+            )
+
+            if sweep:
+                expired = conn.execute("DELETE FROM predictions WHERE expires_at <= ?", (now,)).rowcount
+                size = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+                if size > self.max_entries:
+                    evicted = conn.execute(
+                        "DELETE FROM predictions WHERE key IN "
+                        "(SELECT key FROM predictions ORDER BY last_access ASC LIMIT ?)",
+                        (size - self.max_entries,),
+                    ).rowcount
+
+        with self._lock:
+            if sweep:
+                self._size = size - evicted
+            self.stats.expirations += expired
+            self.stats.evictions += evicted
+
+    def clear(self) -> None:
+        self._connection.execute("DELETE FROM predictions")
+
+        with self._lock:
+            self._size = 0
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+def cached_predict(
+    cache: PredictionCache,
+    data: pandas.DataFrame,
+    model_version: str,
+    predict: Callable[[pandas.DataFrame], numpy.ndarray],
+    decimals: int = 6,
+) -> numpy.ndarray:
+    """
+    Score district rows looking up the cache first, only the missing rows are scored with ``predict``.
+
+    :param cache: prediction cache
+    :type cache: PredictionCache
+
+    :param data: district rows
+    :type data: pandas.DataFrame
+
+    :param model_version: version of the model behind ``predict``
+    :type model_version: str
+
+    :param predict: function scoring a batch of district rows
+    :type predict: Callable[[pandas.DataFrame], numpy.ndarray]
+
+    :param decimals: decimals kept of the numerical values, see :func:`canonicalize`
+    :type decimals: int
+
+    :return: one prediction per row
+    :rtype: numpy.ndarray
+    """
+    data = canonicalize(data=data, decimals=decimals)
+    keys = row_keys(data=data, model_version=model_version)
+
+    predictions = numpy.array(cache.get_many(keys=keys), dtype=numpy.float64)
+    missing = numpy.flatnonzero(numpy.isnan(predictions))
+
+    if missing.size:
+        predictions[missing] = predict(data.iloc[missing].reset_index(drop=True))
+        cache.set_many(keys=[keys[idx] for idx in missing], values=predictions[missing])
+
+    return predictions
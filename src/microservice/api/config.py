@@ -5,8 +5,11 @@
               Edit the class attributes depending on the environment
 .. moduleauthor:: (C) <grp or enterprise> - <author> 2022
 """
+import os
 from logging import ERROR, INFO, DEBUG as DEBUG_LOGGING
 
+from exper.constant import ARTIFACT_DIR, MODEL_DIR
+
 
 class Config:
     """
@@ -20,11 +23,153 @@ class Config:
 
     :param PORT: port to listen from. By default the app uses port 80
     :type PORT: int
+
+    :param LOG_SAMPLE_RATE: fraction of the DEBUG and INFO records that are logged, warnings and errors are always
+        logged
+    :type LOG_SAMPLE_RATE: float
+
+    :param WORKERS: number of worker processes forked by the pre-fork server, see :mod:`server`
+    :type WORKERS: int
+
+    :param MODEL_PATH: joblib artifact with the fitted preprocessor and regressor, loaded once at startup
+    :type MODEL_PATH: pathlib.Path
+
+    :param MODEL_MMAP_MODE: ``mmap_mode`` used to load the numpy arrays of the model artifact. With ``"r"`` the
+        parameters are memory-mapped read-only, so forked workers share the same pages
+    :type MODEL_MMAP_MODE: str | None
+
+    :param MODEL_DIR: directory of versioned joblib artifacts, the newest one is hot swapped in if ``MODEL_RELOAD``
+    :type MODEL_DIR: pathlib.Path
+
+    :param MODEL_RELOAD: whether ``MODEL_DIR`` is watched for new model versions, see :mod:`reload`
+    :type MODEL_RELOAD: bool
+
+    :param MODEL_RELOAD_PATTERN: glob of the versioned artifacts of ``MODEL_DIR`` that can be hot swapped in, the
+        ones of ``MODEL_ROUTES`` and ``SHADOW_MODEL_PATH`` never are
+    :type MODEL_RELOAD_PATTERN: str
+
+    :param MODEL_RELOAD_INTERVAL: seconds between two checks of ``MODEL_DIR``
+    :type MODEL_RELOAD_INTERVAL: float
+
+    :param MODEL_DRAIN_TIMEOUT: maximum seconds to wait for the in-flight requests of a replaced model
+    :type MODEL_DRAIN_TIMEOUT: float
+
+    :param MODEL_ROUTES: joblib artifacts of alternative models with the share of the requests routed to each of
+        them, the rest goes to the model of ``MODEL_PATH``, see :mod:`routing`
+    :type MODEL_ROUTES: dict[str, float]
+
+    :param SHADOW_MODEL_PATH: joblib artifact of a challenger model that scores the requests again in the background,
+        None to disable shadow scoring
+    :type SHADOW_MODEL_PATH: pathlib.Path | None
+
+    :param SHADOW_LOG_PATH: append-only NDJSON log of the shadow predictions and latencies
+    :type SHADOW_LOG_PATH: pathlib.Path
+
+    :param SHADOW_WORKERS: threads scoring the shadow requests per worker
+    :type SHADOW_WORKERS: int
+
+    :param SHADOW_MAX_PENDING: shadow requests pending per worker, the following ones are dropped
+    :type SHADOW_MAX_PENDING: int
+
+    :param COMPILE_PREPROCESSOR: whether the fitted preprocessor is compiled into a fused NumPy kernel at startup
+    :type COMPILE_PREPROCESSOR: bool
+
+    :param WARMUP_BATCH_SIZES: batch-size buckets scored by a loaded model before ``/ready`` answers 200
+    :type WARMUP_BATCH_SIZES: tuple
+
+    :param WARMUP_ROUNDS: warm-up calls per batch size
+    :type WARMUP_ROUNDS: int
+
+    :param MICRO_BATCHING: whether single-row requests are coalesced into one predict call
+    :type MICRO_BATCHING: bool
+
+    :param BATCH_MAX_SIZE: number of queued rows that flushes a micro-batch
+    :type BATCH_MAX_SIZE: int
+
+    :param BATCH_MAX_WAIT_MS: maximum milliseconds a request waits for others to join its micro-batch
+    :type BATCH_MAX_WAIT_MS: float
+
+    :param MAX_IN_FLIGHT: requests handled at once per worker, the excess waits in the admission queue, None to
+        disable admission control, see :mod:`admission`
+    :type MAX_IN_FLIGHT: int | None
+
+    :param MAX_QUEUED: requests waiting for a slot per worker, further requests are rejected with 429
+    :type MAX_QUEUED: int
+
+    :param REQUEST_TIMEOUT_MS: default deadline of a request in milliseconds, overridden by the
+        ``X-Request-Timeout-Ms`` header. Requests still waiting or not scored when it passes are dropped with 503
+    :type REQUEST_TIMEOUT_MS: float | None
+
+    :param RETRY_AFTER_SECONDS: ``Retry-After`` of the rejected requests
+    :type RETRY_AFTER_SECONDS: int
+
+    :param STREAM_CHUNK_ROWS: rows transformed and predicted at once by ``/predict/stream``, it bounds its memory
+    :type STREAM_CHUNK_ROWS: int
+
+    :param CACHE_BACKEND: prediction cache, ``"memory"`` (per process), ``"sqlite"`` (shared by the workers of the
+        host through ``CACHE_PATH``) or None to disable it
+    :type CACHE_BACKEND: str | None
+
+    :param CACHE_MAX_ENTRIES: maximum number of cached predictions, the least recently used are evicted first
+    :type CACHE_MAX_ENTRIES: int
+
+    :param CACHE_TTL_SECONDS: seconds a cached prediction is valid
+    :type CACHE_TTL_SECONDS: float
+
+    :param CACHE_FLOAT_DECIMALS: decimals kept of the numerical features when canonicalizing the rows
+    :type CACHE_FLOAT_DECIMALS: int
+
+    :param FEATURE_STORE_DIR: directory of the precomputed district features served by ``/main``, see
+        :mod:`feature_store`
+    :type FEATURE_STORE_DIR: pathlib.Path
+
+    :param DB_NAME: database of the raw districts, a SQLite file of the feature store
+    :type DB_NAME: pathlib.Path
+
+    :param DB_POOL_SIZE: maximum number of open connections to the database per process
+    :type DB_POOL_SIZE: int
     """
 
     DEBUG = False
     TESTING = False
     LOGGER_LEVEL = INFO
+    LOG_SAMPLE_RATE = 1.0
+    HOST = "0.0.0.0"
+    PORT = 80
+    WORKERS = 1
+    MODEL_PATH = MODEL_DIR / "california_pipeline.joblib"
+    MODEL_MMAP_MODE = "r"
+    MODEL_DIR = MODEL_DIR
+    MODEL_RELOAD = True
+    MODEL_RELOAD_PATTERN = "california_pipeline-*.joblib"
+    MODEL_RELOAD_INTERVAL = 30.0
+    MODEL_DRAIN_TIMEOUT = 30.0
+    MODEL_ROUTES: dict = {}
+    SHADOW_MODEL_PATH = None
+    SHADOW_LOG_PATH = ARTIFACT_DIR / "shadow" / "predictions.ndjson"
+    SHADOW_WORKERS = 1
+    SHADOW_MAX_PENDING = 1_000
+    COMPILE_PREPROCESSOR = True
+    WARMUP_BATCH_SIZES = (1, 8, 32, 64, 256)
+    WARMUP_ROUNDS = 2
+    MICRO_BATCHING = True
+    BATCH_MAX_SIZE = 32
+    BATCH_MAX_WAIT_MS = 5.0
+    MAX_IN_FLIGHT = 32
+    MAX_QUEUED = 64
+    REQUEST_TIMEOUT_MS = 1_000.0
+    RETRY_AFTER_SECONDS = 1
+    STREAM_CHUNK_ROWS = 10_000
+    CACHE_BACKEND = "memory"
+    CACHE_PATH = ARTIFACT_DIR / "cache" / "predictions.sqlite"
+    CACHE_MAX_ENTRIES = 100_000
+    CACHE_TTL_SECONDS = 3600.0
+    CACHE_FLOAT_DECIMALS = 6
+    FEATURE_STORE_DIR = ARTIFACT_DIR / "feature_store"
+    DB_DRIVER = "sqlite3"
+    DB_SERVER = "localhost"
+    DB_NAME = FEATURE_STORE_DIR / "districts.sqlite"
+    DB_POOL_SIZE = 4
 
 
 class ProductionConfig(Config):
@@ -33,7 +178,14 @@ class ProductionConfig(Config):
     """
 
     LOGGER_LEVEL = ERROR
+    LOG_SAMPLE_RATE = 0.01
     ENV = "production"
+    WORKERS = os.cpu_count() or 1
+    BATCH_MAX_SIZE = 64
+    BATCH_MAX_WAIT_MS = 2.0
+    CACHE_BACKEND = "sqlite"
+    CACHE_MAX_ENTRIES = 1_000_000
+    DB_POOL_SIZE = 8
 
 
 class StagingConfig(Config):
@@ -45,6 +197,10 @@ class StagingConfig(Config):
     # But this value was used to create a different configuration than development
     # DevelopmentConfig has different TESTING and DEBUG parameters
     ENV = "staging"
+    WORKERS = 2
+    LOG_SAMPLE_RATE = 0.1
+    BATCH_MAX_SIZE = 32
+    BATCH_MAX_WAIT_MS = 10.0
 
 
 class DevelopmentConfig(Config):
@@ -56,3 +212,15 @@ class DevelopmentConfig(Config):
     TESTING = True
     DEBUG = True
     LOGGER_LEVEL = DEBUG_LOGGING
+    MICRO_BATCHING = False
+    MODEL_RELOAD = False
+    MAX_IN_FLIGHT = None
+    REQUEST_TIMEOUT_MS = None
+    CACHE_BACKEND = None
+
+
+CONFIGS = {
+    ProductionConfig.ENV: ProductionConfig,
+    StagingConfig.ENV: StagingConfig,
+    DevelopmentConfig.ENV: DevelopmentConfig,
+}
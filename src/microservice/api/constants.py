@@ -15,6 +15,34 @@ class ColName(StringEnum):
     """
     Constant values for name conventions
 
+    Names of the columns of a district row of the California Census data that the model expects as input.
     """
 
-    # TODO
+    LONGITUDE = "longitude"
+    LATITUDE = "latitude"
+    HOUSING_MEDIAN_AGE = "housing_median_age"
+    TOTAL_ROOMS = "total_rooms"
+    TOTAL_BEDROOMS = "total_bedrooms"
+    POPULATION = "population"
+    HOUSEHOLDS = "households"
+    MEDIAN_INCOME = "median_income"
+    OCEAN_PROXIMITY = "ocean_proximity"
+
+
+# order of the input columns, the same one used to fit the preprocessor
+FEATURE_COLUMNS = [str(col) for col in ColName]
+NUMERICAL_COLUMNS = [col for col in FEATURE_COLUMNS if col != ColName.OCEAN_PROXIMITY]
+CATEGORICAL_COLUMNS = [str(ColName.OCEAN_PROXIMITY)]
+
+# district of the California Census used to warm up a freshly loaded pipeline before it serves traffic
+SAMPLE_DISTRICT = {
+    ColName.LONGITUDE.value: -122.23,
+    ColName.LATITUDE.value: 37.88,
+    ColName.HOUSING_MEDIAN_AGE.value: 41.0,
+    ColName.TOTAL_ROOMS.value: 880.0,
+    ColName.TOTAL_BEDROOMS.value: 129.0,
+    ColName.POPULATION.value: 322.0,
+    ColName.HOUSEHOLDS.value: 126.0,
+    ColName.MEDIAN_INCOME.value: 8.3252,
+    ColName.OCEAN_PROXIMITY.value: "NEAR BAY",
+}
@@ -5,19 +5,113 @@
         :view ping_db: host:port/ping_db - to check if there is connection to the db from
                         the microservice
         :view ping: host:port/ping - to check if the microservice itself is up and running
+        :view ready: host:port/ready - to check if the model is loaded and warmed up to serve traffic
+        :view predict: host:port/predict - to score a batch of districts with the loaded model
+        :view predict_stream: host:port/predict/stream - to score an NDJSON or CSV upload of any size in chunks
+        :view metrics: host:port/metrics - metrics of the service in Prometheus text format
+        :view main_request: host:port/main/id1=<int>;id2=<int>;id3=<str> - to score a district by its ids with the
+                        precomputed features of the feature store
 
 .. moduleauthor:: (C) <group - enterprise> - <user> 2022
 """
 
+import functools
+import itertools
+import time
 import traceback
 
-from flask import Flask, jsonify
+from typing import Optional
 
-from src.microservice.api.model_utils import get_logger
+import numpy
+import pandas
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+
+from src.microservice.api.admission import REJECTIONS, Rejected, check_deadline, request_deadline
+from src.microservice.api.cache import cached_predict
+from src.microservice.api.formats import JSON, MEDIA_TYPES, decode_batch, encode_predictions, media_type
+from src.microservice.api.inference import InferencePipeline
+from src.microservice.api.metrics import REGISTRY, STAGE_SECONDS
+from src.microservice.api.streaming import STREAM_MEDIA_TYPES, iter_chunks, stream_predictions
 
 app = Flask(__name__, instance_relative_config=True)
 
 
+def _cache_stat(name: str):
+    """Read a statistic of the prediction cache at scrape time, None if the cache is disabled."""
+    cache = app.extensions.get("prediction_cache")
+    return None if cache is None else cache.to_dict()[name]
+
+
+REGISTRY.gauge(
+    "prediction_queue_depth",
+    "Requests waiting for the next micro-batch",
+    lambda: app.extensions["micro_batcher"].queue_depth if "micro_batcher" in app.extensions else None,
+)
+REGISTRY.gauge("prediction_cache_hit_ratio", "Cache hits over lookups", lambda: _cache_stat("hit_rate"))
+REGISTRY.gauge("prediction_cache_entries", "Predictions stored in the cache", lambda: _cache_stat("size"))
+REGISTRY.gauge(
+    "prediction_requests_in_flight",
+    "Requests holding an admission slot",
+    lambda: app.extensions["admission_controller"].in_flight if "admission_controller" in app.extensions else None,
+)
+REGISTRY.gauge(
+    "prediction_requests_queued",
+    "Requests waiting for an admission slot",
+    lambda: app.extensions["admission_controller"].queued if "admission_controller" in app.extensions else None,
+)
+for _event in ("hits", "misses", "evictions", "expirations"):
+    REGISTRY.callback_counter(
+        "prediction_cache_events_total", "Cache events", lambda event=_event: _cache_stat(event), event=_event
+    )
+
+
+@app.errorhandler(Rejected)
+def rejected(err: Rejected):
+    """
+    Answer a request shed by admission control with 429 (overloaded) or 503 (deadline exceeded) and a
+    ``Retry-After`` header of ``RETRY_AFTER_SECONDS``.
+    """
+    REJECTIONS[err.reason].inc()
+
+    return jsonify({"error": str(err)}), err.status, {"Retry-After": str(app.config.get("RETRY_AFTER_SECONDS", 1))}
+
+
+def admitted(view):
+    """
+    Handle the view only if the admission controller of the application has a free slot, see
+    :mod:`src.microservice.api.admission`. The deadline of the request, from the ``X-Request-Timeout-Ms`` header or
+    ``REQUEST_TIMEOUT_MS``, is kept in ``flask.g.deadline``.
+
+    A streamed response holds its slot until it's fully sent.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        timeout_ms = request.headers.get("X-Request-Timeout-Ms", app.config.get("REQUEST_TIMEOUT_MS"), type=float)
+        g.deadline = request_deadline(timeout_ms=timeout_ms)
+
+        controller = app.extensions.get("admission_controller")
+        if controller is None:
+            return view(*args, **kwargs)
+
+        controller.acquire(deadline=g.deadline)
+
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except BaseException:
+            controller.release()
+            raise
+
+        if response.is_streamed:
+            response.call_on_close(controller.release)
+        else:
+            controller.release()
+
+        return response
+
+    return wrapper
+
+
 @app.get("/ping")
 @app.get("/")
 def ping():
@@ -29,42 +123,246 @@ def ping():
     return "Service ON!", 200
 
 
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe, unlike :func:`ping` it only answers 200 once the model is loaded and warmed up at every batch-size
+    bucket, see :func:`src.microservice.api.model_utils.warm_up`.
+
+    :return: JSON with the ``status`` and the ``model_version`` served
+    """
+    pipeline = app.extensions.get("inference_pipeline")
+
+    if pipeline is None:
+        return jsonify({"status": "model not loaded"}), 503
+
+    if not pipeline.warmed_up:
+        return jsonify({"status": "warming up", "model_version": pipeline.version}), 503
+
+    return jsonify({"status": "ready", "model_version": pipeline.version}), 200
+
+
+def score(pipeline: InferencePipeline, data: pandas.DataFrame, deadline: Optional[float] = None) -> numpy.ndarray:
+    """
+    Score district rows looking up the prediction cache first, if enabled. The rows not cached are coalesced by the
+    micro-batcher when it's a single one, otherwise they're scored directly in one call.
+
+    :param pipeline: pipeline scoring the rows
+    :type pipeline: InferencePipeline
+
+    :param data: district rows
+    :type data: pandas.DataFrame
+
+    :param deadline: deadline of the request on the :func:`time.monotonic` clock, the rows aren't scored after it
+    :type deadline: float | None
+
+    :raises admission.Rejected: if the deadline passed before the rows were scored
+    :return: one prediction per row
+    :rtype: numpy.ndarray
+    """
+    batcher = app.extensions.get("micro_batcher")
+    cache = app.extensions.get("prediction_cache")
+
+    def predict_rows(rows: pandas.DataFrame) -> numpy.ndarray:
+        if batcher is not None and len(rows) == 1:
+            # single rows are coalesced with the concurrent ones into one predict call
+            return batcher.predict(data=rows, predict=pipeline.predict_batch, deadline=deadline)
+
+        check_deadline(deadline=deadline)
+        return pipeline.predict(data=rows)
+
+    if cache is None:
+        return predict_rows(rows=data)
+
+    return cached_predict(
+        cache=cache,
+        data=data,
+        model_version=pipeline.version,
+        predict=predict_rows,
+        decimals=int(app.config.get("CACHE_FLOAT_DECIMALS", 6)),
+    )
+
+
+@app.post("/predict")
+@admitted
+def predict():
+    """
+    Score a batch of districts with the pipeline loaded at startup in one vectorized call.
+
+    The body is a JSON array of district rows or a columnar JSON object, see
+    :func:`src.microservice.api.inference.payload_to_frame`, an Arrow IPC stream or a ``.npy`` matrix, see
+    :mod:`src.microservice.api.formats`. The predictions are returned in the format of the ``Accept`` header, by
+    default the one of the request.
+
+    The request is scored by the model picked by the model router, if several models are hosted, and scored again in
+    the background by the shadow model, if any, see :mod:`src.microservice.api.routing`.
+
+    :return: JSON with the ``predictions`` in the same order as the rows and the ``model_version`` used, or the
+        binary predictions with the version in the ``X-Model-Version`` header
+    """
+    pipeline = app.extensions.get("inference_pipeline")
+    if pipeline is None:
+        return jsonify({"error": "Model not loaded"}), 503
+
+    router = app.extensions.get("model_router")
+    if router is not None:
+        pipeline = router.choose(default=pipeline)
+
+    content_type = media_type(request.content_type)
+    if content_type not in MEDIA_TYPES:
+        return jsonify({"error": f"Unsupported media type {content_type}, expected one of {MEDIA_TYPES}"}), 415
+
+    # the format of the request first, so a wildcard Accept gets it back
+    accept = request.accept_mimetypes.best_match([content_type, *MEDIA_TYPES], default=content_type)
+
+    with STAGE_SECONDS["parse"].time():
+        body = request.get_json(silent=True) if content_type == JSON else request.get_data()
+
+    try:
+        with STAGE_SECONDS["validation"].time():
+            data, dtype = decode_batch(body=body, content_type=content_type, columns=request.headers.get("X-Columns"))
+
+    except (ValueError, TypeError) as err:
+        return jsonify({"error": str(err)}), 400
+
+    # the request finishes on this version even if a new one is swapped in meanwhile
+    start = time.perf_counter()
+    with pipeline.serving():
+        predictions = score(pipeline=pipeline, data=data, deadline=g.deadline)
+
+    shadow = app.extensions.get("shadow_scorer")
+    if shadow is not None:
+        # scored in the background, the response doesn't wait for the challenger
+        shadow.submit(
+            data=data,
+            predictions=predictions,
+            model_version=pipeline.version,
+            latency_ms=(time.perf_counter() - start) * 1e3,
+        )
+
+    with STAGE_SECONDS["serialization"].time():
+        if accept == JSON:
+            response = jsonify({"predictions": predictions.tolist(), "model_version": pipeline.version})
+        else:
+            response = Response(
+                encode_predictions(
+                    predictions=predictions, content_type=accept, model_version=pipeline.version, dtype=dtype
+                ),
+                mimetype=accept,
+                headers={"X-Model-Version": pipeline.version},
+            )
+
+    return response, 200
+
+
+@app.post("/predict/stream")
+@admitted
+def predict_stream():
+    """
+    Score an NDJSON or CSV upload in chunks of ``STREAM_CHUNK_ROWS`` rows (or the ``chunk_rows`` query parameter) and
+    stream the predictions back with chunked transfer encoding, see :mod:`src.microservice.api.streaming`. The rows
+    are scored directly by the pipeline of :func:`predict`, without the micro-batcher and the prediction cache.
+
+    :return: the predictions in the format of the request, one line per row in the same order, with the model version
+        in the ``X-Model-Version`` header
+    """
+    pipeline = app.extensions.get("inference_pipeline")
+    if pipeline is None:
+        return jsonify({"error": "Model not loaded"}), 503
+
+    content_type = media_type(request.content_type)
+    if content_type not in STREAM_MEDIA_TYPES:
+        return jsonify({"error": f"Unsupported media type {content_type}, expected one of {STREAM_MEDIA_TYPES}"}), 415
+
+    chunk_rows = request.args.get("chunk_rows", app.config.get("STREAM_CHUNK_ROWS", 10_000), type=int)
+    if chunk_rows < 1:
+        return jsonify({"error": f"chunk_rows must be greater than 0, got {chunk_rows}"}), 400
+
+    chunks = iter_chunks(stream=request.stream, content_type=content_type, chunk_rows=chunk_rows)
+
+    # the first chunk is read before answering, so an invalid upload is a 400 and not an error line
+    try:
+        first = next(chunks)
+    except StopIteration:
+        return jsonify({"error": "Empty body, expected one district row per line"}), 400
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+
+    return Response(
+        stream_with_context(
+            stream_predictions(pipeline=pipeline, chunks=itertools.chain([first], chunks), content_type=content_type)
+        ),
+        mimetype=content_type,
+        headers={"X-Model-Version": pipeline.version},
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Expose the metrics of the service (latency per stage, micro-batch sizes, queue depth and cache statistics)
+    in Prometheus text format.
+
+    :return: metrics of this worker process
+    """
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
 # e.g. /main/id1=1;id2=1;id3="2"
 @app.get("/main/id1=<int:id_1>;id2=<int:id_2>;id3=<id_3>")
+@admitted
 def main_request(id_1: int, id_2: int, id_3: str):
     """
-    Main method to execute the main reque
+    Predict the median house value of a district identified by its ids, with the features precomputed in the
+    feature store, or with its raw attributes read from the database if they aren't precomputed for the loaded model.
 
-    :param id_1:
+    :param id_1: first id of the district
     :type id_1: int
 
-    :param id_2:
+    :param id_2: second id of the district
     :type id_2: int
 
-    :param id_3:
+    :param id_3: third id of the district, optionally quoted
     :type id_3: str
 
-    :returns: <X>
+    :returns: the prediction with the model version and its source (``feature_store`` or ``database``), 404 if the
+        district doesn't exist or 503 if the model or the feature store isn't loaded
     """
-    logger = get_logger(level=app.config["LOGGER_LEVEL"])
+    logger = app.logger
+    district_id = (id_1, id_2, id_3.strip('"'))
 
     try:
-        logger.info(f"Received request: simId={id_1};projId={id_2};projVersion={id_3}")
+        logger.info("Received request", extra={"simId": id_1, "projId": id_2, "projVersion": id_3})
 
-        status, exc = 200, ""
+        store = app.extensions.get("feature_store")
+        pipeline = app.extensions.get("inference_pipeline")
+        if store is None or pipeline is None:
+            return jsonify({"error": "Feature store or model not loaded"}), 503
 
-        if exc == "" and status == 200:
-            return "Success!", status
-        else:
-            raise exc
+        with pipeline.serving():
+            check_deadline(deadline=g.deadline)
+            prediction, source = store.predict(pipeline=pipeline, district_id=district_id)
+
+        return jsonify(
+            {"id": list(district_id), "prediction": prediction, "model_version": pipeline.version, "source": source}
+        )
 
-    except ConnectionError as err:
+    except Rejected:
+        raise
+
+    except KeyError as err:
         status = 404
+        response = {"error": str(err).strip("'")}
+        logger.warning(response["error"])
+
+    except (ConnectionError, TimeoutError) as err:
+        status = 503
+        response = {"error": f"Database not available: {err}"}
         logger.exception(err)
 
     except Exception as err:
         status = 400
+        response = {"error": str(err)}
         logger.exception(f"Unexpected error: {err}\n{traceback.format_exc()}")
 
-    response = ""
     return jsonify(response), status
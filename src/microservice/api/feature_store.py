@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.feature_store
+   :synopsis: Local store of precomputed district features served by the ``/main/id1=...;id2=...;id3=...`` route.
+
+              The transformed feature vectors of the districts live in a memory-mapped ``features.npy`` matrix and a
+              hash index maps each district id to its row, so scoring an id costs a lookup and a predict, without
+              feature engineering. The raw districts and the index are kept in ``districts.sqlite``, the stand-in
+              of the database of ``DB_NAME``, accessed through a :class:`ConnectionPool`. Districts without
+              precomputed features, or features of another model version, are read from the database and transformed.
+
+              Build it with ``python -m src.microservice.api.feature_store --districts <csv> --model <joblib>``.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import argparse
+import os
+import pathlib
+import queue
+import sqlite3
+
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
+
+import numpy
+import pandas
+
+from src.microservice.api.constants import FEATURE_COLUMNS, NUMERICAL_COLUMNS
+from src.microservice.api.inference import InferencePipeline, validate_frame
+
+FEATURES_FILE = "features.npy"
+DATABASE_FILE = "districts.sqlite"
+ID_COLUMNS = ["id1", "id2", "id3"]
+
+DistrictId = tuple[int, int, str]
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections shared by the request threads.
+
+    The connections are opened on demand, and again in a forked process since they must not cross a fork.
+
+    :param path: file path of the SQLite database
+    :type path: str | pathlib.Path
+
+    :param size: maximum number of open connections
+    :type size: int
+
+    :param timeout: seconds to wait for a free connection
+    :type timeout: float
+    """
+
+    def __init__(self, path: Union[str, pathlib.Path], size: int = 4, timeout: float = 5.0) -> None:
+        if size < 1:
+            raise ValueError(f"size must be greater than 0, got {size}")
+
+        self.path = str(path)
+        self.size = size
+        self.timeout = timeout
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots: queue.Queue = queue.Queue()
+        for _ in range(self.size):
+            self._slots.put(None)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection for the block.
+
+        :raises TimeoutError: if no connection is free after ``timeout`` seconds
+        """
+        if self._pid != os.getpid():
+            self._reset()
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                self._slots.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No free connection to {self.path} after {self.timeout} seconds")
+
+            try:
+                conn = self._idle.get_nowait()
+                self._slots.put(None)
+            except queue.Empty:
+                conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+        self._reset()
+
+
+class FeatureStore:
+    """
+    Precomputed district features with a hash index from district id to row, see the module documentation.
+
+    :param directory: directory with the files created by :func:`build_feature_store`
+    :type directory: str | pathlib.Path
+
+    :param pool_size: connections of the database pool
+    :type pool_size: int
+
+    :ivar model_version: version of the model whose preprocessor computed the features
+    :vartype model_version: str
+    """
+
+    def __init__(self, directory: Union[str, pathlib.Path], pool_size: int = 4) -> None:
+        directory = pathlib.Path(directory)
+
+        self.features = numpy.load(directory / FEATURES_FILE, mmap_mode="r")
+        self.pool = ConnectionPool(path=directory / DATABASE_FILE, size=pool_size)
+
+        with self.pool.connection() as conn:
+            self.index: dict[DistrictId, int] = {
+                (id1, id2, id3): row for id1, id2, id3, row in conn.execute("SELECT id1, id2, id3, row FROM offsets")
+            }
+            self.model_version = dict(conn.execute("SELECT key, value FROM metadata"))["model_version"]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def features_of(self, district_id: DistrictId) -> Optional[numpy.ndarray]:
+        """
+        Precomputed features of a district.
+
+        :param district_id: ``(id1, id2, id3)`` of the district
+        :type district_id: tuple[int, int, str]
+
+        :return: a (1, n_features) view of the memory-mapped matrix, None if the district isn't indexed
+        :rtype: numpy.ndarray | None
+        """
+        row = self.index.get(district_id)
+
+        return None if row is None else self.features[row : row + 1]
+
+    def district(self, district_id: DistrictId) -> Optional[pandas.DataFrame]:
+        """
+        Raw attributes of a district read from the database.
+
+        :param district_id: ``(id1, id2, id3)`` of the district
+        :type district_id: tuple[int, int, str]
+
+        :return: one district row, None if the district doesn't exist
+        :rtype: pandas.DataFrame | None
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(FEATURE_COLUMNS)} FROM districts WHERE id1 = ? AND id2 = ? AND id3 = ?",
+                district_id,
+            ).fetchone()
+
+        return None if row is None else validate_frame(frame=pandas.DataFrame([row], columns=FEATURE_COLUMNS))
+
+    def predict(self, pipeline: InferencePipeline, district_id: DistrictId) -> tuple[float, str]:
+        """
+        Score a district, with its precomputed features if they were computed by the version of ``pipeline``.
+
+        :param pipeline: pipeline scoring the district
+        :type pipeline: InferencePipeline
+
+        :param district_id: ``(id1, id2, id3)`` of the district
+        :type district_id: tuple[int, int, str]
+
+        :raises KeyError: if the district doesn't exist
+        :return: prediction and its source, ``"feature_store"`` or ``"database"``
+        :rtype: tuple[float, str]
+        """
+        features = self.features_of(district_id) if pipeline.version == self.model_version else None
+
+        if features is not None:
+            return float(pipeline.predict_features(features=features)[0]), "feature_store"
+
+        data = self.district(district_id)
+        if data is None:
+            raise KeyError(f"District {district_id} not found")
+
+        return float(pipeline.predict(data=data)[0]), "database"
+
+    def close(self) -> None:
+        """Close the connections of the database pool."""
+        self.pool.close()
+
+
+def build_feature_store(
+    pipeline: InferencePipeline, districts: pandas.DataFrame, directory: Union[str, pathlib.Path]
+) -> pathlib.Path:
+    """
+    Transform the districts once and write the feature matrix, the raw districts and the index.
+
+    :param pipeline: pipeline whose preprocessor computes the features
+    :type pipeline: InferencePipeline
+
+    :param districts: districts with the :data:`ID_COLUMNS`, unique per district, and the :data:`FEATURE_COLUMNS`
+    :type districts: pandas.DataFrame
+
+    :param directory: output directory, existing files are replaced
+    :type directory: str | pathlib.Path
+
+    :raises ValueError: if the ids are missing or duplicated
+    :return: the output directory
+    :rtype: pathlib.Path
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    missing_ids = [col for col in ID_COLUMNS if col not in districts.columns]
+    if missing_ids:
+        raise ValueError(f"Missing id columns {missing_ids}")
+
+    ids = districts[ID_COLUMNS].astype({"id1": int, "id2": int, "id3": str})
+    if ids.duplicated().any():
+        raise ValueError("Duplicated district ids")
+
+    data = validate_frame(frame=districts)
+    features = numpy.ascontiguousarray(pipeline.transform(data=data), dtype=numpy.float64)
+    numpy.save(directory / FEATURES_FILE, features)
+
+    rows = pandas.concat([ids.reset_index(drop=True), data.reset_index(drop=True)], axis=1)
+    (directory / DATABASE_FILE).unlink(missing_ok=True)
+
+    with sqlite3.connect(directory / DATABASE_FILE) as conn:
+        numerical = ", ".join(f"{col} REAL" for col in NUMERICAL_COLUMNS)
+        conn.executescript(
+            f"CREATE TABLE districts (id1 INTEGER, id2 INTEGER, id3 TEXT, {numerical}, ocean_proximity TEXT, "
+            "PRIMARY KEY (id1, id2, id3));"
+            "CREATE TABLE offsets (id1 INTEGER, id2 INTEGER, id3 TEXT, row INTEGER, PRIMARY KEY (id1, id2, id3));"
+            "CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        conn.executemany(
+            f"INSERT INTO districts VALUES ({', '.join('?' * rows.shape[1])})",
+            rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None),
+        )
+        conn.executemany(
+            "INSERT INTO offsets VALUES (?, ?, ?, ?)",
+            ((*district_id, row) for row, district_id in enumerate(ids.itertuples(index=False, name=None))),
+        )
+        conn.execute("INSERT INTO metadata VALUES ('model_version', ?)", (pipeline.version,))
+
+    return directory
+
+
+if __name__ == "__main__":
+    from src.microservice.api.config import Config
+
+    parser = argparse.ArgumentParser("Build the district feature store")
+    parser.add_argument("--districts", required=True, help="CSV with the id1, id2, id3 and input columns")
+    parser.add_argument("--model", default=Config.MODEL_PATH, help="joblib artifact of the inference pipeline")
+    parser.add_argument("--output", default=Config.FEATURE_STORE_DIR, help="Output directory")
+    args = parser.parse_args()
+
+    store_dir = build_feature_store(
+        pipeline=InferencePipeline.load(path=args.model),
+        districts=pandas.read_csv(args.districts, engine="pyarrow"),
+        directory=args.output,
+    )
+    print(f"Feature store written to {store_dir}")
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.formats
+   :synopsis: Binary formats of the prediction batches, negotiated with the ``Content-Type`` and ``Accept`` headers.
+
+              - ``application/json``: see :func:`src.microservice.api.inference.payload_to_frame`
+              - ``application/vnd.apache.arrow.stream``: Arrow IPC stream with one column per input feature
+              - ``application/x-npy``: NumPy ``.npy`` float matrix, with its column names in the ``X-Columns``
+                header (by default :data:`FEATURE_COLUMNS`). ``ocean_proximity`` is the index of the category in
+                :data:`exper.constant.OCEAN_PROXIMITY`, NaN if missing
+
+              The binary bodies are decoded as views of the request buffer, without building Python objects per
+              value.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import io
+
+from typing import Optional, Union
+
+import numpy
+import pandas
+
+from exper.constant import OCEAN_PROXIMITY
+from exper.utils.lazy import lazy_import
+from src.microservice.api.constants import CATEGORICAL_COLUMNS, FEATURE_COLUMNS
+from src.microservice.api.inference import payload_to_frame, validate_frame
+
+pyarrow = lazy_import("pyarrow")
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NPY = "application/x-npy"
+MEDIA_TYPES = [JSON, ARROW_STREAM, NPY]
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """
+    Media type of a ``Content-Type`` header without its parameters, e.g. ``application/json; charset=utf-8``.
+
+    :param content_type: header value, JSON if empty
+    :type content_type: str | None
+
+    :return: lower-cased media type
+    :rtype: str
+    """
+    return (content_type or JSON).split(";")[0].strip().lower()
+
+
+def arrow_to_frame(body: bytes) -> pandas.DataFrame:
+    """
+    Decode an Arrow IPC stream into district rows, the numerical columns without nulls are zero-copy.
+
+    :param body: Arrow IPC stream
+    :type body: bytes
+
+    :raises ValueError: if the body isn't an Arrow stream
+    :return: decoded district rows
+    :rtype: pandas.DataFrame
+    """
+    try:
+        table = pyarrow.ipc.open_stream(pyarrow.py_buffer(body)).read_all()
+    except pyarrow.ArrowInvalid as err:
+        raise ValueError(f"Invalid Arrow IPC stream: {err}")
+
+    return table.to_pandas()
+
+
+def npy_to_frame(body: bytes, columns: Optional[list[str]] = None) -> tuple[pandas.DataFrame, numpy.dtype]:
+    """
+    Decode a ``.npy`` float matrix into district rows. The matrix is a view of ``body``, not a copy.
+
+    :param body: ``.npy`` file with a 2-dimensional float or integer matrix, one column per name of ``columns``
+    :type body: bytes
+
+    :param columns: names of the columns of the matrix, by default :data:`FEATURE_COLUMNS`
+    :type columns: list[str]
+
+    :raises ValueError: if the body isn't a numeric ``.npy`` matrix with a column per name, or has unknown
+        ``ocean_proximity`` codes
+    :return: decoded district rows and the dtype of the matrix
+    :rtype: tuple[pandas.DataFrame, numpy.dtype]
+    """
+    columns = columns or FEATURE_COLUMNS
+    buffer = io.BytesIO(body)
+
+    try:
+        version = numpy.lib.format.read_magic(buffer)
+        if version == (1, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(buffer)
+        else:
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(buffer)
+    except ValueError as err:
+        raise ValueError(f"Invalid .npy body: {err}")
+
+    if dtype.kind not in "fiu" or len(shape) != 2 or shape[1] != len(columns):
+        raise ValueError(f"Expected a numeric .npy matrix with the columns {columns}, got {dtype} of shape {shape}")
+
+    matrix = numpy.frombuffer(body, dtype=dtype, count=shape[0] * shape[1], offset=buffer.tell())
+    matrix = matrix.reshape(shape, order="F" if fortran_order else "C")
+
+    frame = pandas.DataFrame({col: matrix[:, idx] for idx, col in enumerate(columns)})
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in frame.columns:
+            frame[col] = codes_to_categories(codes=frame[col].to_numpy())
+
+    return frame, dtype
+
+
+def codes_to_categories(codes: numpy.ndarray) -> numpy.ndarray:
+    """Map ``ocean_proximity`` codes to their category, NaN codes are missing values."""
+    n_categories = len(OCEAN_PROXIMITY)
+    codes = codes.astype(numpy.float64)
+    missing = numpy.isnan(codes)
+
+    if not (missing | ((codes >= 0) & (codes < n_categories) & (codes == numpy.floor(codes)))).all():
+        raise ValueError(f"ocean_proximity codes must be integers between 0 and {n_categories - 1} or NaN")
+
+    categories = numpy.array([*OCEAN_PROXIMITY, numpy.nan], dtype=object)
+
+    return categories[numpy.where(missing, n_categories, codes).astype(numpy.intp)]
+
+
+def decode_batch(
+    body: Union[bytes, list, dict, None], content_type: str, columns: Optional[str] = None
+) -> tuple[pandas.DataFrame, numpy.dtype]:
+    """
+    Decode the body of a prediction request in any of the :data:`MEDIA_TYPES`.
+
+    :param body: raw body, or the parsed JSON for ``application/json``
+    :type body: bytes | list | dict | None
+
+    :param content_type: media type of the body, see :func:`media_type`
+    :type content_type: str
+
+    :param columns: comma-separated column names of a ``.npy`` matrix, the ``X-Columns`` header
+    :type columns: str | None
+
+    :raises ValueError: if the body is invalid for its media type or the media type isn't supported
+    :return: validated district rows and the float dtype of the predictions in the response
+    :rtype: tuple[pandas.DataFrame, numpy.dtype]
+    """
+    if content_type == JSON:
+        return payload_to_frame(payload=body), numpy.dtype(numpy.float64)
+
+    if content_type == ARROW_STREAM:
+        return validate_frame(frame=arrow_to_frame(body=body)), numpy.dtype(numpy.float64)
+
+    if content_type == NPY:
+        names = [col.strip() for col in columns.split(",")] if columns else None
+        frame, dtype = npy_to_frame(body=body, columns=names)
+        return validate_frame(frame=frame), dtype if dtype.kind == "f" else numpy.dtype(numpy.float64)
+
+    raise ValueError(f"Unsupported media type {content_type}, expected one of {MEDIA_TYPES}")
+
+
+def encode_predictions(
+    predictions: numpy.ndarray, content_type: str, model_version: str, dtype: numpy.dtype = numpy.float64
+) -> bytes:
+    """
+    Encode the predictions in a binary media type.
+
+    :param predictions: one prediction per row
+    :type predictions: numpy.ndarray
+
+    :param content_type: :data:`ARROW_STREAM` (a ``prediction`` column, the version in the schema metadata) or
+        :data:`NPY` (a vector)
+    :type content_type: str
+
+    :param model_version: version of the model that scored the rows
+    :type model_version: str
+
+    :param dtype: float dtype of the predictions
+    :type dtype: numpy.dtype
+
+    :return: encoded predictions
+    :rtype: bytes
+    """
+    predictions = numpy.ascontiguousarray(predictions, dtype=dtype)
+
+    if content_type == NPY:
+        sink = io.BytesIO()
+        numpy.lib.format.write_array(sink, predictions, allow_pickle=False)
+        return sink.getvalue()
+
+    table = pyarrow.table({"prediction": predictions}).replace_schema_metadata({"model_version": model_version})
+    sink = pyarrow.BufferOutputStream()
+
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
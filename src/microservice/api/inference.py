@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.inference
+   :synopsis: Fitted California preprocessor and regressor used by the service to score batches of districts.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import pathlib
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from typing import Any, Iterator, Optional, Union
+
+import joblib
+import numpy
+import pandas
+
+from src.experiments.fused_preprocessor import FusedPreprocessor, compile_preprocessor
+from src.microservice.api.constants import CATEGORICAL_COLUMNS, FEATURE_COLUMNS, NUMERICAL_COLUMNS, SAMPLE_DISTRICT
+from src.microservice.api.metrics import STAGE_SECONDS
+
+
+def payload_to_frame(payload: Union[list, dict]) -> pandas.DataFrame:
+    """
+    Convert the JSON body of a prediction request into a DataFrame of district rows.
+
+    Two layouts are accepted:
+        - array-of-objects (records): ``[{"longitude": -122.2, ...}, {"longitude": -121.9, ...}]``
+        - columnar: ``{"longitude": [-122.2, -121.9], "latitude": [37.8, 37.4], ...}``
+
+    A single object with scalar values is treated as a batch of one row.
+
+    :param payload: parsed JSON body
+    :type payload: list | dict
+
+    :raises ValueError: if the payload is empty, has an invalid layout, misses columns or has non-numeric values in
+        the numerical columns
+    :return: district rows with the columns in :data:`FEATURE_COLUMNS` order
+    :rtype: pandas.DataFrame
+    """
+    if not payload:
+        raise ValueError("Empty payload, expected an array of district rows or a columnar object")
+
+    if isinstance(payload, dict) and not any(isinstance(value, list) for value in payload.values()):
+        payload = [payload]
+
+    if not isinstance(payload, (list, dict)):
+        raise ValueError(f"Invalid payload of type {type(payload).__name__}, expected an array or an object")
+
+    return validate_frame(frame=pandas.DataFrame(payload))
+
+
+def validate_frame(frame: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Check that a decoded batch has all the input columns and cast them to the dtypes the pipeline expects.
+
+    :param frame: decoded district rows, e.g. from JSON, Arrow or NumPy, see :mod:`formats`
+    :type frame: pandas.DataFrame
+
+    :raises ValueError: if the batch has no rows, misses columns or has non-numeric values in the numerical columns
+    :return: district rows with the columns in :data:`FEATURE_COLUMNS` order
+    :rtype: pandas.DataFrame
+    """
+    if not len(frame):
+        raise ValueError("Empty batch, expected at least one district row")
+
+    missing_columns = [col for col in FEATURE_COLUMNS if col not in frame.columns]
+    if missing_columns:
+        raise ValueError(f"Missing columns {missing_columns} in the payload")
+
+    # column by column, selecting and casting the whole frame costs milliseconds on small batches
+    columns = {col: frame[col].to_numpy(dtype=numpy.float64) for col in NUMERICAL_COLUMNS}
+    columns.update({col: frame[col].to_numpy(dtype=object) for col in CATEGORICAL_COLUMNS})
+
+    return pandas.DataFrame(columns, columns=FEATURE_COLUMNS, copy=False)
+
+
+class InferencePipeline:
+    """
+    Fitted preprocessor and regressor that score a whole batch of districts in one vectorized call.
+
+    :param preprocessor: fitted :class:`CaliforniaPreprocessor` (or any object holding a fitted ``transformer``)
+    :type preprocessor: Any
+
+    :param model: fitted regressor exposing ``predict`` (scikit-learn estimator or keras model)
+    :type model: Any
+
+    :param version: identifier of the model artifact, returned with every prediction
+    :type version: str
+
+    :ivar kernel: fused kernel used instead of the transformer once :meth:`compile` is called
+    :vartype kernel: FusedPreprocessor | None
+
+    :ivar path: artifact the pipeline was loaded from, None if it wasn't loaded with :meth:`load`
+    :vartype path: pathlib.Path | None
+
+    :ivar warmed_up: whether :meth:`warm_up` ran, the service is ready once it's set
+    :vartype warmed_up: bool
+    """
+
+    def __init__(self, preprocessor: Any, model: Any, version: str = "") -> None:
+        self.preprocessor = preprocessor
+        self.model = model
+        self.version = version
+        self.kernel: Optional[FusedPreprocessor] = None
+        self.path: Optional[pathlib.Path] = None
+        self.warmed_up = False
+        self._batch_features: Optional[numpy.ndarray] = None
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests being scored with the pipeline."""
+        return self._in_flight
+
+    @contextmanager
+    def serving(self) -> Iterator["InferencePipeline"]:
+        """Count a request as in flight while the block runs, see :meth:`wait_drained`."""
+        with self._idle:
+            self._in_flight += 1
+
+        try:
+            yield self
+        finally:
+            with self._idle:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def wait_drained(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no request is in flight, e.g. before releasing a pipeline swapped out by a new version.
+
+        :param timeout: maximum seconds to wait
+        :type timeout: float
+
+        :return: whether the pipeline was drained before the timeout
+        :rtype: bool
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._in_flight, timeout=timeout)
+
+    def warm_up(self, batch_sizes: tuple = (1,), rounds: int = 2) -> dict[int, list[float]]:
+        """
+        Score a canned batch of each size ``rounds`` times, so the buffers, caches, lazy initializations and compiled
+        graphs (e.g. XLA of a keras model, one per input shape) of the pipeline are ready before it serves traffic.
+
+        :param batch_sizes: number of rows of each warm-up batch, one per batch-size bucket served
+        :type batch_sizes: tuple
+
+        :param rounds: calls per batch size, the first one pays the initializations
+        :type rounds: int
+
+        :raises ValueError: if the pipeline returns a wrong number of predictions or non-finite ones
+        :return: seconds of each call per batch size
+        :rtype: dict[int, list[float]]
+        """
+        timings = {}
+
+        for batch_size in batch_sizes:
+            data = payload_to_frame(payload={col: [value] * batch_size for col, value in SAMPLE_DISTRICT.items()})
+            timings[batch_size] = []
+
+            for _ in range(rounds):
+                start = time.perf_counter()
+                predictions = self.predict(data=data, record=False)
+                timings[batch_size].append(time.perf_counter() - start)
+
+                if predictions.shape != (batch_size,) or not numpy.isfinite(predictions).all():
+                    raise ValueError(f"Warm-up of model {self.version} with {batch_size} rows returned {predictions}")
+
+        self.warmed_up = True
+
+        return timings
+
+    @property
+    def transformer(self) -> Any:
+        """Fitted ``ColumnTransformer`` with the feature engineering logic."""
+        return getattr(self.preprocessor, "transformer", self.preprocessor)
+
+    def compile(self) -> "InferencePipeline":
+        """
+        Compile the fitted transformer into a fused NumPy kernel used by :meth:`transform` from now on.
+
+        :raises ValueError: if the transformer has steps the kernel doesn't support
+        :return: the pipeline itself
+        :rtype: InferencePipeline
+        """
+        self.kernel = compile_preprocessor(transformer=self.transformer)
+        self._batch_features = None
+
+        return self
+
+    def transform(self, data: pandas.DataFrame, out: Optional[numpy.ndarray] = None) -> numpy.ndarray:
+        """
+        Apply the feature engineering to a batch of district rows.
+
+        :param data: district rows
+        :type data: pandas.DataFrame
+
+        :param out: array of shape (rows, features) the fused kernel writes the features into, ignored without the
+            kernel. By default, a new array is allocated
+        :type out: numpy.ndarray | None
+
+        :return: transformed features
+        :rtype: numpy.ndarray
+        """
+        if self.kernel is not None:
+            return self.kernel.transform(X=data, out=out)
+
+        transformer = self.transformer
+        columns = getattr(transformer, "feature_names_in_", FEATURE_COLUMNS)
+
+        return transformer.transform(X=data[columns])
+
+    def predict(
+        self, data: pandas.DataFrame, record: bool = True, out: Optional[numpy.ndarray] = None
+    ) -> numpy.ndarray:
+        """
+        Predict the median house value of a batch of district rows.
+
+        :param data: district rows
+        :type data: pandas.DataFrame
+
+        :param record: observe the stage latencies in the serving histograms, off for the calls outside the serving
+            path (shadow scoring, warm-up) so they don't skew the latency metrics
+        :type record: bool
+
+        :param out: buffer for the transformed features, see :meth:`transform`
+        :type out: numpy.ndarray | None
+
+        :return: one prediction per row
+        :rtype: numpy.ndarray
+        """
+        with STAGE_SECONDS["transform"].time() if record else nullcontext():
+            features = self.transform(data=data, out=out)
+
+        return self.predict_features(features=features, record=record)
+
+    def predict_batch(self, data: pandas.DataFrame) -> numpy.ndarray:
+        """
+        Predict as :meth:`predict`, writing the features of the fused kernel into a buffer reused across calls.
+
+        The buffer is shared, so only the single thread flushing the :class:`MicroBatcher` may call it.
+
+        :param data: district rows
+        :type data: pandas.DataFrame
+
+        :return: one prediction per row
+        :rtype: numpy.ndarray
+        """
+        if self.kernel is None:
+            return self.predict(data=data)
+
+        if self._batch_features is None or len(self._batch_features) < len(data):
+            self._batch_features = numpy.empty((len(data), self.kernel.n_features_out))
+
+        return self.predict(data=data, out=self._batch_features[: len(data)])
+
+    def predict_features(self, features: numpy.ndarray, record: bool = True) -> numpy.ndarray:
+        """
+        Predict from features already transformed by the preprocessor, e.g. precomputed in the feature store.
+
+        :param features: transformed rows
+        :type features: numpy.ndarray
+
+        :param record: observe the stage latency in the serving histograms
+        :type record: bool
+
+        :return: one prediction per row
+        :rtype: numpy.ndarray
+        """
+        with STAGE_SECONDS["predict"].time() if record else nullcontext():
+            return numpy.asarray(self.model.predict(features), dtype=numpy.float64).reshape(-1)
+
+    def dump(self, path: Union[str, pathlib.Path]) -> None:
+        """
+        Serialize the pipeline into a joblib artifact.
+
+        :param path: file path of the artifact
+        :type path: str | pathlib.Path
+        """
+        joblib.dump(
+            value={"preprocessor": self.preprocessor, "model": self.model, "version": self.version}, filename=path
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, pathlib.Path], mmap_mode: Optional[str] = None) -> "InferencePipeline":
+        """
+        Load a pipeline from a joblib artifact created with :meth:`dump`.
+
+        If the artifact doesn't define a version, the file name is used as version.
+
+        :param path: file path of the artifact
+        :type path: str | pathlib.Path
+
+        :param mmap_mode: if set, e.g. ``"r"``, the numpy arrays of the artifact (coefficients, centroids, scales ...)
+            are memory-mapped instead of copied into the process memory. The pages are backed by the file, so
+            processes forked after loading keep sharing them, no matter the reference counting of their wrappers
+        :type mmap_mode: str
+
+        :return: loaded pipeline
+        :rtype: InferencePipeline
+        """
+        path = pathlib.Path(path)
+        artifact = joblib.load(filename=path, mmap_mode=mmap_mode)
+
+        pipeline = cls(
+            preprocessor=artifact["preprocessor"],
+            model=artifact["model"],
+            version=artifact.get("version") or path.stem,
+        )
+        pipeline.path = path
+
+        return pipeline
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.log
+   :synopsis: Non-blocking structured logging of the service. Records are put in a queue by the request threads and
+              written as JSON lines by a background :class:`logging.handlers.QueueListener`, so a slow stream never
+              stalls a request. High-volume records can be sampled before being queued.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# attributes of every log record, the rest are the ``extra`` fields of the call
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))) | {"message", "asctime"}
+
+# listener of each configured logger name with the pid of the process that started it
+_LISTENERS: dict[str, tuple[int, QueueListener]] = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object with its ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a random ``rate`` fraction of the records up to ``level``, the records above it are always kept.
+
+    :param rate: fraction of the records kept, between 0 and 1
+    :type rate: float
+
+    :param level: highest level sampled
+    :type level: int
+    """
+
+    def __init__(self, rate: float = 1.0, level: int = logging.INFO) -> None:
+        super().__init__()
+
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"rate must be between 0 and 1, got {rate}")
+
+        self.rate = rate
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > self.level or self.rate >= 1.0 or random.random() < self.rate
+
+
+def configure_logging(
+    logger: logging.Logger, level: int = logging.INFO, sample_rate: float = 1.0, stream=None
+) -> logging.Logger:
+    """
+    Route the records of ``logger`` through a queue to a background thread writing JSON lines to ``stream``.
+
+    It's configured once per process, later calls only update the level and sample rate. A forked worker gets its
+    own queue and listener the first time it calls it, because the thread of the parent doesn't survive the fork.
+
+    :param logger: logger to configure, e.g. ``app.logger``
+    :type logger: logging.Logger
+
+    :param level: level of the logger
+    :type level: int
+
+    :param sample_rate: fraction of the records up to INFO that are kept
+    :type sample_rate: float
+
+    :param stream: stream written by the listener, by default ``sys.stderr``
+    :type stream: io.TextIOBase
+
+    :return: the configured logger
+    :rtype: logging.Logger
+    """
+    logger.setLevel(level)
+    pid, listener = _LISTENERS.get(logger.name, (None, None))
+
+    if pid == os.getpid():
+        for hdl in logger.handlers:
+            for log_filter in hdl.filters:
+                if isinstance(log_filter, SamplingFilter):
+                    log_filter.rate = sample_rate
+        return logger
+
+    handler = logging.StreamHandler(stream=stream or sys.stderr)
+    handler.setFormatter(JsonFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(rate=sample_rate))
+
+    for hdl in logger.handlers[:]:
+        logger.removeHandler(hdl)
+
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    _LISTENERS[logger.name] = (os.getpid(), listener)
+
+    return logger
+
+
+def stop_logging(logger: Optional[logging.Logger] = None) -> None:
+    """
+    Flush the queued records and stop the listeners of this process.
+
+    :param logger: logger whose listener is stopped, all of them by default
+    :type logger: logging.Logger
+    """
+    names = list(_LISTENERS) if logger is None else [logger.name]
+
+    for name in names:
+        pid, listener = _LISTENERS.get(name, (None, None))
+        if pid == os.getpid():
+            listener.stop()
+            del _LISTENERS[name]
+
+
+atexit.register(stop_logging)
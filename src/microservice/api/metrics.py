@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.metrics
+   :synopsis: Low-overhead metrics of the service exposed on ``/metrics`` in Prometheus text format.
+
+              Histograms accumulate in per-thread buckets without locks and are merged at scrape time, so observing
+              a value costs around a microsecond. Each worker process of :mod:`server` has its own registry.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import threading
+import time
+
+from bisect import bisect_left
+from typing import Callable, Optional
+
+# latency buckets in seconds, from 50 microseconds to 5 seconds
+LATENCY_BUCKETS = (5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# rows per micro-batch
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# request handling threads are short lived, their accumulators are folded once there are this many of them
+MAX_ACCUMULATORS = 64
+
+
+def _format_labels(labels: dict, **extra) -> str:
+    """Prometheus label set, e.g. ``{stage="parse",le="0.001"}``."""
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+class _Accumulator:
+    """Buckets, sum and count of the observations of one thread."""
+
+    __slots__ = ("thread", "counts", "sum")
+
+    def __init__(self, n_buckets: int) -> None:
+        self.thread = threading.current_thread()
+        self.counts = [0] * n_buckets
+        self.sum = 0.0
+
+
+class _Timer:
+    """Context manager observing its elapsed time in a histogram."""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: "Histogram") -> None:
+        self.histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    """
+    Histogram with per-thread accumulators merged at scrape time.
+
+    :param name: metric name
+    :type name: str
+
+    :param documentation: help text of the metric
+    :type documentation: str
+
+    :param buckets: upper bounds of the buckets, sorted
+    :type buckets: tuple
+
+    :param labels: constant labels of the series
+    :type labels: dict
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS, labels: Optional[dict] = None
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels or {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._accumulators: list[_Accumulator] = []
+        # observations of the threads that already finished
+        self._retired = _Accumulator(n_buckets=len(self.buckets) + 1)
+
+    def _retire_dead_threads(self) -> None:
+        """Fold the accumulators of finished threads, must be called holding the lock."""
+        alive = []
+
+        for acc in self._accumulators:
+            if acc.thread.is_alive():
+                alive.append(acc)
+            else:
+                self._retired.counts = [total + count for total, count in zip(self._retired.counts, acc.counts)]
+                self._retired.sum += acc.sum
+
+        self._accumulators = alive
+
+    def _accumulator(self) -> _Accumulator:
+        """Accumulator of the current thread, registered the first time the thread observes a value."""
+        acc = getattr(self._local, "acc", None)
+
+        if acc is None:
+            acc = _Accumulator(n_buckets=len(self.buckets) + 1)
+
+            with self._lock:
+                if len(self._accumulators) >= MAX_ACCUMULATORS:
+                    self._retire_dead_threads()
+                self._accumulators.append(acc)
+
+            self._local.acc = acc
+
+        return acc
+
+    def observe(self, value: float) -> None:
+        """
+        Add an observation, only the accumulator of the current thread is written.
+
+        :param value: observed value
+        :type value: float
+        """
+        acc = self._accumulator()
+        acc.counts[bisect_left(self.buckets, value)] += 1
+        acc.sum += value
+
+    def time(self) -> _Timer:
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(histogram=self)
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        """
+        Merge the accumulators of all the threads.
+
+        :return: cumulative count per bucket (the last one is ``+Inf``), sum and count of the observations
+        :rtype: tuple[list[int], float, int]
+        """
+        with self._lock:
+            self._retire_dead_threads()
+            accumulators = [self._retired, *self._accumulators]
+
+        counts = [sum(acc.counts[idx] for acc in accumulators) for idx in range(len(self.buckets) + 1)]
+        total = sum(acc.sum for acc in accumulators)
+
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+
+        return cumulative, total, running
+
+    def render(self) -> list[str]:
+        """Prometheus text lines of the series."""
+        cumulative, total, count = self.snapshot()
+        bounds = [*(f"{bound:g}" for bound in self.buckets), "+Inf"]
+
+        lines = [
+            f"{self.name}_bucket{_format_labels(self.labels, le=le)} {value}" for le, value in zip(bounds, cumulative)
+        ]
+        lines.append(f"{self.name}_sum{_format_labels(self.labels)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels)} {count}")
+
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter.
+
+    :param name: metric name
+    :type name: str
+
+    :param documentation: help text of the metric
+    :type documentation: str
+
+    :param labels: constant labels of the series
+    :type labels: dict
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Optional[dict] = None) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        """Increase the counter."""
+        with self._lock:
+            self.value += amount
+
+    def render(self) -> list[str]:
+        """Prometheus text lines of the series."""
+        return [f"{self.name}{_format_labels(self.labels)} {self.value}"]
+
+
+class Gauge:
+    """
+    Gauge whose value is read with a function at scrape time, e.g. the depth of a queue.
+
+    If the function returns None the series is not exposed.
+
+    :param name: metric name
+    :type name: str
+
+    :param documentation: help text of the metric
+    :type documentation: str
+
+    :param function: function returning the current value
+    :type function: Callable[[], float | None]
+
+    :param labels: constant labels of the series
+    :type labels: dict
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, function: Callable[[], Optional[float]], labels: Optional[dict] = None
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.labels = labels or {}
+
+    def render(self) -> list[str]:
+        """Prometheus text lines of the series."""
+        value = self.function()
+        return [] if value is None else [f"{self.name}{_format_labels(self.labels)} {value}"]
+
+
+class CallbackCounter(Gauge):
+    """Counter whose value is read with a function at scrape time, e.g. counters kept by another object."""
+
+    kind = "counter"
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: list = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Add a metric to the registry.
+
+        :param metric: :class:`Histogram`, :class:`Counter` or :class:`Gauge`
+        :return: the registered metric
+        """
+        with self._lock:
+            self._metrics.append(metric)
+
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS, **labels) -> Histogram:
+        """Create and register a :class:`Histogram`."""
+        return self.register(Histogram(name=name, documentation=documentation, buckets=buckets, labels=labels))
+
+    def counter(self, name: str, documentation: str, **labels) -> Counter:
+        """Create and register a :class:`Counter`."""
+        return self.register(Counter(name=name, documentation=documentation, labels=labels))
+
+    def gauge(self, name: str, documentation: str, function: Callable[[], Optional[float]], **labels) -> Gauge:
+        """Create and register a :class:`Gauge`."""
+        return self.register(Gauge(name=name, documentation=documentation, function=function, labels=labels))
+
+    def callback_counter(
+        self, name: str, documentation: str, function: Callable[[], Optional[float]], **labels
+    ) -> CallbackCounter:
+        """Create and register a :class:`CallbackCounter`."""
+        return self.register(CallbackCounter(name=name, documentation=documentation, function=function, labels=labels))
+
+    def render(self) -> str:
+        """
+        Render all the metrics, the series of the same name are grouped under one ``HELP`` and ``TYPE``.
+
+        :return: metrics in Prometheus text exposition format
+        :rtype: str
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+
+        families: dict[str, list] = {}
+        for metric in metrics:
+            families.setdefault(metric.name, []).append(metric)
+
+        lines = []
+        for name, family in families.items():
+            lines.append(f"# HELP {name} {family[0].documentation}")
+            lines.append(f"# TYPE {name} {family[0].kind}")
+            for metric in family:
+                lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGES = ["parse", "validation", "transform", "predict", "serialization"]
+STAGE_SECONDS = {
+    stage: REGISTRY.histogram("prediction_stage_seconds", "Seconds spent per stage of a prediction", stage=stage)
+    for stage in STAGES
+}
+BATCH_ROWS = REGISTRY.histogram(
+    "prediction_micro_batch_rows", "Rows scored per micro-batch flush", buckets=BATCH_BUCKETS
+)
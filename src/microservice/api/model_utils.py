@@ -1,26 +1,290 @@
 import logging
+import os
+import pathlib
 
-from src.microservice.api.endpoint import app
+from typing import Optional, Union
+
+from flask import Flask
+
+from src.microservice.api.admission import AdmissionController
+from src.microservice.api.batching import MicroBatcher
+from src.microservice.api.cache import MemoryPredictionCache, PredictionCache, SQLitePredictionCache
+from src.microservice.api.feature_store import FEATURES_FILE, FeatureStore
+from src.microservice.api.inference import InferencePipeline
+from src.microservice.api.log import configure_logging
+from src.microservice.api.reload import ModelReloader
+from src.microservice.api.routing import ModelRouter, ShadowScorer
 
 
 def get_logger(level: int = logging.INFO) -> logging.Logger:
     """
-    Method to get the logger of the flask application
+    Method to get the logger of the flask application, configured once per process to write JSON lines from a
+    background thread, see :func:`src.microservice.api.log.configure_logging`. Call it at startup, the request
+    handlers use ``app.logger`` directly.
 
     :param level: level which will show the logs
     :return:
     :rtype: logging.Logger
     """
-    # remove default handler set by Flask to add new format
-    for hdl in app.logger.handlers[:]:
-        if isinstance(hdl, logging.StreamHandler):
-            app.logger.removeHandler(hdl)
+    # imported here because endpoint imports this module at import time
+    from src.microservice.api.endpoint import app
+
+    return configure_logging(
+        logger=app.logger, level=level, sample_rate=float(app.config.get("LOG_SAMPLE_RATE", 1.0))
+    )
+
+
+def build_pipeline(app: Flask, path: Union[str, pathlib.Path]) -> InferencePipeline:
+    """
+    Load a fitted inference pipeline with the settings of the application: the arrays are memory-mapped with
+    ``MODEL_MMAP_MODE`` if it's set and the preprocessor is compiled into a fused kernel if ``COMPILE_PREPROCESSOR``
+    is set.
+
+    :param app: flask application
+    :type app: flask.Flask
+
+    :param path: joblib artifact of the pipeline
+    :type path: str | pathlib.Path
+
+    :return: loaded pipeline
+    :rtype: InferencePipeline
+    """
+    pipeline = InferencePipeline.load(path=path, mmap_mode=app.config.get("MODEL_MMAP_MODE"))
+
+    if app.config.get("COMPILE_PREPROCESSOR"):
+        try:
+            pipeline.compile()
+        except ValueError as err:
+            app.logger.warning(f"Preprocessor not compiled, using the transformer instead: {err}")
+
+    return pipeline
+
+
+def load_pipeline(app: Flask) -> InferencePipeline:
+    """
+    Load the fitted inference pipeline from ``MODEL_PATH`` once and attach it to the application, so every request
+    reuses it instead of loading it again, see :func:`build_pipeline`.
+
+    :param app: flask application
+    :type app: flask.Flask
+
+    :return: loaded pipeline
+    :rtype: InferencePipeline
+    """
+    pipeline = build_pipeline(app=app, path=app.config["MODEL_PATH"])
+    app.extensions["inference_pipeline"] = pipeline
+
+    return pipeline
+
+
+def warm_up(app: Flask, pipeline: InferencePipeline) -> dict[int, list[float]]:
+    """
+    Warm up the pipeline with ``WARMUP_ROUNDS`` canned batches of each size of ``WARMUP_BATCH_SIZES`` and log the
+    timings. ``/ready`` answers 200 once the pipeline is warmed up.
+
+    :param app: flask application
+    :type app: flask.Flask
+
+    :param pipeline: loaded pipeline
+    :type pipeline: InferencePipeline
+
+    :return: seconds of each call per batch size
+    :rtype: dict[int, list[float]]
+    """
+    timings = pipeline.warm_up(
+        batch_sizes=tuple(app.config["WARMUP_BATCH_SIZES"]), rounds=int(app.config["WARMUP_ROUNDS"])
+    )
+
+    for batch_size, seconds in timings.items():
+        app.logger.info(
+            f"\t-> Warm-up of model {pipeline.version} with {batch_size} rows: "
+            f"first call {seconds[0] * 1e3:.2f} ms, last call {seconds[-1] * 1e3:.2f} ms",
+            extra={"batch_size": batch_size, "warmup_ms": [round(second * 1e3, 3) for second in seconds]},
+        )
+
+    return timings
+
+
+def create_admission_controller(app: Flask) -> Optional[AdmissionController]:
+    """
+    Create the admission controller that bounds the requests handled at once by a worker with the ``MAX_IN_FLIGHT``
+    and ``MAX_QUEUED`` of the application config.
+
+    :param app: flask application
+    :type app: flask.Flask
+
+    :return: the admission controller, None if ``MAX_IN_FLIGHT`` is None
+    :rtype: AdmissionController | None
+    """
+    if not app.config.get("MAX_IN_FLIGHT"):
+        app.extensions.pop("admission_controller", None)
+        return None
+
+    controller = AdmissionController(
+        max_in_flight=int(app.config["MAX_IN_FLIGHT"]), max_queued=int(app.config["MAX_QUEUED"])
+    )
+    app.extensions["admission_controller"] = controller
+
+    return controller
+
+
+def start_micro_batcher(app: Flask) -> MicroBatcher:
+    """
+    Start the micro-batcher that coalesces single-row requests with the ``BATCH_MAX_SIZE`` and
+    ``BATCH_MAX_WAIT_MS`` of the application config.
+
+    The batcher scores with the pipeline attached to the application at flush time.
+
+    :param app: flask application with the pipeline already loaded
+    :type app: flask.Flask
+
+    :return: running micro-batcher
+    :rtype: MicroBatcher
+    """
+    batcher = MicroBatcher(
+        predict=lambda data: app.extensions["inference_pipeline"].predict_batch(data=data),
+        max_batch_size=int(app.config["BATCH_MAX_SIZE"]),
+        max_wait_ms=float(app.config["BATCH_MAX_WAIT_MS"]),
+    ).start()
+    app.extensions["micro_batcher"] = batcher
+
+    return batcher
+
+
+def create_cache(app: Flask) -> Optional[PredictionCache]:
+    """
+    Create the prediction cache of ``CACHE_BACKEND`` and attach it to the application.
+
+    :param app: flask application
+    :type app: flask.Flask
+
+    :raises ValueError: if ``CACHE_BACKEND`` is not ``"memory"``, ``"sqlite"`` or None
+    :return: prediction cache, None if it's disabled
+    :rtype: PredictionCache | None
+    """
+    backend = app.config.get("CACHE_BACKEND")
+    kwargs = {"max_entries": int(app.config["CACHE_MAX_ENTRIES"]), "ttl": float(app.config["CACHE_TTL_SECONDS"])}
+
+    if backend is None:
+        cache = None
+
+    elif backend == "memory":
+        cache = MemoryPredictionCache(**kwargs)
+
+    elif backend == "sqlite":
+        os.makedirs(os.path.dirname(app.config["CACHE_PATH"]), exist_ok=True)
+        cache = SQLitePredictionCache(path=app.config["CACHE_PATH"], **kwargs)
+
+    else:
+        raise ValueError(f"Invalid CACHE_BACKEND {backend}. Valid values are 'memory', 'sqlite' or None")
+
+    app.extensions["prediction_cache"] = cache
+
+    return cache
+
+
+def start_model_reloader(app: Flask) -> ModelReloader:
+    """
+    Start watching ``MODEL_DIR`` every ``MODEL_RELOAD_INTERVAL`` seconds to hot swap new model versions, the
+    artifacts named like ``MODEL_RELOAD_PATTERN`` except the ones of ``MODEL_ROUTES`` and ``SHADOW_MODEL_PATH``.
+
+    :param app: flask application with the pipeline already loaded
+    :type app: flask.Flask
+
+    :return: running reloader
+    :rtype: ModelReloader
+    """
+    reloader = ModelReloader(
+        app=app,
+        directory=app.config["MODEL_DIR"],
+        pattern=app.config["MODEL_RELOAD_PATTERN"],
+        exclude=[*(app.config.get("MODEL_ROUTES") or {}), *filter(None, [app.config.get("SHADOW_MODEL_PATH")])],
+        load=lambda path: build_pipeline(app=app, path=path),
+        interval=float(app.config["MODEL_RELOAD_INTERVAL"]),
+        drain_timeout=float(app.config["MODEL_DRAIN_TIMEOUT"]),
+        warm_up=lambda pipeline: warm_up(app=app, pipeline=pipeline),
+    ).start()
+    app.extensions["model_reloader"] = reloader
+
+    return reloader
+
+
+def open_feature_store(app: Flask) -> Optional[FeatureStore]:
+    """
+    Open the precomputed district features of ``FEATURE_STORE_DIR`` served by the ``/main`` route.
+
+    :param app: flask application
+    :type app: flask.Flask
+
+    :return: the feature store, None if ``FEATURE_STORE_DIR`` wasn't built
+    :rtype: FeatureStore | None
+    """
+    directory = pathlib.Path(app.config["FEATURE_STORE_DIR"])
+
+    if not (directory / FEATURES_FILE).exists():
+        app.logger.warning(f"No feature store in {directory}, the /main route answers 503")
+        return None
+
+    store = FeatureStore(directory=directory, pool_size=int(app.config["DB_POOL_SIZE"]))
+    app.extensions["feature_store"] = store
+    app.logger.info(f"Opened feature store of {len(store)} districts for model {store.model_version}")
+
+    return store
+
+
+def create_model_router(app: Flask) -> Optional[ModelRouter]:
+    """
+    Load and warm up the alternative models of ``MODEL_ROUTES`` and route their share of the requests to them.
+
+    :param app: flask application
+    :type app: flask.Flask
+
+    :return: the router, None if ``MODEL_ROUTES`` is empty
+    :rtype: ModelRouter | None
+    """
+    routes = []
+
+    for path, weight in (app.config.get("MODEL_ROUTES") or {}).items():
+        pipeline = build_pipeline(app=app, path=path)
+        warm_up(app=app, pipeline=pipeline)
+        routes.append((pipeline, float(weight)))
+        app.logger.info(f"\t-> Routing {float(weight):.1%} of the requests to model {pipeline.version} from {path}")
+
+    if not routes:
+        app.extensions.pop("model_router", None)
+        return None
+
+    router = ModelRouter(routes=routes)
+    app.extensions["model_router"] = router
+
+    return router
+
+
+def start_shadow_scorer(app: Flask) -> Optional[ShadowScorer]:
+    """
+    Start scoring the requests again in the background with the challenger model of ``SHADOW_MODEL_PATH``, logging
+    its predictions to ``SHADOW_LOG_PATH``.
+
+    :param app: flask application
+    :type app: flask.Flask
+
+    :return: the shadow scorer, None if ``SHADOW_MODEL_PATH`` isn't set
+    :rtype: ShadowScorer | None
+    """
+    if not app.config.get("SHADOW_MODEL_PATH"):
+        app.extensions.pop("shadow_scorer", None)
+        return None
 
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
-    app.logger.addHandler(handler)
+    pipeline = build_pipeline(app=app, path=app.config["SHADOW_MODEL_PATH"])
+    warm_up(app=app, pipeline=pipeline)
 
-    app.logger.setLevel(level)
-    app.logger.propagate = False
+    scorer = ShadowScorer(
+        pipeline=pipeline,
+        log_path=app.config["SHADOW_LOG_PATH"],
+        max_workers=int(app.config["SHADOW_WORKERS"]),
+        max_pending=int(app.config["SHADOW_MAX_PENDING"]),
+    )
+    app.extensions["shadow_scorer"] = scorer
+    app.logger.info(f"\t-> Shadow scoring with model {pipeline.version}, logged to {scorer.log_path}")
 
-    return app.logger
+    return scorer
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.reload
+   :synopsis: Zero-downtime hot reload of the model. A background thread watches a directory of versioned joblib
+              artifacts, loads and warms up the newest one and swaps it in atomically. The requests in flight finish
+              on the previous version, which is released once they drain.
+
+              Only the artifacts named like :data:`ARTIFACT_PATTERN`, e.g. ``california_pipeline-20230215.joblib``,
+              are candidates, so the route and shadow models or the experiments saved in the same directory never
+              become the production model. Write the artifacts elsewhere and move them into the directory, so a
+              half-written file is never loaded.
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import pathlib
+import threading
+
+from typing import Callable, Iterable, Optional, Union
+
+from flask import Flask
+
+from src.microservice.api.inference import InferencePipeline
+from src.microservice.api.metrics import REGISTRY
+
+MODEL_RELOADS = REGISTRY.counter("model_reloads_total", "Model versions swapped in without restart")
+
+# file names of the versioned production artifacts written by the trainer
+ARTIFACT_PATTERN = "california_pipeline-*.joblib"
+
+
+class ModelReloader:
+    """
+    Watch ``directory`` and hot swap the pipeline of the application when a newer artifact appears.
+
+    :param app: flask application with the pipeline already loaded
+    :type app: flask.Flask
+
+    :param directory: directory of the versioned ``*.joblib`` artifacts
+    :type directory: str | pathlib.Path
+
+    :param pattern: glob of the file names of the versioned production artifacts in ``directory``
+    :type pattern: str
+
+    :param exclude: artifacts never swapped in even if they match ``pattern``, e.g. the routed and shadow models
+    :type exclude: Iterable[str | pathlib.Path]
+
+    :param load: function loading a pipeline from an artifact, e.g. :func:`model_utils.build_pipeline`
+    :type load: Callable[[pathlib.Path], InferencePipeline]
+
+    :param interval: seconds between two checks of the directory
+    :type interval: float
+
+    :param drain_timeout: maximum seconds to wait for the in-flight requests of the replaced pipeline
+    :type drain_timeout: float
+
+    :param warm_up: function warming up a new pipeline before swapping it in, e.g. :func:`model_utils.warm_up`
+    :type warm_up: Callable[[InferencePipeline], object]
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        directory: Union[str, pathlib.Path],
+        pattern: str = ARTIFACT_PATTERN,
+        exclude: Iterable[Union[str, pathlib.Path]] = (),
+        load: Callable[[pathlib.Path], InferencePipeline] = InferencePipeline.load,
+        interval: float = 30.0,
+        drain_timeout: float = 30.0,
+        warm_up: Callable[[InferencePipeline], object] = InferencePipeline.warm_up,
+    ) -> None:
+        self.app = app
+        self.directory = pathlib.Path(directory)
+        self.pattern = pattern
+        self.exclude = {pathlib.Path(path).resolve() for path in exclude}
+        self.load = load
+        self.interval = interval
+        self.drain_timeout = drain_timeout
+        self.warm_up = warm_up
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # artifacts already tried, with their modification time, so a broken one isn't loaded on every check
+        self._seen: dict[pathlib.Path, float] = {}
+
+        current = app.extensions.get("inference_pipeline")
+        if current is not None and current.path is not None:
+            self._seen[current.path.resolve()] = current.path.stat().st_mtime
+
+    @property
+    def running(self) -> bool:
+        """Whether the watching thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "ModelReloader":
+        """Start the background thread that watches the directory."""
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+            self._thread.start()
+
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the background thread.
+
+        :param timeout: seconds to wait for the thread to finish
+        :type timeout: float
+        """
+        self._stop.set()
+
+        if self.running:
+            self._thread.join(timeout=timeout)
+
+        self._thread = None
+
+    def latest_artifact(self) -> Optional[pathlib.Path]:
+        """
+        Newest artifact of the directory matching ``pattern`` by modification time, the excluded ones left out.
+
+        :return: path of the artifact, None if the directory has none
+        :rtype: pathlib.Path | None
+        """
+        artifacts = [
+            path for path in self.directory.glob(self.pattern) if path.is_file() and path.resolve() not in self.exclude
+        ]
+
+        return max(artifacts, key=lambda path: (path.stat().st_mtime, path.name), default=None)
+
+    def check(self) -> bool:
+        """
+        Load, warm up and swap in the newest artifact if it wasn't seen yet, then wait for the previous pipeline to
+        drain.
+
+        :return: whether a new pipeline was swapped in
+        :rtype: bool
+        """
+        path = self.latest_artifact()
+        if path is None:
+            return False
+
+        path, mtime = path.resolve(), path.stat().st_mtime
+        if self._seen.get(path) == mtime:
+            return False
+
+        self._seen[path] = mtime
+
+        try:
+            pipeline = self.load(path)
+            self.warm_up(pipeline)
+
+        except Exception as err:
+            self.app.logger.error(f"Model {path} not loaded, serving the previous version: {err}")
+            return False
+
+        previous = self.swap(pipeline=pipeline)
+        self.app.logger.warning(
+            f"Swapped model {getattr(previous, 'version', None)} for {pipeline.version} from {path}"
+        )
+
+        if previous is not None:
+            if previous.wait_drained(timeout=self.drain_timeout):
+                self.app.logger.info(f"Model {previous.version} drained and released")
+            else:
+                self.app.logger.warning(f"Model {previous.version} released with {previous.in_flight} requests")
+
+        return True
+
+    def swap(self, pipeline: InferencePipeline) -> Optional[InferencePipeline]:
+        """
+        Serve the new requests with ``pipeline``, the assignment is atomic.
+
+        :param pipeline: warmed up pipeline
+        :type pipeline: InferencePipeline
+
+        :return: the replaced pipeline
+        :rtype: InferencePipeline | None
+        """
+        previous = self.app.extensions.get("inference_pipeline")
+        self.app.extensions["inference_pipeline"] = pipeline
+        MODEL_RELOADS.inc()
+
+        return previous
+
+    def _run(self) -> None:
+        """Check the directory every ``interval`` seconds until stopped."""
+        while not self._stop.wait(timeout=self.interval):
+            try:
+                self.check()
+            except Exception as err:
+                self.app.logger.error(f"Model reload check failed: {err}")
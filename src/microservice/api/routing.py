@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.routing
+   :synopsis: Hosting several models at once: weighted routing of the traffic between them and shadow scoring of a
+              challenger model.
+
+              - :class:`ModelRouter` sends a share of the requests to each model of ``MODEL_ROUTES``, the rest to the
+                main pipeline (the one of ``MODEL_PATH``, hot reloaded from ``MODEL_DIR``)
+              - :class:`ShadowScorer` scores the rows of the answered requests again with the model of
+                ``SHADOW_MODEL_PATH`` on a background executor and appends its predictions and latency to an NDJSON
+                log for offline comparison. The response never waits for it, and the shadow requests are dropped
+                when the executor falls behind
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import bisect
+import itertools
+import json
+import os
+import pathlib
+import random
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union
+
+import numpy
+import pandas
+
+from src.microservice.api.inference import InferencePipeline
+from src.microservice.api.metrics import REGISTRY
+
+SHADOW_SCORES = REGISTRY.counter("shadow_scores_total", "Requests scored again by the shadow model")
+SHADOW_DROPPED = REGISTRY.counter("shadow_dropped_total", "Shadow requests dropped because the executor fell behind")
+SHADOW_ERRORS = REGISTRY.counter("shadow_errors_total", "Shadow requests that failed")
+
+
+class ModelRouter:
+    """
+    Weighted random choice of the model scoring each request.
+
+    :param routes: alternative pipelines and the share of the requests routed to each of them, the remaining share
+        goes to the main pipeline passed to :meth:`choose`
+    :type routes: list[tuple[InferencePipeline, float]]
+
+    :param seed: seed of the random choice
+    :type seed: int | None
+    """
+
+    def __init__(self, routes: list[tuple[InferencePipeline, float]], seed: Optional[int] = None) -> None:
+        weights = [weight for _, weight in routes]
+
+        if any(weight < 0 for weight in weights) or sum(weights) > 1:
+            raise ValueError(f"The weights of the routes must be positive and add up to 1 at most, got {weights}")
+
+        self.pipelines = [pipeline for pipeline, _ in routes]
+        self.weights = weights
+        self._cumulative = list(itertools.accumulate(weights))
+        self._random = random.Random(seed)
+
+    def choose(self, default: InferencePipeline) -> InferencePipeline:
+        """
+        Pick the pipeline of a request.
+
+        :param default: main pipeline, it gets the share of the requests not routed to the other ones
+        :type default: InferencePipeline
+
+        :return: pipeline scoring the request
+        :rtype: InferencePipeline
+        """
+        idx = bisect.bisect_right(self._cumulative, self._random.random())
+
+        return self.pipelines[idx] if idx < len(self.pipelines) else default
+
+
+class ShadowScorer:
+    """
+    Score the rows of the answered requests with a challenger model in the background, see the module
+    documentation.
+
+    Each line of the log has the versions of both models, the number of rows, the latency of each model in
+    milliseconds and their predictions.
+
+    :param pipeline: challenger pipeline
+    :type pipeline: InferencePipeline
+
+    :param log_path: append-only NDJSON log of the shadow predictions
+    :type log_path: str | pathlib.Path
+
+    :param max_workers: threads of the executor
+    :type max_workers: int
+
+    :param max_pending: shadow requests queued or being scored, the following ones are dropped
+    :type max_pending: int
+    """
+
+    def __init__(
+        self,
+        pipeline: InferencePipeline,
+        log_path: Union[str, pathlib.Path],
+        max_workers: int = 1,
+        max_pending: int = 1_000,
+    ) -> None:
+        self.pipeline = pipeline
+        self.log_path = pathlib.Path(log_path)
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shadow-scorer")
+
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._log = open(self.log_path, "a", buffering=1)
+
+    @property
+    def pending(self) -> int:
+        """Number of shadow requests queued or being scored."""
+        return self._pending
+
+    def submit(
+        self, data: pandas.DataFrame, predictions: numpy.ndarray, model_version: str, latency_ms: float
+    ) -> bool:
+        """
+        Queue the rows of an answered request to be scored by the challenger, without waiting for it.
+
+        :param data: district rows of the request
+        :type data: pandas.DataFrame
+
+        :param predictions: predictions answered to the client
+        :type predictions: numpy.ndarray
+
+        :param model_version: version of the model that answered
+        :type model_version: str
+
+        :param latency_ms: milliseconds the answering model took
+        :type latency_ms: float
+
+        :return: whether the request was queued, False if it was dropped
+        :rtype: bool
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                SHADOW_DROPPED.inc()
+                return False
+
+            self._pending += 1
+
+        try:
+            self._executor.submit(self._score, data, predictions, model_version, latency_ms)
+        except RuntimeError:
+            # the executor was shut down
+            self._done()
+            return False
+
+        return True
+
+    def _score(self, data: pandas.DataFrame, predictions: numpy.ndarray, model_version: str, latency_ms: float) -> None:
+        """Score the rows with the challenger and append both results to the log."""
+        try:
+            start = time.perf_counter()
+            shadow_predictions = self.pipeline.predict(data=data, record=False)
+            shadow_ms = (time.perf_counter() - start) * 1e3
+
+            record = {
+                "timestamp": time.time(),
+                "pid": os.getpid(),
+                "rows": len(data),
+                "model_version": model_version,
+                "shadow_version": self.pipeline.version,
+                "latency_ms": round(latency_ms, 3),
+                "shadow_latency_ms": round(shadow_ms, 3),
+                "predictions": numpy.asarray(predictions).tolist(),
+                "shadow_predictions": shadow_predictions.tolist(),
+            }
+
+            with self._lock:
+                self._log.write(json.dumps(record) + "\n")
+
+            SHADOW_SCORES.inc()
+
+        except Exception:
+            SHADOW_ERRORS.inc()
+
+        finally:
+            self._done()
+
+    def _done(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stop the executor and close the log.
+
+        :param wait: whether the queued shadow requests are scored first
+        :type wait: bool
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+        with self._lock:
+            self._log.close()
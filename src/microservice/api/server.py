@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.server
+   :synopsis: Pre-fork production server. The model is loaded once in the parent process and ``WORKERS`` processes
+              are forked afterward, so all of them share the model memory copy-on-write.
+
+              Usage: ``FLASK_ENV=production python -m src.microservice.api.server``
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+
+from logging import INFO
+
+from flask import Flask
+from werkzeug.serving import make_server
+
+from src.microservice.api.config import CONFIGS
+from src.microservice.api.endpoint import app
+from src.microservice.api.log import stop_logging
+from src.microservice.api.model_utils import (
+    create_admission_controller,
+    create_cache,
+    create_model_router,
+    get_logger,
+    load_pipeline,
+    open_feature_store,
+    start_micro_batcher,
+    start_model_reloader,
+    start_shadow_scorer,
+    warm_up,
+)
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """
+    Create the listening socket in the parent process, so every forked worker accepts connections from it.
+
+    :param host: host to listen on
+    :type host: str
+
+    :param port: port to listen on
+    :type port: int
+
+    :param backlog: maximum number of pending connections
+    :type backlog: int
+
+    :return: listening socket inheritable by the children
+    :rtype: socket.socket
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+
+    return sock
+
+
+def run_worker(app: Flask, sock: socket.socket) -> None:
+    """
+    Serve requests in a forked worker until it's terminated.
+
+    Threads don't survive a fork, so the log listener, the micro-batcher, the model reloader and the shadow scorer are
+    started here in each worker. Each worker swaps new model versions on its own, memory-mapped artifacts still share
+    their pages.
+
+    SIGTERM and SIGINT exit the worker through :func:`spawn_worker`, which flushes its log listener first.
+
+    :param app: flask application with the pipeline already loaded by the parent
+    :type app: flask.Flask
+
+    :param sock: listening socket created by the parent
+    :type sock: socket.socket
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, lambda signum, frame: sys.exit(0))
+
+    get_logger(level=app.config["LOGGER_LEVEL"])
+
+    if app.config["MICRO_BATCHING"]:
+        start_micro_batcher(app=app)
+
+    if app.config["MODEL_RELOAD"]:
+        start_model_reloader(app=app)
+
+    start_shadow_scorer(app=app)
+
+    server = make_server(
+        host=str(app.config["HOST"]), port=int(app.config["PORT"]), app=app, threaded=True, fd=sock.fileno()
+    )
+    server.serve_forever()
+
+
+def spawn_worker(app: Flask, sock: socket.socket) -> int:
+    """
+    Fork a worker process.
+
+    The log listener thread of the parent is stopped before forking, so the worker doesn't inherit a queue or a
+    stream lock held by it, and started again afterward. The worker stops its own listener before exiting, because
+    ``os._exit`` skips the atexit hooks that would flush it.
+
+    :return: pid of the worker
+    :rtype: int
+    """
+    stop_logging()
+    pid = os.fork()
+
+    if pid == 0:
+        try:
+            run_worker(app=app, sock=sock)
+        finally:
+            stop_logging()
+            os._exit(0)
+
+    get_logger(level=app.config["LOGGER_LEVEL"])
+
+    return pid
+
+
+def serve(app: Flask, workers: int) -> None:
+    """
+    Fork ``workers`` processes serving ``app`` and restart the ones that die until the parent gets SIGTERM or SIGINT.
+
+    The objects loaded so far are moved to the permanent generation of the garbage collector before forking, so its
+    collections don't write into their pages and un-share them.
+
+    :param app: flask application with the pipeline already loaded
+    :type app: flask.Flask
+
+    :param workers: number of worker processes
+    :type workers: int
+    """
+    logger = get_logger(level=app.config["LOGGER_LEVEL"])
+    sock = bind_socket(host=str(app.config["HOST"]), port=int(app.config["PORT"]))
+
+    gc.collect()
+    gc.freeze()
+
+    children = {spawn_worker(app=app, sock=sock) for _ in range(workers)}
+    logger.info(f"\t-> Serving on {app.config['HOST']}:{app.config['PORT']} with {workers} workers {children}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        children.discard(pid)
+
+        if not stopping:
+            logger.error(f"Worker {pid} exited with status {status}, restarting it")
+            children.add(spawn_worker(app=app, sock=sock))
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    fenv = os.environ.get("FLASK_ENV", "production")
+
+    if fenv not in CONFIGS:
+        raise ValueError(f"Invalid FLASK_ENV {fenv}. Valid values are {list(CONFIGS.keys())}")
+
+    app.config.from_object(CONFIGS[fenv])
+
+    logger = get_logger(level=INFO)
+    logger.info(f"\t-> Starting Service using environment {fenv}")
+
+    pipeline = load_pipeline(app=app)
+    logger.info(f"\t-> Loaded model {pipeline.version} from {app.config['MODEL_PATH']}")
+
+    warm_up(app=app, pipeline=pipeline)
+
+    create_model_router(app=app)
+
+    open_feature_store(app=app)
+
+    create_cache(app=app)
+
+    create_admission_controller(app=app)
+
+    serve(app=app, workers=int(app.config["WORKERS"]))
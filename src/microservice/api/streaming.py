@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+.. module:: <>.streaming
+   :synopsis: Bulk scoring of uploads of any size, served by ``/predict/stream``.
+
+              The request body is read line by line, transformed and predicted in chunks of a fixed number of rows
+              and the predictions of each chunk are sent back before the next one is read, with chunked transfer
+              encoding. Only one chunk is held in memory, however big the upload.
+
+              - ``application/x-ndjson``: one JSON object per district row, answered with one ``{"prediction": ...}``
+                object per row
+              - ``text/csv``: a header with the input columns and one district row per record, answered with a
+                ``prediction`` column. A quoted field may hold line breaks, the record then spans several lines
+
+.. moduleauthor:: (C) <grp or company> - <author> 2022
+"""
+import io
+import json
+
+from typing import IO, Iterator
+
+import numpy
+import pandas
+
+from src.microservice.api.inference import InferencePipeline, validate_frame
+from src.microservice.api.metrics import REGISTRY, STAGE_SECONDS
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+STREAM_MEDIA_TYPES = [NDJSON, CSV]
+
+STREAMED_ROWS = REGISTRY.counter("prediction_streamed_rows_total", "District rows scored by /predict/stream")
+
+
+def iter_chunks(stream: IO[bytes], content_type: str, chunk_rows: int) -> Iterator[pandas.DataFrame]:
+    """
+    Read district rows from a stream in chunks, without reading the whole stream.
+
+    :param stream: request body, see the module documentation for its formats
+    :type stream: IO[bytes]
+
+    :param content_type: :data:`NDJSON` or :data:`CSV`
+    :type content_type: str
+
+    :param chunk_rows: maximum rows of a chunk
+    :type chunk_rows: int
+
+    :raises ValueError: if a line is invalid or a chunk misses columns or has non-numeric values
+    :return: validated district rows with the columns in :data:`FEATURE_COLUMNS` order
+    :rtype: Iterator[pandas.DataFrame]
+    """
+    if content_type not in STREAM_MEDIA_TYPES:
+        raise ValueError(f"Unsupported media type {content_type}, expected one of {STREAM_MEDIA_TYPES}")
+
+    header = stream.readline() if content_type == CSV else b""
+    lines: list[bytes] = []
+    # lines of a CSV record whose quoted field has line breaks, complete once its quotes are balanced
+    record = b""
+
+    while True:
+        line = stream.readline()
+
+        if content_type == CSV and (record or line.count(b'"') % 2):
+            record += line
+            if record.count(b'"') % 2 and line:
+                continue
+            line, record = record, b""
+
+        if line.strip():
+            lines.append(line if line.endswith(b"\n") else line + b"\n")
+
+        if lines and (len(lines) == chunk_rows or not line):
+            with STAGE_SECONDS["validation"].time():
+                frame = lines_to_frame(lines=lines, content_type=content_type, header=header)
+            yield frame
+            lines = []
+
+        if not line:
+            return
+
+
+def lines_to_frame(lines: list[bytes], content_type: str, header: bytes = b"") -> pandas.DataFrame:
+    """
+    Decode the lines of a chunk into district rows.
+
+    :param lines: NDJSON objects or CSV rows, one per line
+    :type lines: list[bytes]
+
+    :param content_type: :data:`NDJSON` or :data:`CSV`
+    :type content_type: str
+
+    :param header: CSV header line
+    :type header: bytes
+
+    :raises ValueError: if a line is invalid or the rows miss columns or have non-numeric values
+    :return: validated district rows
+    :rtype: pandas.DataFrame
+    """
+    if content_type == CSV:
+        try:
+            frame = pandas.read_csv(io.BytesIO(header + b"".join(lines)))
+        except (pandas.errors.ParserError, UnicodeDecodeError) as err:
+            raise ValueError(f"Invalid CSV rows: {err}")
+
+        return validate_frame(frame=frame)
+
+    try:
+        rows = [json.loads(line) for line in lines]
+    except json.JSONDecodeError as err:
+        raise ValueError(f"Invalid NDJSON line: {err}")
+
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValueError("Expected one JSON object per NDJSON line")
+
+    return validate_frame(frame=pandas.DataFrame(rows))
+
+
+def encode_chunk(predictions: numpy.ndarray, content_type: str) -> bytes:
+    """
+    Encode the predictions of a chunk, one line per row.
+
+    :param predictions: predictions of the chunk
+    :type predictions: numpy.ndarray
+
+    :param content_type: :data:`NDJSON` or :data:`CSV`
+    :type content_type: str
+
+    :return: encoded lines
+    :rtype: bytes
+    """
+    values = map(json.dumps, predictions.tolist())
+
+    if content_type == CSV:
+        return "".join(f"{value}\n" for value in values).encode()
+
+    return "".join(f'{{"prediction": {value}}}\n' for value in values).encode()
+
+
+def stream_predictions(
+    pipeline: InferencePipeline, chunks: Iterator[pandas.DataFrame], content_type: str
+) -> Iterator[bytes]:
+    """
+    Score the chunks and encode their predictions as they're read.
+
+    The response status is sent before the first chunk is scored, so an invalid chunk ends the stream with an error
+    line (``{"error": ...}`` in NDJSON, ``# error: ...`` in CSV) after the predictions of the previous chunks.
+
+    :param pipeline: pipeline scoring the rows, it counts as serving until the stream ends
+    :type pipeline: InferencePipeline
+
+    :param chunks: district rows, see :func:`iter_chunks`
+    :type chunks: Iterator[pandas.DataFrame]
+
+    :param content_type: :data:`NDJSON` or :data:`CSV`
+    :type content_type: str
+
+    :return: encoded predictions of each chunk
+    :rtype: Iterator[bytes]
+    """
+    with pipeline.serving():
+        if content_type == CSV:
+            yield b"prediction\n"
+
+        try:
+            for chunk in chunks:
+                predictions = pipeline.predict(data=chunk)
+                STREAMED_ROWS.inc(len(predictions))
+
+                # yielded out of the timer, the generator waits there for the client to read the chunk
+                with STAGE_SECONDS["serialization"].time():
+                    encoded = encode_chunk(predictions=predictions, content_type=content_type)
+                yield encoded
+
+        except (ValueError, TypeError) as err:
+            yield (f"# error: {err}\n" if content_type == CSV else json.dumps({"error": str(err)}) + "\n").encode()
@@ -13,16 +13,19 @@ Title
 """
 import argparse
 import os
-from typing import Dict
+from typing import Dict, List, Optional, Union
 
 import joblib
 import pandas
+from sklearn.compose import ColumnTransformer
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import GridSearchCV
 from sklearn.pipeline import Pipeline
 
-from src.pipeline.utils import pipe_args, parse_args, get_preprocessor
-from src.pipeline import get_logger
+from src.pipeline.utils import pipe_args, parse_args
+from src.pipeline.utils.data_transformations import IQROutlierFilter, get_preprocessor
+from src.pipeline.utils.regularization_path import RegularizationPathSearch
+from src.pipeline.utils.log import get_logger
 
 # from onnxmltools import convert_sklearn
 # from onnxmltools.convert.common.data_types import StringTensorType, FloatTensorType, Int64TensorType
@@ -46,6 +49,77 @@ logger = get_logger()
 #     return inputs
 
 
+def get_grid_search() -> GridSearchCV:
+    """
+    Brute-force grid search of an elastic-net logistic regression, every grid point and fold is fitted from scratch
+
+    Returns:
+        GridSearchCV: unfitted search over 11 `l1_ratio` x 3 `C` values and 5 folds
+    """
+    return GridSearchCV(
+        estimator=LogisticRegression(n_jobs=-1, random_state=42, max_iter=1000),
+        param_grid={
+            "solver": ["saga"],
+            "penalty": ["elasticnet"],
+            "l1_ratio": [x / 10 for x in range(11)],
+            "C": [10, 1.0, 0.1],
+        },
+        cv=5,
+        scoring="roc_auc",
+        n_jobs=-1,
+        verbose=1,
+    )
+
+
+def get_model_preprocessor(
+    train_set: pandas.DataFrame, outlier_columns: Optional[List[str]] = None
+) -> Union[Pipeline, ColumnTransformer]:
+    """
+    Get the unfitted preprocessor of the features saved with the classifier
+
+    Args:
+        train_set (pandas.DataFrame): training rows, the columns are split by dtype into categorical and numerical
+        outlier_columns (List[str], optional): columns whose values out of the IQR whiskers of the training set are
+            masked and imputed. The bounds are fitted with the preprocessor, so serving masks the same values.
+            By default, None, no filter.
+
+    Returns:
+        Pipeline | ColumnTransformer: the ColumnTransformer of `get_preprocessor`, after the outlier filter if any
+    """
+    preprocessor = get_preprocessor(
+        categorical_columns=train_set.select_dtypes(include=["O", "object"]).columns.tolist(),
+        numerical_columns=train_set.select_dtypes(include="number").columns.tolist(),
+    )
+
+    if not outlier_columns:
+        return preprocessor
+
+    outlier_filter = IQROutlierFilter(columns=outlier_columns, whisker_width=1.5, mode="mask")
+
+    return Pipeline(steps=[("outliers", outlier_filter), ("features", preprocessor)])
+
+
+def get_search(preprocessor, search: str = "path") -> Union[Pipeline, RegularizationPathSearch]:
+    """
+    Get the unfitted hyperparameter search of the classifier
+
+    Args:
+        preprocessor: unfitted ColumnTransformer of the features
+        search (str): "path" to walk the regularization path with warm starts, fitting the preprocessor once per fold,
+            or "grid" to fit every grid point from scratch with `GridSearchCV`. By default, "path".
+
+    Returns:
+        Pipeline | RegularizationPathSearch: search whose `fit` trains the preprocessor and the classifier
+    """
+    if search == "grid":
+        return Pipeline([("preprocessor", preprocessor), ("classifier", get_grid_search())], verbose=True)
+
+    if search == "path":
+        return RegularizationPathSearch(preprocessor=preprocessor, cv=5, scoring="roc_auc", n_jobs=-1)
+
+    raise ValueError(f"Invalid search {search}, valid values are ['path', 'grid']")
+
+
 @pipe_args
 def modelling(artifacts: Dict, args: argparse.Namespace) -> Dict:
     """
@@ -66,29 +140,18 @@ def modelling(artifacts: Dict, args: argparse.Namespace) -> Dict:
     y_train = train_set.pop("target")
 
     # Pipelines definition
-    preprocessor = get_preprocessor(
-        categorical_columns=train_set.select_dtypes(include=["O", "object"]).columns.tolist(),
-        numerical_columns=train_set.select_dtypes(include="number").columns.tolist(),
-    )
+    preprocessor = get_model_preprocessor(train_set=x_train, outlier_columns=getattr(args, "outlier_columns", None))
 
     # Model and grid definition
-    model = GridSearchCV(
-        estimator=LogisticRegression(n_jobs=-1, random_state=42, max_iter=1000),
-        param_grid={
-            "solver": ["saga"],
-            "penalty": ["elasticnet"],
-            "l1_ratio": [x / 10 for x in range(11)],
-            "C": [10, 1.0, 0.1],
-        },
-        cv=5,
-        scoring="roc_auc",
-        n_jobs=-1,
-        verbose=1,
-    )
+    search = get_search(preprocessor=preprocessor, search=getattr(args, "search", "path"))
 
-    classifier_pipeline = Pipeline([("preprocessor", preprocessor), ("classifier", model)], verbose=True)
+    search.fit(X=x_train, y=y_train)
 
-    classifier_pipeline.fit(X=x_train, y=y_train)
+    if isinstance(search, RegularizationPathSearch):
+        logger.info(f"Best params {search.best_params_} with a mean roc_auc of {search.best_score_:.4f}")
+        classifier_pipeline = search.best_estimator_
+    else:
+        classifier_pipeline = search
 
     # Store serialized data
     joblib.dump(
@@ -103,6 +166,23 @@ if __name__ == "__main__":
     # Example of usage of the parameters to run it locally:
     #  --artifact-path="../bin" --step-name="Modelling" --env="local" --input-file="feature_prep.joblib"
     #  --output-file="train_artifacts.joblib"
-    args = parse_args(return_parser=False)
+    parser = parse_args(return_parser=True)
+    parser.add_argument(
+        "--search",
+        dest="search",
+        type=str,
+        choices=["path", "grid"],
+        default="path",
+        help="Walk the regularization path with warm starts or fit every grid point from scratch",
+    )
+    parser.add_argument(
+        "--outlier-columns",
+        dest="outlier_columns",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Columns whose outliers are masked with the IQR bounds of the training set, saved with the model",
+    )
+    args, _ = parser.parse_known_args()
 
     modelling(args=args, logger=logger)
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+DAG runner
+==========
+
+Runs the pipeline steps declared in the `[pipeline.steps]` tables of `config.toml` in dependency order, executing the
+independent ones concurrently in a process pool, e.g. the EDA plots, the evaluation of several candidate models or
+feature engineering variants.
+
+Each step is a function decorated with `pipe_args`:
+
+    [pipeline.steps.preprocess]
+    target = "src.pipeline.preprocess:preprocess"   # module:function
+    depends_on = ["wrangle"]                          # optional, explicit dependencies
+    input_file = "wrangled_data.joblib"               # read from the artifact directory
+    output_file = "data_sets.joblib"                  # written to the artifact directory
+    args = { test_size = 0.2 }                        # optional, extra arguments of the step
+
+A step also depends on the step whose `output_file` is its `input_file`. A step starts as soon as all of its own
+dependencies have finished, not when the whole previous level of the DAG is done, so the artifacts flow through the
+artifact directory from each step to its dependents while the other branches are still running.
+
+The report has the wall time of each step, its start and end since the run started, and the critical path: the
+chain of dependent steps that bounds the wall time of the whole run. With `--profile` it's also the run report of
+the resources used by each step, see `pipeline.utils.profiling`, saved by default to `runs/` in the artifact
+directory so the runs can be compared with `python -m src.pipeline.utils.profiling before.json after.json`.
+`--profile-memory` also traces the Python allocations of each step, which slows them down.
+
+Usage:
+    python -m src.pipeline.dag --config config.toml --workers 4 --report artifacts/dag_report.json --profile
+"""
+import argparse
+import graphlib
+import importlib
+import json
+import logging
+import os
+import pathlib
+import time
+import tomllib
+
+from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+ROOT_DIR = pathlib.Path(__file__).parents[2]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Step:
+    """Step of the DAG, see the module documentation."""
+
+    name: str
+    target: str
+    depends_on: list[str] = field(default_factory=list)
+    input_file: Optional[str] = None
+    output_file: Optional[str] = None
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+class StepFailed(Exception):
+    """Error of a step run by `run_step`, with the start and end epoch seconds of the run."""
+
+    def __init__(self, error: str, start: float, end: float) -> None:
+        super().__init__(error, start, end)
+        self.error = error
+        self.start = start
+        self.end = end
+
+
+def load_steps(cfg_file: Union[str, pathlib.Path, None] = None) -> tuple[dict[str, Step], str]:
+    """Load the steps of the DAG from the `[pipeline]` section of the config.
+
+    Args:
+        cfg_file (str, pathlib.Path, optional): path to the `config.toml` file. Defaults to the one of the root dir.
+
+    Returns:
+        tuple[dict[str, Step], str]: steps by name with their implicit dependencies added, and the artifact directory
+    """
+    cfg_file = pathlib.Path(cfg_file or ROOT_DIR / "config.toml")
+
+    with open(file=cfg_file, mode="rb") as file:
+        parsed_cfg = tomllib.load(file)
+
+    pipeline_cfg = parsed_cfg.get("pipeline", {})
+    artifact_dir = pipeline_cfg.get("artifact_dir") or parsed_cfg.get("data", {}).get("artifact_dir", "artifacts/")
+    if not os.path.isabs(artifact_dir):
+        artifact_dir = str(cfg_file.parent / artifact_dir)
+
+    steps = {name: Step(name=name, **step_cfg) for name, step_cfg in pipeline_cfg.get("steps", {}).items()}
+
+    producers = {step.output_file: step.name for step in steps.values() if step.output_file}
+    for step in steps.values():
+        unknown = [dep for dep in step.depends_on if dep not in steps]
+        if unknown:
+            raise KeyError(f"Step {step.name} depends on unknown steps {unknown}")
+
+        producer = producers.get(step.input_file)
+        if producer is not None and producer != step.name and producer not in step.depends_on:
+            step.depends_on.append(producer)
+
+    return steps, artifact_dir
+
+
+def run_step(
+    step: Step, artifact_dir: str, no_cache: bool = False, profile: bool = False, profile_memory: bool = False
+) -> tuple[float, float, int, Optional[dict[str, Any]]]:
+    """Run a step in the current process.
+
+    Args:
+        step (Step): step to run
+        artifact_dir (str): directory of the input and output artifacts
+        no_cache (bool, optional): run the step even if its output is cached. Defaults to False.
+        profile (bool, optional): record the resources used by the step. Defaults to False.
+        profile_memory (bool, optional): also trace the Python allocations of the step. Defaults to False.
+
+    Raises:
+        StepFailed: if the step raises, with the error and when it started and ended
+
+    Returns:
+        tuple[float, float, int, dict]: start and end epoch seconds, the pid of the process that ran it and the
+            profile of the step, None if not profiled
+    """
+    start = time.time()
+    profile = profile or profile_memory
+    profile_report = os.path.join(artifact_dir, ".profiles", f"{step.name}.{os.getpid()}.json") if profile else None
+
+    try:
+        module_name, function_name = step.target.split(":")
+        function = getattr(importlib.import_module(module_name), function_name)
+
+        args = argparse.Namespace(
+            step_name=step.name,
+            artifact_path=artifact_dir,
+            input_file=step.input_file,
+            output_file=step.output_file,
+            requirements=None,
+            no_cache=no_cache,
+            cache_dir=None,
+            profile=profile,
+            profile_memory=profile_memory,
+            profile_report=profile_report,
+            **step.args,
+        )
+        function(args=args)
+    except Exception as err:
+        raise StepFailed(error=repr(err), start=start, end=time.time()) from err
+
+    end = time.time()
+
+    step_profile = None
+    if profile_report is not None and os.path.exists(profile_report):
+        with open(profile_report) as file:
+            step_profile = json.load(file)
+        os.remove(profile_report)
+
+    return start, end, os.getpid(), step_profile
+
+
+def critical_path(steps: dict[str, Step], durations: dict[str, float]) -> tuple[list[str], float]:
+    """Get the chain of dependent steps with the longest total duration.
+
+    Args:
+        steps (dict[str, Step]): steps by name
+        durations (dict[str, float]): seconds each finished step took
+
+    Returns:
+        tuple[list[str], float]: names of the steps of the path in execution order and its seconds
+    """
+    finish: dict[str, float] = {}
+    previous: dict[str, Optional[str]] = {}
+
+    order = graphlib.TopologicalSorter({name: step.depends_on for name, step in steps.items()}).static_order()
+    for name in order:
+        if name not in durations:
+            continue
+
+        dependency = max(
+            (dep for dep in steps[name].depends_on if dep in finish), key=finish.__getitem__, default=None
+        )
+        previous[name] = dependency
+        finish[name] = durations[name] + (finish[dependency] if dependency else 0.0)
+
+    if not finish:
+        return [], 0.0
+
+    name = max(finish, key=finish.__getitem__)
+    total = finish[name]
+    path = []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+
+    return path[::-1], total
+
+
+def run_dag(
+    steps: dict[str, Step],
+    artifact_dir: str,
+    workers: Optional[int] = None,
+    no_cache: bool = False,
+    profile: bool = False,
+    profile_memory: bool = False,
+) -> dict[str, Any]:
+    """Run the steps in dependency order, the independent ones concurrently in a process pool.
+
+    After a step fails no new steps are started, the running ones finish and the rest are reported as skipped.
+
+    Args:
+        steps (dict[str, Step]): steps by name, see `load_steps`
+        artifact_dir (str): directory of the input and output artifacts
+        workers (int, optional): processes of the pool. Defaults to the number of CPUs.
+        no_cache (bool, optional): run the steps even if their outputs are cached. Defaults to False.
+        profile (bool, optional): add the profile of each step to the report. Defaults to False.
+        profile_memory (bool, optional): also trace the Python allocations of each step. Defaults to False.
+
+    Raises:
+        graphlib.CycleError: if the dependencies have a cycle
+
+    Returns:
+        dict: the status, wall time, start and end of each step, the critical path and the total wall time
+    """
+    sorter = graphlib.TopologicalSorter({name: step.depends_on for name, step in steps.items()})
+    sorter.prepare()
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    started = time.time()
+    started_at = datetime.now().isoformat(timespec="seconds")
+    report = {name: {"status": "skipped"} for name in steps}
+    failed = False
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+
+        while sorter.is_active():
+            if not failed:
+                for name in sorter.get_ready():
+                    logger.info(f"Starting step {name}")
+                    running[pool.submit(run_step, steps[name], artifact_dir, no_cache, profile, profile_memory)] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = running.pop(future)
+
+                try:
+                    start, end, pid, step_profile = future.result()
+                except StepFailed as err:
+                    failed = True
+                    report[name] = {
+                        "status": "failed",
+                        "error": err.error,
+                        "wall_seconds": round(err.end - err.start, 4),
+                        "start_seconds": round(err.start - started, 4),
+                        "end_seconds": round(err.end - started, 4),
+                    }
+                    logger.error(f"Step {name} failed: {err.error}")
+                    continue
+                except Exception as err:
+                    # the worker process died
+                    failed = True
+                    report[name] = {"status": "failed", "error": repr(err)}
+                    logger.error(f"Step {name} failed: {err!r}")
+                    continue
+
+                report[name] = {
+                    "status": "done",
+                    "wall_seconds": round(end - start, 4),
+                    "start_seconds": round(start - started, 4),
+                    "end_seconds": round(end - started, 4),
+                    "pid": pid,
+                }
+                if step_profile is not None:
+                    report[name]["profile"] = step_profile
+                logger.info(f"Finished step {name} after {end - start:.4f} seconds")
+                sorter.done(name)
+
+    durations = {name: result["wall_seconds"] for name, result in report.items() if result["status"] == "done"}
+    path, path_seconds = critical_path(steps=steps, durations=durations)
+
+    return {
+        "started_at": started_at,
+        "status": "failed" if failed else "done",
+        "wall_seconds": round(time.time() - started, 4),
+        "sequential_seconds": round(sum(durations.values()), 4),
+        "critical_path": path,
+        "critical_path_seconds": round(path_seconds, 4),
+        "steps": report,
+    }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Format the report of a run as a table of steps, ordered by start, followed by the critical path."""
+    lines = [f"{'step':<30}{'status':>10}{'start (s)':>12}{'wall (s)':>12}"]
+
+    for name, result in sorted(report["steps"].items(), key=lambda item: item[1].get("start_seconds", float("inf"))):
+        lines.append(
+            f"{name:<30}{result['status']:>10}{result.get('start_seconds', 0.0):>12.3f}"
+            f"{result.get('wall_seconds', 0.0):>12.3f}"
+        )
+
+    lines.append(
+        f"\nWall time {report['wall_seconds']:.3f} s, {report['sequential_seconds']:.3f} s if run sequentially."
+        f"\nCritical path ({report['critical_path_seconds']:.3f} s): {' -> '.join(report['critical_path'])}"
+    )
+
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("Run the pipeline steps of config.toml as a DAG")
+    parser.add_argument("--config", default=None, help="Path to config.toml, by default the one of the root dir")
+    parser.add_argument("--workers", type=int, default=None, help="Processes running steps, by default the CPUs")
+    parser.add_argument("--no-cache", action="store_true", help="Run the steps even if their outputs are cached")
+    parser.add_argument("--report", default=None, help="JSON file to save the report to")
+    parser.add_argument("--profile", action="store_true", help="Record the resources used by each step in the report")
+    parser.add_argument(
+        "--profile-memory", action="store_true", help="Also trace the Python allocations of each step, slowing it down"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    steps, artifact_dir = load_steps(cfg_file=args.config)
+    report = run_dag(
+        steps=steps,
+        artifact_dir=artifact_dir,
+        workers=args.workers,
+        no_cache=args.no_cache,
+        profile=args.profile,
+        profile_memory=args.profile_memory,
+    )
+
+    print(format_report(report=report))
+
+    report_file = args.report
+    if report_file is None and (args.profile or args.profile_memory):
+        report_file = os.path.join(artifact_dir, "runs", f"{report['started_at'].replace(':', '')}.json")
+
+    if report_file:
+        os.makedirs(os.path.dirname(os.path.abspath(report_file)), exist_ok=True)
+        with open(report_file, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nReport saved to {report_file}")
+
+    raise SystemExit(0 if report["status"] == "done" else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,35 +15,71 @@ Step to wrangle the data, including:
 - Format values
 ...
 """
+import argparse
+
+from typing import Iterator, Union
+
 import numpy
 from pandas import DataFrame
+from pandas.api.types import is_integer_dtype, is_object_dtype, is_string_dtype
 
 from src.pipeline.utils import parse_args, pipe_args
 
+# values meaning missing data in the raw files
+NAN_SENTINELS = ["nan", "", " ", "NaN"]
 
-@pipe_args
-def wrangle(data: DataFrame) -> DataFrame:
+
+def wrangle_chunk(data: DataFrame, float_numbers: bool = False) -> DataFrame:
     """
-    Clean, select and format data
+    Format the column names and normalize the NaN sentinels of a chunk of rows, in place
 
     Params:
-        - data (pandas.DataFrame): The original dataset
+        - data (pandas.DataFrame): rows of the original dataset
+        - float_numbers (bool): cast the integer columns to float, so every chunk of a streamed file has the same
+          schema even if only some of them have missing values
 
     Return:
-        - pandas.DataFrame: The processed dataset
+        - pandas.DataFrame: The processed rows
     """
     # Columns names formatting
     data.columns = [col.lower().strip() for col in data.columns]
 
-    # Normalize nans
-    data = data.replace(["nan", "", " ", None, "NaN"], numpy.nan)
+    # Normalize nans, only the text columns can hold the sentinels and the other ones aren't copied
+    for col in data.columns:
+        if is_object_dtype(data[col]) or is_string_dtype(data[col]):
+            data[col] = data[col].where(~data[col].isin(NAN_SENTINELS), numpy.nan)
+        elif float_numbers and is_integer_dtype(data[col]):
+            data[col] = data[col].astype(numpy.float64)
 
     return data
 
 
+@pipe_args
+def wrangle(
+    artifacts: Union[DataFrame, Iterator[DataFrame]], args: argparse.Namespace
+) -> Union[DataFrame, Iterator[DataFrame]]:
+    """
+    Clean, select and format data
+
+    With `--chunk-size` the input is streamed in chunks of rows and each wrangled chunk is appended to the output
+    file (a Parquet row group each), so the memory is bounded by the chunk size instead of the file size.
+
+    Params:
+        - artifacts (pandas.DataFrame, Iterator[pandas.DataFrame]): The original dataset, or its chunks
+        - args (argparse.Namespace): arguments of the step
+
+    Return:
+        - pandas.DataFrame, Iterator[pandas.DataFrame]: The processed dataset, or its chunks
+    """
+    if isinstance(artifacts, DataFrame):
+        return wrangle_chunk(data=artifacts)
+
+    return (wrangle_chunk(data=chunk, float_numbers=True) for chunk in artifacts)
+
+
 if __name__ == "__main__":
     # If you want to run it locally in your IDE, create the folder bin, and download the data there
     # Then use the following parameters to run it:
-    #   --data-path="../bin" --step-name="Data Wrangling" --output-file="wrangled_data.csv"
-    #   --input-file="titanic.csv"
+    #   --artifact-path="../bin" --step-name="Data Wrangling" --output-file="wrangled_data.parquet"
+    #   --input-file="california_census.csv" --chunk-size=100000
     wrangle(args=parse_args())
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Online Training
+===============
+
+Step to train the online SGD regressor of `experiments.online_regression` chunk by chunk with `partial_fit`, so the
+whole matrix is never in memory.
+
+With `--base-model` the chunks are folded into an already trained model instead of a new one, so new census rows
+update the model in seconds without a full retrain:
+
+    python -m src.pipeline.online_training --artifact-path=artifacts --input-file=new_rows.parquet \
+        --chunk-size=10000 --base-model=online_model.joblib --output-file=online_model.joblib
+"""
+import argparse
+import os
+
+from typing import Iterable, Union
+
+import joblib
+import pandas
+
+from src.experiments.online_regression import OnlineRegress
+from src.pipeline.config.constants import TARGET
+from src.pipeline.utils import parse_args, pipe_args
+from src.pipeline.utils.log import get_logger
+
+logger = get_logger()
+
+
+@pipe_args
+def train_online(artifacts: Union[pandas.DataFrame, Iterable[pandas.DataFrame]], args: argparse.Namespace) -> dict:
+    """
+    Fold the chunks of wrangled rows into a new or a base online model
+
+    Params:
+        artifacts (pandas.DataFrame | Iterable[pandas.DataFrame]): wrangled rows, in chunks with `--chunk-size`
+        args (argparse.Namespace): `base_model` is the file of a trained model in the artifact path, optional
+
+    Return:
+        dict: the trained model in "online_model" and the number of rows it has seen in "n_rows_seen"
+    """
+    base_model = getattr(args, "base_model", None)
+
+    if base_model:
+        model: OnlineRegress = joblib.load(os.path.join(args.artifact_path, base_model))["online_model"]
+    else:
+        model = OnlineRegress()
+
+    if isinstance(artifacts, pandas.DataFrame):
+        artifacts = [artifacts]
+
+    n_rows_before = model.n_rows_seen
+    model.fit_chunks(chunks=artifacts, target=TARGET)
+    logger.info(f"Folded {model.n_rows_seen - n_rows_before} rows, the model has seen {model.n_rows_seen} rows")
+
+    return {"online_model": model, "n_rows_seen": model.n_rows_seen}
+
+
+if __name__ == "__main__":
+    # Example of usage of the parameters to run it locally:
+    #  --artifact-path="../bin" --step-name="Online Training" --input-file="wrangled_data.parquet"
+    #  --chunk-size=10000 --output-file="online_model.joblib"
+    parser = parse_args(return_parser=True)
+    parser.add_argument(
+        "--base-model",
+        dest="base_model",
+        type=str,
+        default=None,
+        help="Trained online model in the artifact path to fold the new rows into, by default a new one is trained",
+    )
+    args, _ = parser.parse_known_args()
+
+    train_online(args=args, logger=logger)
@@ -24,10 +24,13 @@ The correct order of operations should be:
 import argparse
 import logging
 
+from typing import Union
+
 import pandas
 
 from sklearn.model_selection import train_test_split
 
+from src.pipeline.config.constants import TARGET
 from src.pipeline.utils import pipe_args, parse_args
 
 logger = logging.getLogger()
@@ -36,19 +39,28 @@ logger.addHandler(logging.StreamHandler())
 
 
 @pipe_args
-def preprocess(artifacts: dict, args: argparse.Namespace) -> dict:
+def preprocess(artifacts: Union[pandas.DataFrame, dict], args: argparse.Namespace) -> dict:
     """
-    Resample, split, fit a exper and transform the data
+    Label, split and stratify the wrangled districts
+
+    The classifier of `modelling` predicts if a district is above the median house value, so the `"target"` label is
+    whether its `median_house_value` is over the median of the data set. The districts without a house value are
+    dropped.
 
     Params:
-        features (pandas.DataFrame): The original dataset
+        artifacts (pandas.DataFrame | dict): The wrangled dataset, or a dict with it in "data"
         args (argparse.Namespace):
 
     Return:
         pandas.DataFrame: The train dataset
         pandas.DataFrame: The test dataset
     """
-    features: pandas.DataFrame = artifacts["data"]
+    features: pandas.DataFrame = artifacts["data"] if isinstance(artifacts, dict) else artifacts
+
+    if "target" not in features.columns:
+        features = features.dropna(subset=[TARGET])
+        label = (features[TARGET] > features[TARGET].median()).astype(int)
+        features = features.drop(columns=TARGET).assign(target=label)
 
     # Split train-test
     train_set, test_set = train_test_split(features, random_state=42, stratify=features["target"])
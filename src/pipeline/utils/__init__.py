@@ -1,3 +1,13 @@
 # -*- coding: utf-8 -*-
 """Script to include all scripts in this folder in the namespace of utils."""
-from pipeline.utils.pipeline import pipe_args, parse_args, create_summary, get_file_extension, load_artifacts
+from pipeline.utils.pipeline import (
+    pipe_args,
+    parse_args,
+    create_summary,
+    get_file_extension,
+    iter_artifact_chunks,
+    load_artifacts,
+    read_artifact,
+    save_artifact,
+)
+from pipeline.utils.step_cache import StepCache
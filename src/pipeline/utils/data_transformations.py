@@ -18,14 +18,14 @@ from typing import Union, Any
 
 import numpy
 from pandas import DataFrame, NA, concat, Series
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.utils import resample
-
-from scipy.stats import boxcox
+from sklearn.utils.validation import _check_feature_names_in, check_is_fitted
 
 from pipeline.config.constants import TARGET
 from pipeline.utils.log import get_logger
@@ -33,34 +33,125 @@ from pipeline.utils.log import get_logger
 logger = get_logger()
 
 
+class IQROutlierFilter(TransformerMixin, BaseEstimator):
+    """
+    Filter of the values out of the whiskers [Q1 - whisker_width * IQR, Q3 + whisker_width * IQR] of each column.
+
+    The quartiles of every column are computed in a single vectorized pass at `fit` and kept as the bounds, so the
+    filter is part of the fitted pipeline and the test set and serving are filtered with the training bounds.
+
+    Args:
+        columns (list[str] | str, optional): columns to filter. Defaults to all the numerical ones.
+        whisker_width (float): Optional, loosen the IQR filter by a factor of `whisker_width` * IQR.
+        mode (str): what to do with the values out of the bounds, by default "mask":
+            - "mask": replace them with NaN, e.g. to be imputed afterward
+            - "clip": replace them with the closest bound
+            - "drop": drop the rows with any of them, only to clean a data set, a Pipeline can't drop the rows of y
+
+    Attributes:
+        columns_ (list[str]): filtered columns
+        lower_ (numpy.ndarray): lower bound of each filtered column
+        upper_ (numpy.ndarray): upper bound of each filtered column
+    """
+
+    MODES = ("mask", "clip", "drop")
+
+    def __init__(self, columns: list[str] | str | None = None, whisker_width: float = 1.5, mode: str = "mask"):
+        self.columns = columns
+        self.whisker_width = whisker_width
+        self.mode = mode
+
+    def fit(self, X: DataFrame, y: Any = None) -> "IQROutlierFilter":
+        """
+        Compute the bounds of each column.
+
+        Args:
+            X (pandas.DataFrame): data to compute the quartiles from, the missing values are ignored
+            y (Any): ignored
+
+        Returns:
+            IQROutlierFilter: fitted filter
+        """
+        if self.mode not in self.MODES:
+            raise ValueError(f"Invalid mode {self.mode}, valid values are {list(self.MODES)}")
+
+        self.feature_names_in_ = numpy.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+
+        columns = [self.columns] if isinstance(self.columns, str) else self.columns
+        self.columns_ = list(columns) if columns is not None else X.select_dtypes(include="number").columns.tolist()
+
+        # the values of each column are contiguous in the transposed array of a DataFrame
+        q1, q3 = numpy.nanquantile(X[self.columns_].to_numpy(dtype=numpy.float64).T, [0.25, 0.75], axis=1)
+        iqr = q3 - q1
+
+        self.lower_ = q1 - self.whisker_width * iqr
+        self.upper_ = q3 + self.whisker_width * iqr
+
+        return self
+
+    def outliers(self, X: DataFrame) -> numpy.ndarray:
+        """
+        Find the values out of the bounds, the missing values aren't outliers.
+
+        Args:
+            X (pandas.DataFrame): data with the filtered columns
+
+        Returns:
+            numpy.ndarray: boolean mask of shape (rows, filtered columns)
+        """
+        values = X[self.columns_].to_numpy(dtype=numpy.float64)
+
+        return (values < self.lower_) | (values > self.upper_)
+
+    def transform(self, X: DataFrame) -> DataFrame:
+        """
+        Mask, clip or drop the values out of the bounds, the input isn't modified.
+
+        Args:
+            X (pandas.DataFrame): data with the filtered columns
+
+        Returns:
+            pandas.DataFrame: filtered data
+        """
+        check_is_fitted(self, "lower_")
+        outliers = self.outliers(X=X)
+
+        if self.mode == "drop":
+            return X.loc[~outliers.any(axis=1)]
+
+        values = X[self.columns_].to_numpy(dtype=numpy.float64)
+        if self.mode == "clip":
+            values = numpy.clip(values, self.lower_, self.upper_)
+        else:
+            values = numpy.where(outliers, numpy.nan, values)
+
+        X = X.copy()
+        X[self.columns_] = values
+
+        return X
+
+    def get_feature_names_out(self, input_features=None) -> numpy.ndarray:
+        """The columns are the same as the input ones."""
+        check_is_fitted(self, "lower_")
+
+        return _check_feature_names_in(self, input_features)
+
+
 def remove_outliers_iqr(dataframe: DataFrame, columns: list[str] | str, whisker_width: float = 1.5) -> DataFrame:
     """
-    Method to remove outliers from a dataframe by column, including optional whiskers, removing rows
-     for which the column value are less than Q1-1.5IQR or greater than Q3+1.5IQR.
+    Method to remove outliers from a dataframe by column, including optional whiskers, replacing with NaN the values
+    of the columns less than Q1-1.5IQR or greater than Q3+1.5IQR. See `IQROutlierFilter` to reuse the bounds.
 
     Args:
-        dataframe (`:obj:pandas.DataFrame`): A pandas dataframe to subset
+        dataframe (`:obj:pandas.DataFrame`): A pandas dataframe to subset, it isn't modified
         columns (list[str] | str): Name of the column to calculate the subset from.
         whisker_width (float): Optional, loosen the IQR filter by a factor of `whisker_width` * IQR.
 
     Returns:
         (`:obj:pd.DataFrame`): Filtered dataframe
     """
-    if isinstance(columns, str):
-        columns = [columns]
-
-    for col in columns:
-        # Calculate Q1, Q2 and IQR
-        q1 = dataframe[col].quantile(0.25)
-        q3 = dataframe[col].quantile(0.75)
-        iqr = q3 - q1
-
-        # Apply filter with respect to IQR, including optional whiskers
-        dataframe[col] = dataframe[col].loc[
-            (dataframe[col] >= q1 - whisker_width * iqr) & (dataframe[col] <= q3 + whisker_width * iqr)
-        ]
-
-    return dataframe
+    return IQROutlierFilter(columns=columns, whisker_width=whisker_width, mode="mask").fit_transform(X=dataframe)
 
 
 def normalize_column(data: DataFrame | Series | numpy.ndarray, lmbda: int | None = None) -> Union[DataFrame, Any]:
@@ -80,6 +171,9 @@ def normalize_column(data: DataFrame | Series | numpy.ndarray, lmbda: int | None
         else:
             raise Exception(f"DataFrame with dimesions {data.shape} must be of 1-dimesion")
 
+    # imported here, scipy is only needed to normalize the target
+    from scipy.stats import boxcox
+
     # Normalizing target variable
     if lmbda:
         data = DataFrame(data=(boxcox(data, lmbda=lmbda).reshape(-1, 1)))
@@ -152,7 +246,7 @@ def preprocess_data(
         normalize_target
         variables_with_outliers
         preprocessor: By default None. Already fit Column Transformer Pipeline passed to perform
-                      the feature engineering.
+                      the feature engineering, with the outlier filter of the training set if any.
         verbose
 
     Returns:
@@ -183,17 +277,18 @@ def preprocess_data(
         y, lamb = normalize_column(data=y, lmbda=normalization_lmbda)
         # msg += f"{'':>30}{'Current':10}: {y.skew():.4f}\n"
 
-    # Handling outliers
-    if variables_with_outliers is not None:
-        msg += f"{'':>30}{'After':10}: {X.total_bedrooms.isna().sum()}" + "\n\n\t-> Handling outliers."
-        X = remove_outliers_iqr(dataframe=X, columns=variables_with_outliers, whisker_width=1.5)
-
     cat_cols = X.select_dtypes(include=["O", "object", "string"]).columns.to_list()
     num_cols = X.select_dtypes(include=["number"]).columns.to_list()
 
     if preprocessor is None:
         preprocessor = get_preprocessor(categorical_columns=cat_cols, numerical_columns=num_cols)
 
+        # Handling outliers, the bounds are part of the fitted preprocessor so the test set and serving reuse them
+        if variables_with_outliers is not None:
+            msg += f"{'':>30}{'After':10}: {X.total_bedrooms.isna().sum()}" + "\n\n\t-> Handling outliers."
+            outlier_filter = IQROutlierFilter(columns=variables_with_outliers, whisker_width=1.5, mode="mask")
+            preprocessor = Pipeline(steps=[("outliers", outlier_filter), ("features", preprocessor)])
+
         preprocessor.fit(X=X, y=y)
 
     X = preprocessor.transform(X=X)
@@ -14,7 +14,6 @@ Utils for pipelines
 import numpy
 import pandas
 
-from scipy.special import inv_boxcox
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
 
@@ -37,6 +36,9 @@ def evaluate_metrics(y_true, y_pred, lmbda: float, precision: int = 4) -> dict:
                 - R2: proportion of variance (0,1) - The bigger better
                 - MAE: average of errors
     """
+    # imported here, scipy is only needed to evaluate
+    from scipy.special import inv_boxcox
+
     y_pred = inv_boxcox(y_pred, lmbda)
 
     # if not all outliers were cleaned, it can generate NaN values
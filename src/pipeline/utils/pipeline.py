@@ -13,6 +13,7 @@ Utils for pipelines
 """
 import os
 import argparse
+import logging
 import subprocess
 import pathlib
 
@@ -20,11 +21,15 @@ from functools import wraps
 from logging import Logger
 from datetime import datetime
 from time import perf_counter
-from typing import Union, Any
+from typing import Iterable, Iterator, Optional, Union, Any
 
+import numpy
 import pandas
 import joblib
 
+from pipeline.utils.profiling import artifact_profile, profile_step, save_profile
+from pipeline.utils.step_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, StepCache, fingerprint
+
 
 def parse_args(message: str = "", return_parser: bool = False) -> Union[argparse.Namespace, argparse.ArgumentParser]:
     """
@@ -36,6 +41,15 @@ def parse_args(message: str = "", return_parser: bool = False) -> Union[argparse
             --artifact-path
             --input-file
             --output-file
+            --no-cache
+            --cache-dir
+            --cache-max-mb
+            --columns
+            --mmap-mode
+            --chunk-size
+            --profile
+            --profile-memory
+            --profile-report
     """
     parser = argparse.ArgumentParser(message)
 
@@ -51,6 +65,79 @@ def parse_args(message: str = "", return_parser: bool = False) -> Union[argparse
 
     parser.add_argument("--requirements", dest="requirements", type=str, help="Extra requirements to install.")
 
+    parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        action="store_true",
+        help="Run the step even if its output is cached. The cache key covers the step, its module and the modules it"
+        " imports from, use it after editing a helper they import indirectly",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        type=str,
+        default=None,
+        help=f"Directory of the step cache. By default {DEFAULT_CACHE_DIR} in the artifact path",
+    )
+
+    parser.add_argument(
+        "--cache-max-mb",
+        dest="cache_max_mb",
+        type=float,
+        default=DEFAULT_MAX_MB,
+        help="Size cap of the step cache in MB, the least recently used artifacts are evicted over it",
+    )
+
+    parser.add_argument(
+        "--columns",
+        dest="columns",
+        type=lambda value: [col.strip() for col in value.split(",")],
+        default=None,
+        help="Comma-separated columns read from a Parquet, Feather or CSV input file. By default all of them",
+    )
+
+    parser.add_argument(
+        "--mmap-mode",
+        dest="mmap_mode",
+        type=str,
+        choices=["r", "r+", "c"],
+        default=None,
+        help="Memory-map the arrays of a .npy or .joblib input file instead of reading them into memory",
+    )
+
+    parser.add_argument(
+        "--chunk-size",
+        dest="chunk_size",
+        type=int,
+        default=None,
+        help="Rows per chunk to stream a .csv or .parquet input through the step out-of-core. By default it's read "
+        "whole into memory",
+    )
+
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        help="Record the wall and CPU time, peak RSS and artifact sizes and rows of the step",
+    )
+
+    parser.add_argument(
+        "--profile-memory",
+        dest="profile_memory",
+        action="store_true",
+        help="Also trace the Python allocations with tracemalloc, their peak and top allocators. It slows down the "
+        "step, so its timings are flagged as traced. It implies --profile",
+    )
+
+    parser.add_argument(
+        "--profile-report",
+        dest="profile_report",
+        type=str,
+        default=None,
+        help="JSON file to save the profile of the step to, it implies --profile",
+    )
+
     if return_parser:
         return parser
 
@@ -80,51 +167,333 @@ def get_file_extension(filepath: Union[str, pathlib.Path]) -> str:
     return filepath.suffix
 
 
+def _read_feather(filename: str, columns: Optional[list[str]] = None) -> pandas.DataFrame:
+    """Read a Feather file memory-mapped, only the `columns` are read if given"""
+    from pyarrow import feather
+
+    return feather.read_table(filename, columns=columns, memory_map=True).to_pandas()
+
+
+# readers of the artifacts by file extension, called with the filename, the columns to read and the mmap_mode
+ARTIFACT_READERS = {
+    ".joblib": lambda filename, columns, mmap_mode: joblib.load(filename=filename, mmap_mode=mmap_mode),
+    ".csv": lambda filename, columns, mmap_mode: pandas.read_csv(
+        filepath_or_buffer=filename, usecols=columns, engine="pyarrow"
+    ),
+    ".parquet": lambda filename, columns, mmap_mode: pandas.read_parquet(path=filename, columns=columns),
+    ".feather": lambda filename, columns, mmap_mode: _read_feather(filename=filename, columns=columns),
+    ".npy": lambda filename, columns, mmap_mode: numpy.load(file=filename, mmap_mode=mmap_mode, allow_pickle=False),
+    # the arrays of a .npz are read lazily, on first access
+    ".npz": lambda filename, columns, mmap_mode: numpy.load(file=filename, allow_pickle=False),
+}
+
+
+def read_artifact(
+    filename: Union[str, pathlib.Path], columns: Optional[list[str]] = None, mmap_mode: Optional[str] = None
+) -> Any:
+    """
+    Method to read an artifact in any of the formats of `ARTIFACT_READERS`
+
+    Args:
+        filename (str, pathlib.Path): path of the artifact
+        columns (list[str], optional): columns read from a tabular artifact (Parquet, Feather or CSV). Defaults to all.
+        mmap_mode (str, optional): memory-map the arrays of a .npy or .joblib artifact with this mode ("r", "r+" or
+            "c") instead of reading them into memory. Defaults to None.
+
+    Returns:
+        Any: object with artifacts
+    """
+    file_extension = get_file_extension(filename)
+
+    if file_extension not in ARTIFACT_READERS.keys():
+        raise KeyError(f"File extension {file_extension} not supported. Try {ARTIFACT_READERS.keys()}")
+
+    return ARTIFACT_READERS[file_extension](filename=str(filename), columns=columns, mmap_mode=mmap_mode)
+
+
+def iter_artifact_chunks(
+    filename: Union[str, pathlib.Path], chunk_size: int, columns: Optional[list[str]] = None
+) -> Iterator[pandas.DataFrame]:
+    """
+    Method to read a tabular artifact in chunks, so only one chunk is in memory at a time
+
+    Args:
+        filename (str, pathlib.Path): path of a .csv or .parquet artifact
+        chunk_size (int): rows per chunk
+        columns (list[str], optional): columns to read. Defaults to all.
+
+    Returns:
+        Iterator[pandas.DataFrame]: chunks of rows in file order
+    """
+    file_extension = get_file_extension(filename)
+
+    if file_extension == ".csv":
+        with pandas.read_csv(filepath_or_buffer=filename, usecols=columns, chunksize=chunk_size) as reader:
+            yield from reader
+
+    elif file_extension == ".parquet":
+        from pyarrow import parquet
+
+        with parquet.ParquetFile(filename) as file:
+            for batch in file.iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+
+    else:
+        raise KeyError(f"File extension {file_extension} can't be read in chunks. Try ('.csv', '.parquet')")
+
+
+def _save_chunks(chunks: Iterable[pandas.DataFrame], filename: Union[str, pathlib.Path]) -> None:
+    """
+    Write chunks of rows to a .parquet (one row group per chunk) or .csv file as they're produced.
+
+    The schema of a Parquet file is the one of the first chunk, the following chunks are cast to it. The columns of
+    the first chunk without any value, whose Arrow type is null, are written as strings so the values of the following
+    chunks fit in. Without any chunk, an empty file is written so the next step still finds its input.
+    """
+    file_extension = get_file_extension(filename)
+
+    if file_extension == ".csv":
+        header = True
+        with open(filename, "w", newline="") as file:
+            for chunk in chunks:
+                chunk.to_csv(path_or_buf=file, index=False, header=header)
+                header = False
+        return
+
+    if file_extension != ".parquet":
+        raise TypeError(f"Chunks of rows can only be saved as .parquet or .csv, got {file_extension}")
+
+    import pyarrow
+    from pyarrow import parquet
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+
+            if writer is None:
+                schema = pyarrow.schema(
+                    [
+                        field.with_type(pyarrow.string()) if pyarrow.types.is_null(field.type) else field
+                        for field in table.schema
+                    ],
+                    metadata=table.schema.metadata,
+                )
+                writer = parquet.ParquetWriter(filename, schema=schema)
+
+            try:
+                table = table.cast(writer.schema)
+            except (pyarrow.ArrowInvalid, ValueError) as err:
+                raise ValueError(f"Chunk doesn't match the schema of the first chunk, try a larger chunk: {err}")
+
+            writer.write_table(table)
+
+        if writer is None:
+            parquet.write_table(pyarrow.table({}), filename)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def save_artifact(artifacts: Any, filename: Union[str, pathlib.Path]) -> None:
+    """
+    Method to write the artifacts of a step in the format of the file extension
+
+        - .parquet and .csv: a pandas.DataFrame or an iterator of pandas.DataFrame chunks, written as they're produced
+        - .feather: a pandas.DataFrame
+        - .npy: a numpy.ndarray
+        - .npz: a dict of numpy.ndarray
+        - .joblib: any object
+
+    Args:
+        artifacts (Any): output of the step
+        filename (str, pathlib.Path): path of the artifact
+
+    Raises:
+        TypeError: if the artifacts can't be written in the format of the file extension
+    """
+    file_extension = get_file_extension(filename)
+    tabular = file_extension in (".parquet", ".feather", ".csv")
+
+    if isinstance(artifacts, Iterator):
+        _save_chunks(chunks=artifacts, filename=filename)
+        return
+
+    if tabular and not isinstance(artifacts, pandas.DataFrame):
+        raise TypeError(f"Only a pandas.DataFrame can be saved as {file_extension}, got {type(artifacts).__name__}")
+
+    if file_extension == ".parquet":
+        artifacts.to_parquet(path=filename, index=False)
+    elif file_extension == ".feather":
+        # uncompressed, so it can be memory-mapped when read
+        artifacts.reset_index(drop=True).to_feather(path=filename, compression="uncompressed")
+    elif file_extension == ".csv":
+        artifacts.to_csv(path_or_buf=filename, index=False)
+    elif file_extension == ".npy":
+        numpy.save(file=filename, arr=artifacts, allow_pickle=False)
+    elif file_extension == ".npz":
+        if not isinstance(artifacts, dict):
+            raise TypeError(f"Only a dict of arrays can be saved as .npz, got {type(artifacts).__name__}")
+        # numpy.savez appends .npz to the filename unless it's a file object
+        with open(filename, "wb") as file:
+            numpy.savez(file, **artifacts)
+    else:
+        joblib.dump(artifacts, filename=filename)
+
+
 def load_artifacts(args: argparse.Namespace) -> Any:
     """
     Method to load the artifact to start a step of the exper
 
     Args:
-        args (argparse.Namespace): arguments
+        args (argparse.Namespace): arguments, the `columns` of a tabular input and the `mmap_mode` of arrays are
+            optional, see `read_artifact`. With a `chunk_size` the input is read in chunks, see
+            `iter_artifact_chunks`
 
     Returns:
-        Any: object with artifacts
+        Any: object with artifacts, an iterator of pandas.DataFrame chunks if `chunk_size` is set
     """
     if not args.input_file:
         return {}
 
     file_extension = get_file_extension(args.input_file)
 
-    method_to_load = {
-        ".joblib": lambda filename: joblib.load(filename=filename),
-        ".csv": lambda filename: pandas.read_csv(filepath_or_buffer=filename, low_memory=False, engine="pyarrow"),
-    }
+    if file_extension not in ARTIFACT_READERS.keys():
+        raise KeyError(f"File extension {file_extension} not supported. Try {ARTIFACT_READERS.keys()}")
+
+    if getattr(args, "chunk_size", None):
+        return iter_artifact_chunks(
+            filename=os.path.join(args.artifact_path, args.input_file),
+            chunk_size=args.chunk_size,
+            columns=getattr(args, "columns", None),
+        )
 
-    if file_extension not in method_to_load.keys():
-        raise KeyError(f"File extension {file_extension} not supported. Try {method_to_load.keys()}")
+    return read_artifact(
+        filename=os.path.join(args.artifact_path, args.input_file),
+        columns=getattr(args, "columns", None),
+        mmap_mode=getattr(args, "mmap_mode", None),
+    )
 
-    return method_to_load[file_extension](filename=os.path.join(args.artifact_path, args.input_file))
+
+def get_step_cache(args: argparse.Namespace) -> Optional[StepCache]:
+    """
+    Method to get the cache of the step outputs, see `pipeline.utils.step_cache`
+
+    Args:
+        args (argparse.Namespace): arguments of the step
+
+    Returns:
+        StepCache: cache in `--cache-dir`, by default in the artifact path. None if there is no directory for it
+    """
+    cache_dir = getattr(args, "cache_dir", None)
+
+    if cache_dir is None:
+        if not getattr(args, "artifact_path", None):
+            return None
+        cache_dir = os.path.join(args.artifact_path, DEFAULT_CACHE_DIR)
+
+    return StepCache(directory=cache_dir, max_bytes=int(getattr(args, "cache_max_mb", DEFAULT_MAX_MB) * 2**20))
 
 
 def pipe_args(pipeline_step):
-    """Decorator with the parser arguments need for the steps of the exper"""
+    """
+    Decorator with the parser arguments need for the steps of the exper
 
-    @wraps
-    def execute(args: argparse.Namespace, logger: Logger) -> dict:
-        logger.info(f"Starting step {args.step_name}")
+    The output of the step is cached by the fingerprint of its input file, source code, the modules it imports from
+    and arguments, see `pipeline.utils.step_cache`. If nothing changed since a previous run, the step isn't executed
+    and the cached artifact is reused, unless `--no-cache`. Helpers imported indirectly through other project modules
+    aren't in the fingerprint, use `--no-cache` after editing them.
+
+    With `--chunk-size` the step gets an iterator of chunks of its input and returns an iterator of output chunks,
+    which are written to the output file as they're produced. The path of the output file is returned instead of the
+    artifacts, so they're never whole in memory.
+
+    With `--profile` the resources used by the step are recorded, see `pipeline.utils.profiling`, and saved as JSON
+    to `--profile-report` if given. `--profile-memory` also traces the Python allocations.
+    """
+
+    def run(args: argparse.Namespace, logger: Logger, profile: Optional[dict]) -> Any:
         starting_time = perf_counter()
 
+        output_path = os.path.join(args.artifact_path, args.output_file) if args.output_file is not None else None
+        input_path = os.path.join(args.artifact_path, args.input_file) if getattr(args, "input_file", None) else None
+
+        cache = get_step_cache(args=args)
+        key = fingerprint(step=pipeline_step, args=args, input_path=input_path) if cache is not None else None
+
+        cached_path = cache.get(key=key) if cache is not None and not getattr(args, "no_cache", False) else None
+
+        if cached_path is not None:
+            if output_path is not None:
+                cache.restore(path=cached_path, output_path=output_path)
+
+            if profile is not None:
+                profile.update(
+                    cached=True,
+                    input=artifact_profile(path=input_path),
+                    output=artifact_profile(path=output_path or cached_path),
+                )
+
+            # a streamed output is never read whole, the ones of steps reducing the chunks (e.g. a model) are
+            if getattr(args, "chunk_size", None) and get_file_extension(output_path) in (".parquet", ".csv"):
+                logger.info(f"Reused cached output of {args.step_name} Step.")
+                return pathlib.Path(output_path)
+
+            # copy-on-write, so changes to the returned arrays never reach the cache
+            artifacts = read_artifact(filename=cached_path, mmap_mode="c")
+            logger.info(f"Reused cached output of {args.step_name} Step after {perf_counter() - starting_time:.4f} s.")
+
+            return artifacts
+
+        if getattr(args, "chunk_size", None) and output_path is None:
+            raise ValueError(f"Step {args.step_name} needs an output file to stream its chunks to")
+
         artifacts = load_artifacts(args=args)
 
+        if profile is not None:
+            # counted before the step, it may modify its input
+            profile.update(cached=False, input=artifact_profile(path=input_path, artifacts=artifacts))
+
         artifacts = pipeline_step(artifacts=artifacts, args=args)
-        total_time = perf_counter() - starting_time
 
-        if args.output_file is not None:
-            joblib.dump(artifacts, filename=f"{args.artifact_path}/{args.output_file}")
+        if output_path is not None:
+            pathlib.Path(output_path).unlink(missing_ok=True)
+            # the chunks of a streamed step are processed while they're written
+            save_artifact(artifacts=artifacts, filename=output_path)
+
+        if cache is not None:
+            cache.put(key=key, artifacts=artifacts, output_path=output_path)
 
+        if profile is not None:
+            profile["output"] = artifact_profile(path=output_path, artifacts=artifacts)
+
+        total_time = perf_counter() - starting_time
         logger.info(f"Finished {args.step_name} Step after {total_time:.4f} seconds.\n\n")
 
-        return pipeline_step
+        return pathlib.Path(output_path) if isinstance(artifacts, Iterator) else artifacts
+
+    @wraps(pipeline_step)
+    def execute(args: argparse.Namespace, logger: Optional[Logger] = None) -> Any:
+        logger = logger or logging.getLogger(__name__)
+        logger.info(f"Starting step {args.step_name}")
+
+        profile_report = getattr(args, "profile_report", None)
+        profile_memory = getattr(args, "profile_memory", False)
+
+        if not (getattr(args, "profile", False) or profile_memory or profile_report):
+            return run(args=args, logger=logger, profile=None)
+
+        with profile_step(step_name=args.step_name, trace_memory=profile_memory) as profile:
+            artifacts = run(args=args, logger=logger, profile=profile)
+
+        logger.info(
+            f"Profile of {args.step_name} Step: {profile['cpu_seconds']:.4f} s of CPU, "
+            f"{profile['peak_rss_mb']:.1f} MB of peak RSS."
+        )
+        if profile_report:
+            save_profile(profile=profile, filename=profile_report)
+
+        return artifacts
 
     return execute
 
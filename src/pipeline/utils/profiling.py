@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Step profiling
+==============
+
+Resource profile of the pipeline steps decorated with `pipe_args`, recorded with `--profile`:
+    - wall and CPU time
+    - peak RSS of the process during the step
+    - size in bytes and rows of the input and output artifacts
+
+With `--profile-memory` the Python allocations are also traced with tracemalloc, adding their peak and the source
+lines that allocated the most memory still alive at the end of the step. Tracing slows down every allocation, so the
+timings of such a profile are flagged as `memory_traced` and aren't compared with the ones of an untraced run.
+
+The profile of a step is saved as JSON with `--profile-report`, and the DAG runner adds the profile of each step to
+its run report. Two reports are compared with:
+
+    python -m src.pipeline.utils.profiling artifacts/runs/before.json artifacts/runs/after.json --threshold 10
+
+to spot which step regressed after a data or code change.
+"""
+import argparse
+import json
+import pathlib
+import resource
+import sys
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Union
+
+import numpy
+import pandas
+
+# allocators reported per step
+TOP_ALLOCATIONS = 10
+
+# metrics compared by `diff_runs`, the ones where growing is a regression
+RESOURCE_METRICS = ["wall_seconds", "cpu_seconds", "peak_rss_mb", "tracemalloc_peak_mb"]
+# metrics inflated by tracemalloc, only comparable between runs that both traced the memory or both didn't
+TIME_METRICS = ["wall_seconds", "cpu_seconds"]
+ARTIFACT_METRICS = ["input_bytes", "input_rows", "output_bytes", "output_rows"]
+
+
+def _reset_peak_rss() -> None:
+    """Reset the peak RSS of the process on Linux, so the one of a step doesn't include the previous steps."""
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """Get the peak resident memory of the process in MB, since the last reset on Linux or since it started."""
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 1024
+
+
+def count_rows(artifacts: Any) -> Union[int, dict[str, Any], None]:
+    """Get the rows of the artifacts of a step.
+
+    Args:
+        artifacts (Any): a pandas object, an array or a dict of them
+
+    Returns:
+        int | dict | None: rows, rows of each value of a dict, or None if they don't have rows
+    """
+    if isinstance(artifacts, (pandas.DataFrame, pandas.Series, numpy.ndarray)):
+        return int(artifacts.shape[0]) if artifacts.ndim else None
+
+    if isinstance(artifacts, dict):
+        rows = {key: count_rows(value) for key, value in artifacts.items()}
+        return {key: value for key, value in rows.items() if value is not None} or None
+
+    return None
+
+
+def file_rows(path: Union[str, pathlib.Path]) -> Optional[int]:
+    """Get the rows of a tabular or array artifact from its metadata, without reading it whole.
+
+    Args:
+        path (str, pathlib.Path): artifact file
+
+    Returns:
+        int: rows, None if the format has no cheap way to count them
+    """
+    suffix = pathlib.Path(path).suffix
+
+    if suffix == ".parquet":
+        from pyarrow import parquet
+
+        return parquet.ParquetFile(path).metadata.num_rows
+
+    if suffix == ".feather":
+        from pyarrow import feather
+
+        return feather.read_table(path, memory_map=True).num_rows
+
+    if suffix == ".npy":
+        array = numpy.load(path, mmap_mode="r")
+        return int(array.shape[0]) if array.ndim else None
+
+    if suffix == ".csv":
+        with open(path, "rb") as file:
+            # the header isn't a row
+            return max(sum(block.count(b"\n") for block in iter(lambda: file.read(2**20), b"")) - 1, 0)
+
+    return None
+
+
+def total_rows(rows: Union[int, dict, None]) -> Optional[int]:
+    """Get the total rows of the rows of `count_rows`."""
+    if isinstance(rows, dict):
+        return sum(total_rows(value) or 0 for value in rows.values())
+
+    return rows
+
+
+def artifact_profile(path: Optional[Union[str, pathlib.Path]], artifacts: Any = None) -> Optional[dict[str, Any]]:
+    """Get the file, size in bytes and rows of an artifact.
+
+    Args:
+        path (str, pathlib.Path, optional): artifact file, None if the step has no such artifact
+        artifacts (Any, optional): the artifact in memory, its rows are counted if the file format has no metadata
+
+    Returns:
+        dict: file, bytes and rows of the artifact, None if there is no path
+    """
+    if path is None:
+        return None
+
+    path = pathlib.Path(path)
+    rows = file_rows(path=path) if path.exists() else None
+
+    return {
+        "file": path.name,
+        "bytes": path.stat().st_size if path.exists() else None,
+        "rows": rows if rows is not None else count_rows(artifacts=artifacts),
+    }
+
+
+@contextmanager
+def profile_step(
+    step_name: str, top: int = TOP_ALLOCATIONS, trace_memory: bool = False
+) -> Iterator[dict[str, Any]]:
+    """Profile the code run in the context, the yielded dict is filled with the profile when it exits.
+
+    Args:
+        step_name (str): name of the step
+        top (int, optional): source lines allocating the most memory to report. Defaults to TOP_ALLOCATIONS.
+        trace_memory (bool, optional): trace the Python allocations with tracemalloc, which slows down the step.
+            Defaults to False.
+
+    Yields:
+        dict: profile of the step, the caller can add keys to it, e.g. the artifacts
+    """
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    # tracing may have been started outside, the timings are inflated all the same
+    traced = tracemalloc.is_tracing()
+    profile: dict[str, Any] = {"step": step_name, "memory_traced": traced}
+
+    if traced:
+        tracemalloc.reset_peak()
+    _reset_peak_rss()
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield profile
+    finally:
+        profile["wall_seconds"] = round(time.perf_counter() - wall, 6)
+        profile["cpu_seconds"] = round(time.process_time() - cpu, 6)
+        profile["peak_rss_mb"] = round(peak_rss_mb(), 3)
+
+        if traced:
+            profile["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+
+            ignored = [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib.*"),
+            ]
+            snapshot = tracemalloc.take_snapshot().filter_traces(ignored)
+            profile["top_allocations"] = [
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_mb": round(stat.size / 2**20, 3),
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics("lineno")[:top]
+            ]
+
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def save_profile(profile: dict[str, Any], filename: Union[str, pathlib.Path]) -> None:
+    """Save a profile or a run report as JSON, creating its directory if needed."""
+    pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+
+    with open(filename, "w") as file:
+        json.dump(profile, file, indent=2, default=str)
+
+
+def load_run(filename: Union[str, pathlib.Path]) -> dict[str, dict[str, Any]]:
+    """Load the profiles of the steps of a run report of the DAG runner, or of a single step profile.
+
+    Args:
+        filename (str, pathlib.Path): JSON report
+
+    Returns:
+        dict[str, dict]: flat metrics of each step by step name, see `RESOURCE_METRICS` and `ARTIFACT_METRICS`, and
+            whether its memory was traced
+    """
+    with open(filename) as file:
+        report = json.load(file)
+
+    if "steps" in report:
+        profiles = {name: step["profile"] for name, step in report["steps"].items() if step.get("profile")}
+    else:
+        profiles = {report["step"]: report}
+
+    runs = {}
+    for name, profile in profiles.items():
+        metrics = {metric: profile.get(metric) for metric in RESOURCE_METRICS}
+        # the profiles saved before the tracing was optional always traced the memory
+        metrics["memory_traced"] = profile.get("memory_traced", True)
+        for artifact in ("input", "output"):
+            info = profile.get(artifact) or {}
+            metrics[f"{artifact}_bytes"] = info.get("bytes")
+            metrics[f"{artifact}_rows"] = total_rows(info.get("rows"))
+        runs[name] = metrics
+
+    return runs
+
+
+def diff_runs(before: dict[str, dict], after: dict[str, dict], threshold: float = 10.0) -> list[dict[str, Any]]:
+    """Compare the metrics of the steps of two runs.
+
+    Args:
+        before (dict[str, dict]): metrics by step of the baseline run, see `load_run`
+        after (dict[str, dict]): metrics by step of the new run
+        threshold (float, optional): growth in percent of a resource metric reported as a regression. Defaults to 10.
+
+    Returns:
+        list[dict]: step, metric, before and after values, change in percent and if it's a regression, of the
+            metrics of the steps of both runs that changed. The timings of a step whose memory was traced in only one
+            of the runs aren't compared
+    """
+    changes = []
+
+    for name in [name for name in after if name in before]:
+        comparable_times = before[name].get("memory_traced") == after[name].get("memory_traced")
+
+        for metric in RESOURCE_METRICS + ARTIFACT_METRICS:
+            old, new = before[name].get(metric), after[name].get(metric)
+            if old is None or new is None or old == new or (metric in TIME_METRICS and not comparable_times):
+                continue
+
+            change = (new - old) / old * 100 if old else float("inf")
+            changes.append(
+                {
+                    "step": name,
+                    "metric": metric,
+                    "before": old,
+                    "after": new,
+                    "change_percent": round(change, 2),
+                    "regression": metric in RESOURCE_METRICS and change > threshold,
+                }
+            )
+
+    return changes
+
+
+def format_diff(changes: list[dict[str, Any]], before: dict, after: dict) -> str:
+    """Format the changes of `diff_runs` as a table, with the steps only in one of the runs at the end."""
+    lines = [f"{'step':<25}{'metric':<22}{'before':>14}{'after':>14}{'change':>10}"]
+
+    for change in changes:
+        lines.append(
+            f"{change['step']:<25}{change['metric']:<22}{change['before']:>14.4g}{change['after']:>14.4g}"
+            f"{change['change_percent']:>+9.1f}%{'  REGRESSION' if change['regression'] else ''}"
+        )
+
+    for name in before.keys() - after.keys():
+        lines.append(f"{name:<25}only in the baseline run")
+    for name in after.keys() - before.keys():
+        lines.append(f"{name:<25}only in the new run")
+
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser("Compare the step profiles of two pipeline runs")
+    parser.add_argument("before", help="Run report or step profile of the baseline run")
+    parser.add_argument("after", help="Run report or step profile of the new run")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Growth in percent reported as a regression")
+    args = parser.parse_args()
+
+    before, after = load_run(filename=args.before), load_run(filename=args.after)
+    changes = diff_runs(before=before, after=after, threshold=args.threshold)
+
+    print(format_diff(changes=changes, before=before, after=after))
+
+    raise SystemExit(1 if any(change["regression"] for change in changes) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Regularization path search
+==========================
+
+Hyperparameter search of a linear model over a grid of `l1_ratio` x `C` values that walks the regularization path
+with warm starts instead of fitting every grid point from scratch like `GridSearchCV`.
+
+For each fold:
+    - the preprocessor is fitted once on the training split and the transformed train and validation matrices are
+      cached for the whole grid, instead of being recomputed for every grid point
+    - the grid points are visited in a snake order, from the strongest regularization (smallest C) to the weakest for
+      the first `l1_ratio` and back for the next one, so each fit starts from the coefficients of the neighbouring
+      grid point, which are already close to the solution and converge in a few epochs
+
+The report has the same attributes as the one of `GridSearchCV`: `best_params_`, `best_score_`, `best_index_`,
+`best_estimator_` and `cv_results_`, with the grid points in the same order, so both are interchangeable.
+"""
+import time
+
+from typing import Any, Optional, Union
+
+import numpy
+
+from joblib import Parallel, delayed
+from scipy.stats import rankdata
+from sklearn.base import BaseEstimator, clone, is_classifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, check_cv
+from sklearn.pipeline import Pipeline
+
+DEFAULT_L1_RATIOS = [x / 10 for x in range(11)]
+DEFAULT_CS = [10, 1.0, 0.1]
+
+
+def path_order(l1_ratios: list[float], Cs: list[float]) -> list[dict[str, float]]:
+    """Get the grid points in the order the regularization path is walked.
+
+    Args:
+        l1_ratios (list[float]): elastic-net mixing values
+        Cs (list[float]): inverse regularization strengths
+
+    Returns:
+        list[dict]: grid points, consecutive ones differ only in one parameter
+    """
+    order = []
+    Cs = sorted(Cs)
+
+    for position, l1_ratio in enumerate(sorted(l1_ratios)):
+        for C in Cs if position % 2 == 0 else Cs[::-1]:
+            order.append({"C": C, "l1_ratio": l1_ratio})
+
+    return order
+
+
+def _walk_fold(
+    preprocessor: Any, estimator: Any, X: Any, y: Any, train: numpy.ndarray, test: numpy.ndarray, order: list, scorer
+) -> tuple[list[float], list[float], list[tuple[numpy.ndarray, numpy.ndarray]]]:
+    """Fit the preprocessor on a fold and walk the regularization path on its cached transformed matrices.
+
+    Returns:
+        tuple: score, fit seconds and (coef_, intercept_) of each grid point, in the order of `order`
+    """
+    x_train, x_test = X.iloc[train], X.iloc[test]
+    y_train, y_test = y.iloc[train], y.iloc[test]
+
+    preprocessor = clone(preprocessor).fit(X=x_train, y=y_train)
+    x_train, x_test = preprocessor.transform(X=x_train), preprocessor.transform(X=x_test)
+
+    estimator = clone(estimator).set_params(warm_start=True)
+    scores, fit_times, coefs = [], [], []
+
+    for params in order:
+        start = time.perf_counter()
+        estimator.set_params(**params).fit(X=x_train, y=y_train)
+        fit_times.append(time.perf_counter() - start)
+
+        scores.append(scorer(estimator, x_test, y_test))
+        coefs.append((estimator.coef_.copy(), estimator.intercept_.copy()))
+
+    return scores, fit_times, coefs
+
+
+class RegularizationPathSearch(BaseEstimator):
+    """Cross-validated search over `l1_ratio` x `C` walking the regularization path with warm starts.
+
+    Args:
+        preprocessor (Any): unfitted transformer of the features, e.g. the one of `get_preprocessor`
+        estimator (Any, optional): linear model with `C`, `l1_ratio` and `warm_start` parameters, with an elastic-net
+            penalty. Defaults to an elastic-net `LogisticRegression` fitted with saga.
+        l1_ratios (list[float], optional): elastic-net mixing values. Defaults to 0.0, 0.1, ..., 1.0.
+        Cs (list[float], optional): inverse regularization strengths. Defaults to 10, 1.0 and 0.1.
+        cv (int, Any, optional): folds or cross-validation splitter. Defaults to 5.
+        scoring (str, Callable, optional): scorer of the validation splits. Defaults to "roc_auc".
+        n_jobs (int, optional): folds walked in parallel. Defaults to None, one.
+    """
+
+    def __init__(
+        self,
+        preprocessor: Any,
+        estimator: Optional[Any] = None,
+        l1_ratios: Optional[list[float]] = None,
+        Cs: Optional[list[float]] = None,
+        cv: Union[int, Any] = 5,
+        scoring: Union[str, Any] = "roc_auc",
+        n_jobs: Optional[int] = None,
+    ) -> None:
+        self.preprocessor = preprocessor
+        self.estimator = estimator
+        self.l1_ratios = l1_ratios
+        self.Cs = Cs
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+
+    def fit(self, X: Any, y: Any) -> "RegularizationPathSearch":
+        """Search the best grid point and refit the preprocessor and the estimator with it on the whole data.
+
+        Args:
+            X (pandas.DataFrame): features
+            y (pandas.Series): target
+
+        Returns:
+            RegularizationPathSearch: fitted search
+        """
+        estimator = self.estimator
+        if estimator is None:
+            estimator = LogisticRegression(solver="saga", max_iter=1000, random_state=42)
+            # the default penalty of scikit-learn < 1.8 is l2, which ignores l1_ratio, from 1.8 the penalty is
+            # deprecated and l1_ratio alone sets the elastic-net mix
+            if estimator.get_params()["penalty"] == "l2":
+                estimator.set_params(penalty="elasticnet")
+
+        grid = list(ParameterGrid({"C": self.Cs or DEFAULT_CS, "l1_ratio": self.l1_ratios or DEFAULT_L1_RATIOS}))
+        order = path_order(l1_ratios=self.l1_ratios or DEFAULT_L1_RATIOS, Cs=self.Cs or DEFAULT_CS)
+        # position in the walk of each grid point, to report them in the order of GridSearchCV
+        walk_index = [order.index(params) for params in grid]
+
+        cv = check_cv(self.cv, y=y, classifier=is_classifier(estimator))
+        scorer = check_scoring(estimator, scoring=self.scoring)
+
+        folds = Parallel(n_jobs=self.n_jobs)(
+            delayed(_walk_fold)(self.preprocessor, estimator, X, y, train, test, order, scorer)
+            for train, test in cv.split(X, y)
+        )
+
+        scores = numpy.array([fold_scores for fold_scores, _, _ in folds])[:, walk_index]
+        fit_times = numpy.array([fold_times for _, fold_times, _ in folds])[:, walk_index]
+        mean_scores = scores.mean(axis=0)
+
+        self.cv_results_ = {
+            "params": grid,
+            "param_C": numpy.array([params["C"] for params in grid]),
+            "param_l1_ratio": numpy.array([params["l1_ratio"] for params in grid]),
+            **{f"split{fold}_test_score": fold_scores for fold, fold_scores in enumerate(scores)},
+            "mean_test_score": mean_scores,
+            "std_test_score": scores.std(axis=0),
+            "rank_test_score": rankdata(-mean_scores, method="min").astype(numpy.int32),
+            "mean_fit_time": fit_times.mean(axis=0),
+        }
+        self.best_index_ = int(numpy.argmax(mean_scores))
+        self.best_params_ = grid[self.best_index_]
+        self.best_score_ = float(mean_scores[self.best_index_])
+        self.n_splits_ = len(folds)
+
+        # refit warm-started from the mean of the coefficients of the folds at the best grid point
+        preprocessor = clone(self.preprocessor).fit(X=X, y=y)
+        best_estimator = clone(estimator).set_params(warm_start=True, **self.best_params_)
+        best_coefs = [coefs[walk_index[self.best_index_]] for _, _, coefs in folds]
+        best_estimator.coef_ = numpy.mean([coef for coef, _ in best_coefs], axis=0)
+        best_estimator.intercept_ = numpy.mean([intercept for _, intercept in best_coefs], axis=0)
+        best_estimator.fit(X=preprocessor.transform(X=X), y=y)
+
+        self.best_estimator_ = Pipeline([("preprocessor", preprocessor), ("classifier", best_estimator)])
+
+        return self
+
+    def predict(self, X: Any) -> numpy.ndarray:
+        """Predict with the best estimator."""
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X: Any) -> numpy.ndarray:
+        """Predict the class probabilities with the best estimator."""
+        return self.best_estimator_.predict_proba(X)
+
+    def score(self, X: Any, y: Any) -> float:
+        """Score the best estimator with the scoring of the search."""
+        return check_scoring(self.best_estimator_, scoring=self.scoring)(self.best_estimator_, X, y)
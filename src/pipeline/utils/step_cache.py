@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Step cache
+==========
+
+Content-addressed cache of the output artifacts of the pipeline steps decorated with `pipe_args`.
+
+The key of a step run is the SHA-256 fingerprint of:
+    - the contents of its input file
+    - the source code of the step
+    - the source code of the module defining the step, of the project modules of the functions and classes it
+      imports, e.g. `get_preprocessor` or `OnlineRegress`, and of the whole `pipeline.utils` package
+    - its arguments, except the ones that only say where to read and write the artifacts
+    - the contents of its side inputs: the arguments naming a file of the artifact path, e.g. the `--base-model` of
+      the online training
+
+So a cached artifact is never reused once any of them change, and the stale entries are evicted least recently used
+first when the cache grows over its size cap. Helpers imported indirectly, through another module of the project
+outside of `pipeline.utils`, aren't covered: run with `--no-cache` after editing them.
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+import shutil
+import sys
+
+from typing import Any, Callable, Optional, Union
+
+import joblib
+
+# arguments that don't change the output of a step
+IGNORED_ARGS = {
+    "artifact_path",
+    "input_file",
+    "output_file",
+    "requirements",
+    "no_cache",
+    "cache_dir",
+    "cache_max_mb",
+    "mmap_mode",
+    "chunk_size",
+    "profile",
+    "profile_memory",
+    "profile_report",
+}
+
+DEFAULT_CACHE_DIR = ".step_cache"
+DEFAULT_MAX_MB = 1024.0
+
+# the modules of the project are the ones under it, the rest are dependencies whose version doesn't change per run
+SOURCE_ROOT = pathlib.Path(__file__).resolve().parents[2]
+UTILS_DIR = pathlib.Path(__file__).resolve().parent
+
+
+def file_digest(path: Union[str, pathlib.Path]) -> str:
+    """Get the SHA-256 hex digest of the contents of a file.
+
+    Args:
+        path (str, pathlib.Path): file path
+
+    Returns:
+        str: hex digest
+    """
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+def source_digest(step: Callable) -> str:
+    """Get the SHA-256 hex digest of the source code of a step, or of its bytecode if the source isn't available.
+
+    Args:
+        step (Callable): pipeline step
+
+    Returns:
+        str: hex digest
+    """
+    step = inspect.unwrap(step)
+
+    try:
+        source = inspect.getsource(step).encode()
+    except (OSError, TypeError):
+        source = step.__code__.co_code + repr(step.__code__.co_consts).encode()
+
+    return hashlib.sha256(source).hexdigest()
+
+
+def module_files(step: Callable) -> list[pathlib.Path]:
+    """Get the source files of the module defining a step and of the project modules it imports from.
+
+    Args:
+        step (Callable): pipeline step
+
+    Returns:
+        list[pathlib.Path]: sorted source files under `SOURCE_ROOT`, the module of the step and the `pipeline.utils`
+            package included
+    """
+    step = inspect.unwrap(step)
+    module = sys.modules.get(step.__module__)
+    objects = [module, *vars(module).values()] if module is not None else []
+
+    files = set(UTILS_DIR.glob("*.py"))
+    for obj in objects:
+        obj_module = obj if inspect.ismodule(obj) else inspect.getmodule(obj)
+        try:
+            path = inspect.getsourcefile(obj_module) if obj_module is not None else None
+        except TypeError:
+            # builtin modules
+            path = None
+
+        if path is not None and pathlib.Path(path).resolve().is_relative_to(SOURCE_ROOT):
+            files.add(pathlib.Path(path).resolve())
+
+    return sorted(files)
+
+
+def modules_digest(step: Callable) -> str:
+    """Get the SHA-256 hex digest of the source files of `module_files`.
+
+    Args:
+        step (Callable): pipeline step
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.sha256()
+
+    for path in module_files(step=step):
+        digest.update(str(path.relative_to(SOURCE_ROOT) if path.is_relative_to(SOURCE_ROOT) else path).encode())
+        digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+def fingerprint(step: Callable, args: argparse.Namespace, input_path: Optional[Union[str, pathlib.Path]]) -> str:
+    """Get the cache key of a step run.
+
+    Args:
+        step (Callable): pipeline step
+        args (argparse.Namespace): arguments of the step
+        input_path (str, pathlib.Path, optional): input file of the step, None if it has no input
+
+    Returns:
+        str: hex digest identifying the inputs, code and arguments of the run
+    """
+    arguments = {key: value for key, value in vars(args).items() if key not in IGNORED_ARGS}
+
+    artifact_path = getattr(args, "artifact_path", None)
+    side_inputs = {
+        name: file_digest(path=os.path.join(artifact_path, value))
+        for name, value in arguments.items()
+        if artifact_path and isinstance(value, str) and os.path.isfile(os.path.join(artifact_path, value))
+    }
+
+    key = {
+        "step": f"{step.__module__}.{step.__qualname__}",
+        "source": source_digest(step=step),
+        "modules": modules_digest(step=step),
+        "input": file_digest(path=input_path) if input_path else None,
+        "args": json.dumps(arguments, sort_keys=True, default=str),
+        "side_inputs": side_inputs,
+    }
+
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+class StepCache:
+    """Directory of cached step artifacts named by their fingerprint, capped in size.
+
+    Args:
+        directory (str, pathlib.Path): cache directory, created if needed
+        max_bytes (int): size cap of the cache, the least recently used artifacts are evicted over it
+    """
+
+    def __init__(self, directory: Union[str, pathlib.Path], max_bytes: int = int(DEFAULT_MAX_MB * 2**20)) -> None:
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str, suffix: str = ".joblib") -> pathlib.Path:
+        """Get the path of the artifact of a key, the suffix is the one of the format of the artifact."""
+        return self.directory / f"{key}{suffix}"
+
+    def entries(self) -> list[pathlib.Path]:
+        """Get the paths of the cached artifacts."""
+        return [path for path in self.directory.iterdir() if path.is_file() and path.suffix != ".tmp"]
+
+    def get(self, key: str) -> Optional[pathlib.Path]:
+        """Get the cached artifact of a key and mark it as recently used.
+
+        Args:
+            key (str): fingerprint of the step run
+
+        Returns:
+            pathlib.Path: path of the artifact, None on a cache miss
+        """
+        path = next((path for path in self.directory.glob(f"{key}.*") if path.suffix != ".tmp"), None)
+
+        if path is None:
+            return None
+
+        os.utime(path)
+
+        return path
+
+    def put(self, key: str, artifacts: Any, output_path: Optional[Union[str, pathlib.Path]] = None) -> pathlib.Path:
+        """Store the artifacts of a step run and evict the least recently used ones over the size cap.
+
+        Args:
+            key (str): fingerprint of the step run
+            artifacts (Any): output of the step, ignored if `output_path` is given
+            output_path (str, pathlib.Path, optional): output artifact already written by the step in any format, it's
+                copied into the cache instead of being serialized again
+
+        Returns:
+            pathlib.Path: path of the cached artifact
+        """
+        path = self.path(key=key, suffix=pathlib.Path(output_path).suffix if output_path is not None else ".joblib")
+        tmp_path = self.directory / f"{key}.{os.getpid()}.tmp"
+
+        for stale in self.directory.glob(f"{key}.*"):
+            if stale.suffix != ".tmp" and stale != path:
+                stale.unlink(missing_ok=True)
+
+        if output_path is not None:
+            # copied, not hard-linked: a later write through the output file, e.g. a r+ memmap, would change the entry
+            shutil.copyfile(output_path, tmp_path)
+        else:
+            joblib.dump(artifacts, filename=tmp_path)
+
+        # atomic, a concurrent reader never sees a half-written artifact
+        os.replace(tmp_path, path)
+        self.evict()
+
+        return path
+
+    def restore(self, path: pathlib.Path, output_path: Union[str, pathlib.Path]) -> None:
+        """Copy a cached artifact to the output path of a step, the output file never shares the entry's inode.
+
+        Args:
+            path (pathlib.Path): cached artifact
+            output_path (str, pathlib.Path): output file of the step
+        """
+        output_path = pathlib.Path(output_path)
+        output_path.unlink(missing_ok=True)
+
+        shutil.copyfile(path, output_path)
+
+    def size(self) -> int:
+        """Get the total size in bytes of the cached artifacts."""
+        return sum(path.stat().st_size for path in self.entries())
+
+    def evict(self) -> list[pathlib.Path]:
+        """Remove the least recently used artifacts until the cache fits in `max_bytes`.
+
+        Returns:
+            list[pathlib.Path]: removed artifacts
+        """
+        entries = sorted((path.stat().st_mtime, path.stat().st_size, path) for path in self.entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted.append(path)
+
+        return evicted
+
+    def clear(self) -> None:
+        """Remove every cached artifact."""
+        for path in self.entries():
+            path.unlink(missing_ok=True)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming preprocessor
+======================
+
+Out-of-core equivalent of `get_preprocessor`, fitted from an iterator of chunks of rows instead of a whole frame.
+
+While fitting it only keeps, per column:
+    - numerical: the running sum and count of the non-missing values, for the mean imputation, and their running
+      minimum and maximum, for the min-max scaling
+    - categorical: the frequency table of the non-missing values, for the most frequent imputation, whose keys are
+      the vocabulary of the one-hot encoding
+
+`freeze` turns those statistics into a transformer whose output is the one of `get_preprocessor` fitted on the
+concatenation of all the chunks: the same columns in the same order, with the same dense or sparse format.
+"""
+from collections import Counter
+from typing import Iterable, Optional
+
+import numpy
+import pandas
+
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.preprocessing import MinMaxScaler
+
+# ColumnTransformer default, its output is sparse if its density is lower
+SPARSE_THRESHOLD = 0.3
+
+
+class FrozenPreprocessor(TransformerMixin, BaseEstimator):
+    """Transformer with the statistics of a `StreamingPreprocessor`, see `StreamingPreprocessor.freeze`.
+
+    It's already fitted, `fit` does nothing so it can be a step of a `Pipeline`.
+
+    Args:
+        means (pandas.Series): mean imputation value of each numerical column
+        scaler (MinMaxScaler): scaler of the imputed numerical columns
+        most_frequent (dict[str, Any]): imputation value of each categorical column
+        categories (dict[str, list]): sorted vocabulary of each categorical column
+        remainder (list[str]): columns passed through as they are
+        sparse_output (bool): return a scipy CSR matrix instead of a numpy array
+    """
+
+    def __init__(
+        self,
+        means: pandas.Series,
+        scaler: MinMaxScaler,
+        most_frequent: dict,
+        categories: dict[str, list],
+        remainder: list[str],
+        sparse_output: bool,
+    ) -> None:
+        self.means = means
+        self.scaler = scaler
+        self.most_frequent = most_frequent
+        self.categories = categories
+        self.remainder = remainder
+        self.sparse_output = sparse_output
+
+    def fit(self, X: pandas.DataFrame, y=None) -> "FrozenPreprocessor":
+        """Do nothing, the statistics come from the streamed fit."""
+        return self
+
+    def transform(self, X: pandas.DataFrame):
+        """Impute, scale and one-hot encode the rows.
+
+        Args:
+            X (pandas.DataFrame): rows with the columns seen while fitting
+
+        Returns:
+            numpy.ndarray | scipy.sparse.csr_matrix: numerical, one-hot encoded and passed through columns
+        """
+        numerical = X[self.means.index].astype(numpy.float64).fillna(self.means).to_numpy()
+        blocks = [self.scaler.transform(numerical)] if len(self.means) else []
+
+        for col, vocabulary in self.categories.items():
+            values = X[col].where(X[col].notna(), self.most_frequent[col]).to_numpy()
+            # unknown categories are all zeros, like handle_unknown="ignore"
+            codes = pandas.Index(vocabulary).get_indexer(values)
+            rows = numpy.flatnonzero(codes >= 0)
+            blocks.append(
+                sparse.csr_matrix(
+                    (numpy.ones(rows.size), (rows, codes[rows])), shape=(len(X), len(vocabulary)), dtype=numpy.float64
+                )
+            )
+
+        if self.remainder:
+            blocks.append(X[self.remainder].to_numpy())
+
+        if self.sparse_output:
+            return sparse.hstack(blocks).tocsr()
+
+        return numpy.hstack([block.toarray() if sparse.issparse(block) else block for block in blocks])
+
+    def get_feature_names_out(self, input_features=None) -> numpy.ndarray:
+        """Get the names of the output columns, the ones of `get_preprocessor`."""
+        one_hot = [f"{col}_{category}" for col, vocabulary in self.categories.items() for category in vocabulary]
+
+        return numpy.asarray(
+            [f"numerical__{col}" for col in self.means.index]
+            + [f"categorical__{name}" for name in one_hot]
+            + [f"remainder__{col}" for col in self.remainder],
+            dtype=object,
+        )
+
+
+class StreamingPreprocessor:
+    """Preprocessor of `get_preprocessor` fitted chunk by chunk.
+
+    Args:
+        categorical_columns (list[str]): columns imputed with their most frequent value and one-hot encoded
+        numerical_columns (list[str]): columns imputed with their mean and min-max scaled
+    """
+
+    def __init__(self, categorical_columns: list[str], numerical_columns: list[str]) -> None:
+        self.categorical_columns = categorical_columns
+        self.numerical_columns = numerical_columns
+        self.columns: Optional[list[str]] = None
+        self.n_rows = 0
+        self.sums = numpy.zeros(len(numerical_columns))
+        self.counts = numpy.zeros(len(numerical_columns), dtype=numpy.int64)
+        self.mins = numpy.full(len(numerical_columns), numpy.nan)
+        self.maxs = numpy.full(len(numerical_columns), numpy.nan)
+        self.frequencies = {col: Counter() for col in categorical_columns}
+
+    def partial_fit(self, chunk: pandas.DataFrame) -> "StreamingPreprocessor":
+        """Update the statistics with a chunk of rows.
+
+        Args:
+            chunk (pandas.DataFrame): rows with all the columns
+
+        Returns:
+            StreamingPreprocessor: itself
+        """
+        if self.columns is None:
+            self.columns = chunk.columns.tolist()
+
+        if self.numerical_columns:
+            numerical = chunk[self.numerical_columns].astype(numpy.float64)
+            self.sums += numerical.sum(axis=0).to_numpy()
+            self.counts += numerical.notna().sum(axis=0).to_numpy()
+            # the missing values are ignored, the mean imputation never moves the minimum or the maximum
+            self.mins = numpy.fmin(self.mins, numerical.min(axis=0).to_numpy())
+            self.maxs = numpy.fmax(self.maxs, numerical.max(axis=0).to_numpy())
+
+        for col in self.categorical_columns:
+            self.frequencies[col].update(chunk[col].value_counts(dropna=True).to_dict())
+
+        self.n_rows += len(chunk)
+
+        return self
+
+    def fit(self, chunks: Iterable[pandas.DataFrame]) -> "StreamingPreprocessor":
+        """Update the statistics with every chunk of an iterator, e.g. the chunks of `iter_artifact_chunks`.
+
+        Args:
+            chunks (Iterable[pandas.DataFrame]): chunks of rows
+
+        Returns:
+            StreamingPreprocessor: itself
+        """
+        for chunk in chunks:
+            self.partial_fit(chunk=chunk)
+
+        return self
+
+    def freeze(self) -> FrozenPreprocessor:
+        """Turn the statistics into a transformer equivalent to `get_preprocessor` fitted on all the chunks seen.
+
+        The columns without any non-missing value are dropped, like the imputers of `get_preprocessor` do.
+
+        Returns:
+            FrozenPreprocessor: fitted transformer
+        """
+        if self.columns is None:
+            raise ValueError("StreamingPreprocessor isn't fitted, call partial_fit or fit with some rows first")
+
+        observed = self.counts > 0
+        means = pandas.Series(
+            self.sums[observed] / self.counts[observed], index=numpy.asarray(self.numerical_columns)[observed]
+        )
+
+        # fitted on the minimum and the maximum, the only statistics it keeps
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        if observed.any():
+            scaler.fit(numpy.vstack([self.mins[observed], self.maxs[observed]]))
+
+        most_frequent, categories = {}, {}
+        for col, frequencies in self.frequencies.items():
+            if not frequencies:
+                continue
+
+            top = max(frequencies.values())
+            # ties are broken by the smallest value, like by SimpleImputer
+            most_frequent[col] = min(value for value, count in frequencies.items() if count == top)
+            categories[col] = sorted(frequencies)
+
+        remainder = [col for col in self.columns if col not in {*self.numerical_columns, *self.categorical_columns}]
+
+        # every row has a single one per categorical column, so the density doesn't depend on the number of rows
+        n_dense = len(means) + len(remainder)
+        n_columns = n_dense + sum(len(vocabulary) for vocabulary in categories.values())
+        sparse_output = bool(categories) and (n_dense + len(categories)) / n_columns < SPARSE_THRESHOLD
+
+        return FrozenPreprocessor(
+            means=means,
+            scaler=scaler,
+            most_frequent=most_frequent,
+            categories=categories,
+            remainder=remainder,
+            sparse_output=sparse_output,
+        )
@@ -14,14 +14,16 @@ Title
 from math import ceil
 from typing import Literal
 
-import seaborn
-from matplotlib import pyplot
 from pandas import DataFrame
 
 
 def __create_grid_for_plots(
     data: DataFrame, variables: list, ncols: int, plot: Literal["boxplot", "scatter"], target: str = None
 ) -> None:
+    # imported here, matplotlib and seaborn take long to import and only the plots need them
+    import seaborn
+    from matplotlib import pyplot
+
     nrows = ceil(len(variables) / ncols)
 
     figsize = (20 * ncols, 15 * nrows)
@@ -99,6 +101,8 @@ def plot_univariate_boxplots(data: DataFrame, variables: list[str] | None = None
     Returns:
 
     """
+    import seaborn
+
     if variables is None:
         variables = data.select_dtypes("number").columns.to_list()
 
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Fixtures for the microservice tests."""
+import pandas
+import pytest
+
+from sklearn.linear_model import LinearRegression
+
+from src.common.synthetic import make_districts, make_target
+from src.experiments.california_preprocessor import CaliforniaPreprocessor
+from src.microservice.api.endpoint import app
+from src.microservice.api.inference import InferencePipeline
+
+
+@pytest.fixture(scope="session", name="districts")
+def get_districts() -> pandas.DataFrame:
+    """Synthetic districts used to fit the pipeline."""
+    return make_districts(n_rows=300)
+
+
+@pytest.fixture(scope="session", name="inference_pipeline")
+def get_inference_pipeline(districts) -> InferencePipeline:
+    """Inference pipeline fitted on the synthetic districts."""
+    preprocessor = CaliforniaPreprocessor()
+    preprocessor.preprocess(data=districts, transform_data=False)
+
+    model = LinearRegression().fit(X=preprocessor.transformer.transform(X=districts), y=make_target(districts))
+
+    return InferencePipeline(preprocessor=preprocessor, model=model, version="test")
+
+
+@pytest.fixture(name="client")
+def get_client(inference_pipeline):
+    """Flask test client with the fitted pipeline loaded."""
+    app.config.update(TESTING=True)
+    app.extensions["inference_pipeline"] = inference_pipeline
+
+    yield app.test_client()
+
+    app.extensions.pop("inference_pipeline", None)
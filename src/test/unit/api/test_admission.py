@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""Test the admission control of the prediction requests."""
+import threading
+import time
+
+import pytest
+
+from src.microservice.api.admission import REJECTIONS, AdmissionController, Rejected, request_deadline
+from src.microservice.api.batching import MicroBatcher
+from src.microservice.api.endpoint import app
+
+
+@pytest.fixture(name="controller")
+def get_controller():
+    """Admission controller of one slot and one queued request attached to the app."""
+    controller = AdmissionController(max_in_flight=1, max_queued=1)
+    app.extensions["admission_controller"] = controller
+
+    yield controller
+
+    app.extensions.pop("admission_controller", None)
+
+
+def test_admission_rejects_when_queue_full(controller):
+    controller.acquire()
+    waiting = threading.Thread(target=controller.acquire)
+    waiting.start()
+    time.sleep(0.05)
+
+    with pytest.raises(Rejected) as err:
+        controller.acquire()
+
+    assert err.value.status == 429
+    controller.release()
+    waiting.join(timeout=5)
+    assert controller.in_flight == 1 and controller.queued == 0
+
+
+def test_admission_deadline_while_queued(controller):
+    controller.acquire()
+
+    with pytest.raises(Rejected) as err:
+        controller.acquire(deadline=request_deadline(timeout_ms=10))
+
+    assert err.value.status == 503
+    assert controller.queued == 0
+
+
+def test_predict_overloaded(client, controller, districts):
+    controller.max_queued = 0
+    controller.acquire()
+    rejections = REJECTIONS["overloaded"].value
+
+    response = client.post("/predict", json=districts.head(1).to_dict(orient="records"))
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert REJECTIONS["overloaded"].value == rejections + 1
+
+
+def test_predict_expired_deadline(client, controller, districts):
+    response = client.post(
+        "/predict", json=districts.head(1).to_dict(orient="records"), headers={"X-Request-Timeout-Ms": "1e-6"}
+    )
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+    assert controller.in_flight == 0
+
+
+def test_predict_admitted(client, controller, districts):
+    response = client.post("/predict", json=districts.head(3).to_dict(orient="records"))
+
+    assert response.status_code == 200
+    assert controller.in_flight == 0
+
+
+def test_micro_batcher_drops_expired_rows(districts):
+    scored = []
+    batcher = MicroBatcher(predict=lambda data: scored.append(len(data)) or data.index.to_numpy()).start()
+
+    with pytest.raises(Rejected):
+        batcher.predict(data=districts.head(1), timeout=5, deadline=time.monotonic())
+
+    batcher.stop()
+
+    assert scored == []
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Test the micro-batching of single-row predictions."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+import pytest
+
+from src.microservice.api.batching import MicroBatcher
+
+
+def test_micro_batcher_coalesces_rows(districts, inference_pipeline):
+    batch_sizes = []
+
+    def predict(data):
+        batch_sizes.append(len(data))
+        return inference_pipeline.predict(data=data)
+
+    batcher = MicroBatcher(predict=predict, max_batch_size=16, max_wait_ms=50).start()
+    rows = [districts.iloc[[idx]] for idx in range(64)]
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        predictions = list(executor.map(batcher.predict, rows))
+
+    batcher.stop()
+
+    numpy.testing.assert_allclose(numpy.concatenate(predictions), inference_pipeline.predict(data=districts.head(64)))
+    assert max(batch_sizes) > 1, "Requests weren't coalesced"
+    assert max(batch_sizes) <= 16
+
+
+def test_micro_batcher_propagates_errors(districts):
+    def predict(data):
+        raise ValueError("broken model")
+
+    batcher = MicroBatcher(predict=predict, max_batch_size=4, max_wait_ms=1).start()
+
+    with pytest.raises(ValueError):
+        batcher.predict(data=districts.head(1), timeout=5)
+
+    batcher.stop()
+
+
+def test_micro_batcher_not_started(districts):
+    with pytest.raises(RuntimeError):
+        MicroBatcher(predict=len).submit(data=districts.head(1))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Test the prediction cache."""
+import time
+
+import numpy
+import pytest
+
+from src.microservice.api.cache import (
+    MemoryPredictionCache,
+    SQLitePredictionCache,
+    cached_predict,
+    canonicalize,
+    row_keys,
+)
+from src.microservice.api.endpoint import app
+
+
+@pytest.fixture(params=["memory", "sqlite"], name="cache_factory")
+def get_cache_factory(request, tmp_path):
+    if request.param == "memory":
+        return MemoryPredictionCache
+    return lambda **kwargs: SQLitePredictionCache(path=tmp_path / "cache.sqlite", **kwargs)
+
+
+def test_row_keys_canonical(districts):
+    rows = districts.head(3)
+    noisy = rows.copy()
+    noisy["longitude"] += 1e-9
+    noisy["ocean_proximity"] = noisy["ocean_proximity"].str.lower() + " "
+
+    keys = row_keys(data=canonicalize(data=rows), model_version="v1")
+
+    assert keys == row_keys(data=canonicalize(data=noisy[noisy.columns[::-1]]), model_version="v1")
+    assert keys != row_keys(data=canonicalize(data=rows), model_version="v2"), "Model version isn't in the key"
+    assert len(set(keys)) == 3
+
+
+def test_cache_lru_eviction(cache_factory):
+    cache = cache_factory(max_entries=2, ttl=60)
+
+    cache.set_many(keys=["a", "b"], values=[1.0, 2.0])
+    cache.get_many(keys=["a"])
+    cache.set_many(keys=["c"], values=[3.0])
+
+    assert cache.get_many(keys=["a", "b", "c"]) == [1.0, None, 3.0]
+    assert cache.stats.evictions == 1
+    assert cache.stats.hits == 3 and cache.stats.misses == 1
+
+
+def test_cache_ttl_expiration(cache_factory):
+    cache = cache_factory(max_entries=10, ttl=0.05)
+
+    cache.set_many(keys=["a"], values=[1.0])
+    time.sleep(0.1)
+
+    assert cache.get_many(keys=["a"]) == [None]
+
+
+def test_sqlite_cache_sweeps_periodically(tmp_path):
+    cache = SQLitePredictionCache(path=tmp_path / "cache.sqlite", max_entries=100, ttl=0.5, sweep_every=3)
+
+    cache.set_many(keys=["a"], values=[1.0])
+    time.sleep(0.6)
+    cache.set_many(keys=["b"], values=[2.0])
+
+    assert len(cache) == 2 and cache.get_many(keys=["a"]) == [None]
+
+    cache.set_many(keys=["c"], values=[3.0])
+
+    assert len(cache) == 2 and cache.stats.expirations == 1
+
+
+def test_sqlite_cache_batch_above_variable_limit(tmp_path):
+    cache = SQLitePredictionCache(path=tmp_path / "cache.sqlite", max_entries=50_000)
+    # above the 32766 variables SQLite binds per statement
+    keys = [f"key-{idx}" for idx in range(40_000)]
+
+    cache.set_many(keys=keys[::2], values=numpy.arange(20_000, dtype=numpy.float64))
+    values = cache.get_many(keys=keys)
+
+    assert values[::2] == list(numpy.arange(20_000, dtype=numpy.float64)) and values[1::2] == [None] * 20_000
+    assert cache.stats.hits == 20_000 and cache.stats.misses == 20_000
+
+
+def test_cached_predict(districts, inference_pipeline):
+    cache = MemoryPredictionCache()
+    scored = []
+
+    def predict(data):
+        scored.append(len(data))
+        return inference_pipeline.predict(data=data)
+
+    first = cached_predict(cache=cache, data=districts.head(10), model_version="v1", predict=predict)
+    second = cached_predict(cache=cache, data=districts.head(20), model_version="v1", predict=predict)
+
+    assert scored == [10, 10], "Cached rows were scored again"
+    numpy.testing.assert_allclose(second[:10], first)
+    numpy.testing.assert_allclose(second, inference_pipeline.predict(data=districts.head(20)), rtol=1e-6)
+
+
+def test_predict_endpoint_cache(client, districts):
+    app.extensions["prediction_cache"] = MemoryPredictionCache()
+    rows = districts.head(5).to_dict(orient="records")
+
+    first = client.post("/predict", json=rows).json["predictions"]
+    second = client.post("/predict", json=rows).json["predictions"]
+    stats = app.extensions.pop("prediction_cache").stats
+
+    assert first == second
+    assert stats.hits == 5 and stats.misses == 5
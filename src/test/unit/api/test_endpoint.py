@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Test the prediction endpoints of the microservice."""
+import numpy
+import pytest
+
+from src.microservice.api.endpoint import app
+from src.microservice.api.inference import InferencePipeline, payload_to_frame
+
+
+def test_predict_records(client, districts, inference_pipeline):
+    rows = districts.head(5).to_dict(orient="records")
+
+    response = client.post("/predict", json=rows)
+
+    assert response.status_code == 200
+    assert response.json["model_version"] == "test"
+    numpy.testing.assert_allclose(response.json["predictions"], inference_pipeline.predict(data=districts.head(5)))
+
+
+def test_predict_columnar(client, districts):
+    records = client.post("/predict", json=districts.head(5).to_dict(orient="records")).json["predictions"]
+    columnar = client.post("/predict", json=districts.head(5).to_dict(orient="list")).json["predictions"]
+
+    numpy.testing.assert_allclose(records, columnar)
+
+
+@pytest.mark.parametrize("payload", [None, [], [{"longitude": 1.0}], [{"longitude": "abc"}]])
+def test_predict_invalid_payload(client, payload):
+    response = client.post("/predict", json=payload)
+
+    assert response.status_code == 400
+
+
+def test_predict_empty_batch(client, districts):
+    response = client.post("/predict", json=districts.head(0).to_dict(orient="list"))
+
+    assert response.status_code == 400
+    assert "Empty batch" in response.json["error"]
+
+
+def test_predict_without_model():
+    app.extensions.pop("inference_pipeline", None)
+
+    response = app.test_client().post("/predict", json=[])
+
+    assert response.status_code == 503
+
+
+def test_payload_single_row(districts):
+    frame = payload_to_frame(payload=districts.iloc[0].to_dict())
+
+    assert frame.shape == (1, districts.shape[1])
+
+
+def test_pipeline_dump_load(tmp_path, districts, inference_pipeline):
+    inference_pipeline.dump(path=tmp_path / "pipeline.joblib")
+
+    loaded = InferencePipeline.load(path=tmp_path / "pipeline.joblib")
+
+    assert loaded.version == "test"
+    numpy.testing.assert_allclose(loaded.predict(data=districts), inference_pipeline.predict(data=districts))
+
+
+def test_pipeline_load_mmap(tmp_path, districts, inference_pipeline):
+    inference_pipeline.dump(path=tmp_path / "pipeline.joblib")
+
+    loaded = InferencePipeline.load(path=tmp_path / "pipeline.joblib", mmap_mode="r")
+
+    assert isinstance(loaded.model.coef_, numpy.memmap), "Model parameters aren't memory-mapped"
+    numpy.testing.assert_allclose(loaded.predict(data=districts), inference_pipeline.predict(data=districts))
+
+
+def test_pipeline_compiled(districts, inference_pipeline):
+    compiled = InferencePipeline(preprocessor=inference_pipeline.preprocessor, model=inference_pipeline.model).compile()
+
+    numpy.testing.assert_allclose(compiled.predict(data=districts), inference_pipeline.predict(data=districts))
+    numpy.testing.assert_allclose(
+        compiled.predict_batch(data=districts.head(3)), inference_pipeline.predict(data=districts.head(3))
+    )
+
+
+def test_ready_after_warm_up(client, inference_pipeline):
+    pipeline = InferencePipeline(preprocessor=inference_pipeline.preprocessor, model=inference_pipeline.model)
+    app.extensions["inference_pipeline"] = pipeline
+
+    assert client.get("/ready").status_code == 503
+
+    timings = pipeline.warm_up(batch_sizes=(1, 64), rounds=2)
+
+    assert client.get("/ready").status_code == 200
+    assert {batch_size: len(seconds) for batch_size, seconds in timings.items()} == {1: 2, 64: 2}
+    assert client.get("/ping").status_code == 200
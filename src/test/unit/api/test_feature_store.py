@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Test the feature store behind the /main route."""
+import numpy
+import pytest
+
+from src.microservice.api.endpoint import app
+from src.microservice.api.feature_store import ConnectionPool, FeatureStore, build_feature_store
+from src.microservice.api.inference import InferencePipeline
+
+
+@pytest.fixture(name="store")
+def get_store(tmp_path, districts, inference_pipeline):
+    """Feature store of the synthetic districts, with the first 50 of them precomputed."""
+    with_ids = districts.assign(id1=range(len(districts)), id2=7, id3="v1")
+    build_feature_store(pipeline=inference_pipeline, districts=with_ids, directory=tmp_path)
+
+    store = FeatureStore(directory=tmp_path, pool_size=2)
+    store.index = {key: row for key, row in store.index.items() if row < 50}
+    app.extensions["feature_store"] = store
+
+    yield store
+
+    app.extensions.pop("feature_store", None)
+    store.close()
+
+
+def test_precomputed_features(store, districts, inference_pipeline):
+    numpy.testing.assert_allclose(store.features_of((3, 7, "v1")), inference_pipeline.transform(districts.iloc[3:4]))
+    assert store.features_of((3, 7, "v2")) is None
+
+
+@pytest.mark.parametrize("id1, source", [(3, "feature_store"), (120, "database")])
+def test_main_request(client, store, districts, inference_pipeline, id1, source):
+    response = client.get(f'/main/id1={id1};id2=7;id3="v1"')
+
+    assert response.status_code == 200
+    assert response.json["source"] == source
+    assert response.json["id"] == [id1, 7, "v1"]
+    numpy.testing.assert_allclose(
+        response.json["prediction"], inference_pipeline.predict(data=districts.iloc[id1 : id1 + 1])[0]
+    )
+
+
+def test_main_request_other_model_version(client, store, inference_pipeline):
+    app.extensions["inference_pipeline"] = InferencePipeline(
+        preprocessor=inference_pipeline.preprocessor, model=inference_pipeline.model, version="other"
+    )
+
+    response = client.get("/main/id1=3;id2=7;id3=v1")
+
+    assert response.status_code == 200
+    assert response.json["source"] == "database"
+
+
+def test_main_request_unknown_district(client, store):
+    assert client.get("/main/id1=3;id2=8;id3=v1").status_code == 404
+
+
+def test_main_request_without_store(client):
+    assert client.get("/main/id1=3;id2=7;id3=v1").status_code == 503
+
+
+def test_connection_pool_timeout(tmp_path):
+    pool = ConnectionPool(path=tmp_path / "db.sqlite", size=1, timeout=0.01)
+
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+
+    pool.close()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Test the binary formats of the prediction requests."""
+import io
+
+import numpy
+import pyarrow
+import pytest
+
+from exper.constant import OCEAN_PROXIMITY
+from src.microservice.api.constants import NUMERICAL_COLUMNS
+from src.microservice.api.formats import ARROW_STREAM, NPY
+
+
+def to_npy(matrix: numpy.ndarray) -> bytes:
+    sink = io.BytesIO()
+    numpy.save(sink, matrix)
+    return sink.getvalue()
+
+
+def test_predict_arrow(client, districts, inference_pipeline):
+    table = pyarrow.Table.from_pandas(districts.head(20), preserve_index=False)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    response = client.post("/predict", data=sink.getvalue().to_pybytes(), content_type=ARROW_STREAM)
+    result = pyarrow.ipc.open_stream(response.data).read_all()
+
+    assert response.status_code == 200
+    assert response.headers["X-Model-Version"] == inference_pipeline.version
+    assert result.schema.metadata[b"model_version"] == inference_pipeline.version.encode()
+    numpy.testing.assert_allclose(
+        result["prediction"].to_numpy(), inference_pipeline.predict(data=districts.head(20)), rtol=1e-12
+    )
+
+
+def test_predict_npy_float32(client, districts, inference_pipeline):
+    rows = districts.head(20)
+    codes = rows["ocean_proximity"].map(OCEAN_PROXIMITY.index).to_numpy()
+    matrix = numpy.column_stack([rows[NUMERICAL_COLUMNS].to_numpy(), codes]).astype(numpy.float32)
+
+    response = client.post(
+        "/predict",
+        data=to_npy(matrix),
+        content_type=NPY,
+        headers={"X-Columns": ",".join([*NUMERICAL_COLUMNS, "ocean_proximity"])},
+    )
+    predictions = numpy.load(io.BytesIO(response.data))
+
+    expected = rows.copy()
+    expected[NUMERICAL_COLUMNS] = matrix[:, :-1].astype(numpy.float64)
+
+    assert response.status_code == 200
+    assert predictions.dtype == numpy.float32
+    numpy.testing.assert_allclose(predictions, inference_pipeline.predict(data=expected), rtol=1e-5)
+
+
+def test_predict_npy_accept_json(client, districts):
+    matrix = numpy.ones((3, 9))
+
+    response = client.post("/predict", data=to_npy(matrix), content_type=NPY, headers={"Accept": "application/json"})
+
+    assert response.status_code == 200
+    assert len(response.json["predictions"]) == 3
+
+
+@pytest.mark.parametrize(
+    "body, content_type, status",
+    [
+        (to_npy(numpy.zeros((3, 4))), NPY, 400),
+        (to_npy(numpy.array([["a"] * 9])), NPY, 400),
+        (to_npy(numpy.full((1, 9), 7.0)), NPY, 400),
+        (to_npy(numpy.zeros((0, 9))), NPY, 400),
+        (b"not arrow", ARROW_STREAM, 400),
+        (b"a,b", "text/plain", 415),
+    ],
+)
+def test_predict_invalid_binary(client, body, content_type, status):
+    assert client.post("/predict", data=body, content_type=content_type).status_code == status
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""Test the load-testing harness against the in-process app."""
+import pytest
+
+from src.benchmarks.load_test import in_process_sender, make_bodies, run_load_test
+from src.microservice.api.endpoint import app
+
+
+@pytest.mark.parametrize("rate", [0.0, 500.0])
+def test_run_load_test(client, rate):
+    bodies = make_bodies(n_bodies=10, batch_fraction=0.5, batch_size=8)
+
+    stats = run_load_test(send=in_process_sender(app=app), bodies=bodies, n_requests=40, concurrency=4, rate=rate)
+
+    assert stats["requests"] == 40
+    assert stats["error_rate"] == 0.0
+    assert stats["p50_ms"] <= stats["p99_ms"] <= stats["p999_ms"]
+    assert sum(kind["requests"] for kind in stats["by_kind"].values()) == 40
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Test the structured logging of the microservice."""
+import io
+import json
+import logging
+
+from src.microservice.api.log import configure_logging, stop_logging
+
+
+def test_json_logging_with_sampling():
+    stream = io.StringIO()
+    logger = configure_logging(logger=logging.getLogger("test_json_logging"), sample_rate=0.0, stream=stream)
+
+    logger.info("dropped by the sampling")
+    logger.warning("Received request", extra={"simId": 1})
+    try:
+        raise ConnectionError("db down")
+    except ConnectionError:
+        logger.exception("Request failed")
+
+    stop_logging(logger=logger)
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    assert [entry["level"] for entry in entries] == ["WARNING", "ERROR"]
+    assert entries[0]["message"] == "Received request"
+    assert entries[0]["simId"] == 1
+    assert "ConnectionError: db down" in entries[1]["message"]
+
+
+def test_configure_logging_once():
+    logger = logging.getLogger("test_configure_logging_once")
+
+    configure_logging(logger=logger, stream=io.StringIO())
+    handlers = list(logger.handlers)
+    configure_logging(logger=logger, level=logging.ERROR, stream=io.StringIO())
+    stop_logging(logger=logger)
+
+    assert logger.handlers == handlers
+    assert logger.level == logging.ERROR
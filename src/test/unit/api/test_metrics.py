@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Test the metrics of the microservice."""
+import threading
+
+from src.microservice.api.cache import MemoryPredictionCache
+from src.microservice.api.endpoint import app
+from src.microservice.api.metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_merges_threads():
+    histogram = Histogram(name="test_seconds", documentation="test", buckets=(0.1, 1.0))
+
+    def observe():
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+    threads = [threading.Thread(target=observe) for _ in range(100)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cumulative, total, count = histogram.snapshot()
+
+    assert cumulative == [100, 200, 300]
+    assert count == 300
+    assert abs(total - 555.0) < 1e-9
+
+
+def test_registry_render():
+    registry = MetricsRegistry()
+    registry.histogram("latency_seconds", "Latency", buckets=(1.0,), stage="parse").observe(0.5)
+    registry.counter("rejections_total", "Rejections").inc()
+
+    text = registry.render()
+
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{stage="parse",le="1"} 1' in text
+    assert 'latency_seconds_bucket{stage="parse",le="+Inf"} 1' in text
+    assert "rejections_total 1" in text
+
+
+def test_metrics_endpoint(client, districts):
+    app.extensions["prediction_cache"] = MemoryPredictionCache()
+    client.post("/predict", json=districts.head(3).to_dict(orient="records"))
+
+    response = client.get("/metrics")
+    app.extensions.pop("prediction_cache")
+
+    assert response.status_code == 200
+    for stage in ("parse", "validation", "transform", "predict", "serialization"):
+        assert f'prediction_stage_seconds_count{{stage="{stage}"}}' in response.text
+    assert "prediction_cache_hit_ratio 0.0" in response.text
+    assert 'prediction_cache_events_total{event="misses"} 3' in response.text
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Test the hot reload of the model."""
+import os
+
+from src.microservice.api.endpoint import app
+from src.microservice.api.inference import InferencePipeline
+from src.microservice.api.metrics import STAGE_SECONDS
+from src.microservice.api.reload import ModelReloader
+
+
+def dump_version(pipeline: InferencePipeline, directory, version: str, mtime: float):
+    path = directory / f"california_pipeline-{version}.joblib"
+    InferencePipeline(preprocessor=pipeline.preprocessor, model=pipeline.model, version=version).dump(path=path)
+    os.utime(path, (mtime, mtime))
+
+    return path
+
+
+def test_model_reloader_swaps_newest_version(client, districts, inference_pipeline, tmp_path):
+    app.extensions["inference_pipeline"] = InferencePipeline.load(
+        path=dump_version(inference_pipeline, tmp_path, version="v1", mtime=1_000)
+    )
+    reloader = ModelReloader(app=app, directory=tmp_path, drain_timeout=1.0)
+
+    assert not reloader.check()
+
+    dump_version(inference_pipeline, tmp_path, version="v2", mtime=2_000)
+    previous = app.extensions["inference_pipeline"]
+
+    assert reloader.check()
+    assert app.extensions["inference_pipeline"].version == "v2"
+    assert previous.in_flight == 0
+    assert client.post("/predict", json=districts.head(2).to_dict(orient="records")).json["model_version"] == "v2"
+    assert not reloader.check()
+
+
+def test_model_reloader_keeps_serving_on_broken_artifact(client, inference_pipeline, tmp_path):
+    (tmp_path / "california_pipeline-v3.joblib").write_bytes(b"not a joblib artifact")
+    reloader = ModelReloader(app=app, directory=tmp_path)
+
+    assert not reloader.check()
+    assert app.extensions["inference_pipeline"] is inference_pipeline
+
+
+def test_model_reloader_ignores_unversioned_and_excluded_artifacts(inference_pipeline, tmp_path):
+    routed = dump_version(inference_pipeline, tmp_path, version="routed", mtime=3_000)
+    experiment = tmp_path / "experiment.joblib"
+    InferencePipeline(preprocessor=inference_pipeline.preprocessor, model=inference_pipeline.model).dump(experiment)
+    dump_version(inference_pipeline, tmp_path, version="v1", mtime=1_000)
+
+    reloader = ModelReloader(app=app, directory=tmp_path, exclude=[routed])
+
+    assert reloader.latest_artifact().name == "california_pipeline-v1.joblib"
+
+
+def test_pipeline_drains_in_flight_requests(inference_pipeline):
+    with inference_pipeline.serving():
+        assert inference_pipeline.in_flight == 1
+        assert not inference_pipeline.wait_drained(timeout=0.01)
+
+    assert inference_pipeline.wait_drained(timeout=0.01)
+
+
+def test_pipeline_warm_up(inference_pipeline):
+    observed = {stage: STAGE_SECONDS[stage].snapshot()[2] for stage in ("transform", "predict")}
+
+    timings = inference_pipeline.warm_up(batch_sizes=(1, 32))
+
+    assert inference_pipeline.warmed_up and sorted(timings) == [1, 32]
+    # the cold-path timings don't land in the serving histograms
+    assert {stage: STAGE_SECONDS[stage].snapshot()[2] for stage in ("transform", "predict")} == observed
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Test the routing between models and the shadow scoring."""
+import json
+import threading
+
+import numpy
+import pytest
+
+from sklearn.dummy import DummyRegressor
+
+from src.common.synthetic import make_target
+from src.microservice.api.endpoint import app
+from src.microservice.api.inference import InferencePipeline
+from src.microservice.api.metrics import STAGE_SECONDS
+from src.microservice.api.routing import SHADOW_DROPPED, ModelRouter, ShadowScorer
+
+
+@pytest.fixture(scope="module", name="challenger")
+def get_challenger(districts, inference_pipeline) -> InferencePipeline:
+    """Pipeline with the same preprocessor and a model predicting the mean."""
+    features = inference_pipeline.transform(data=districts)
+    model = DummyRegressor().fit(X=features, y=make_target(districts))
+
+    return InferencePipeline(preprocessor=inference_pipeline.preprocessor, model=model, version="challenger")
+
+
+def test_model_router_weights(inference_pipeline, challenger):
+    router = ModelRouter(routes=[(challenger, 0.25)], seed=0)
+
+    versions = [router.choose(default=inference_pipeline).version for _ in range(4_000)]
+
+    assert versions.count("challenger") / len(versions) == pytest.approx(0.25, abs=0.03)
+
+
+@pytest.mark.parametrize("weight", [-0.1, 1.5])
+def test_model_router_invalid_weights(challenger, weight):
+    with pytest.raises(ValueError):
+        ModelRouter(routes=[(challenger, weight)])
+
+
+def test_predict_routed(client, districts, challenger):
+    app.extensions["model_router"] = ModelRouter(routes=[(challenger, 1.0)])
+
+    try:
+        response = client.post("/predict", json=districts.head(3).to_dict(orient="records"))
+    finally:
+        app.extensions.pop("model_router")
+
+    assert response.json["model_version"] == "challenger"
+    numpy.testing.assert_allclose(response.json["predictions"], challenger.predict(data=districts.head(3)))
+
+
+def test_predict_shadow_scored(tmp_path, client, districts, challenger):
+    scorer = ShadowScorer(pipeline=challenger, log_path=tmp_path / "shadow.ndjson")
+    app.extensions["shadow_scorer"] = scorer
+
+    try:
+        response = client.post("/predict", json=districts.head(3).to_dict(orient="records"))
+    finally:
+        app.extensions.pop("shadow_scorer")
+        scorer.close()
+
+    (record,) = [json.loads(line) for line in (tmp_path / "shadow.ndjson").read_text().splitlines()]
+    assert response.json["model_version"] == "test"
+    assert (record["model_version"], record["shadow_version"], record["rows"]) == ("test", "challenger", 3)
+    assert record["predictions"] == response.json["predictions"]
+    numpy.testing.assert_allclose(record["shadow_predictions"], challenger.predict(data=districts.head(3)))
+
+
+def test_shadow_scorer_not_in_stage_metrics(tmp_path, districts, challenger):
+    observed = {stage: STAGE_SECONDS[stage].snapshot()[2] for stage in ("transform", "predict")}
+
+    scorer = ShadowScorer(pipeline=challenger, log_path=tmp_path / "shadow.ndjson")
+    scorer.submit(data=districts.head(3), predictions=numpy.zeros(3), model_version="test", latency_ms=1.0)
+    scorer.close()
+
+    assert len((tmp_path / "shadow.ndjson").read_text().splitlines()) == 1
+    assert {stage: STAGE_SECONDS[stage].snapshot()[2] for stage in ("transform", "predict")} == observed
+
+
+def test_shadow_scorer_never_blocks(tmp_path, districts, inference_pipeline):
+    release = threading.Event()
+
+    class SlowPipeline(InferencePipeline):
+        def predict(self, data, record=True):
+            release.wait(timeout=5)
+            return super().predict(data=data, record=record)
+
+    slow = SlowPipeline(preprocessor=inference_pipeline.preprocessor, model=inference_pipeline.model, version="slow")
+    scorer = ShadowScorer(pipeline=slow, log_path=tmp_path / "shadow.ndjson", max_pending=2)
+    dropped = SHADOW_DROPPED.value
+
+    submitted = [
+        scorer.submit(data=districts.head(1), predictions=numpy.zeros(1), model_version="test", latency_ms=1.0)
+        for _ in range(4)
+    ]
+
+    assert submitted == [True, True, False, False]
+    assert SHADOW_DROPPED.value == dropped + 2
+
+    release.set()
+    scorer.close()
+    assert len((tmp_path / "shadow.ndjson").read_text().splitlines()) == 2
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Test the streaming bulk scoring endpoint."""
+import io
+import json
+
+import numpy
+import pandas
+import pytest
+
+from src.microservice.api.streaming import CSV, NDJSON, iter_chunks
+
+
+def ndjson_body(frame: pandas.DataFrame) -> bytes:
+    return frame.to_json(orient="records", lines=True).encode()
+
+
+@pytest.mark.parametrize("chunk_rows", [64, 1000])
+def test_predict_stream_ndjson(client, districts, inference_pipeline, chunk_rows):
+    response = client.post(
+        f"/predict/stream?chunk_rows={chunk_rows}", data=ndjson_body(districts), content_type=NDJSON
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Model-Version"] == "test"
+    predictions = [json.loads(line)["prediction"] for line in response.data.decode().splitlines()]
+    numpy.testing.assert_allclose(predictions, inference_pipeline.predict(data=districts))
+
+
+def test_predict_stream_csv(client, districts, inference_pipeline):
+    response = client.post("/predict/stream", data=districts.to_csv(index=False).encode(), content_type=CSV)
+
+    assert response.status_code == 200
+    predictions = pandas.read_csv(io.BytesIO(response.data))["prediction"]
+    numpy.testing.assert_allclose(predictions, inference_pipeline.predict(data=districts))
+
+
+def test_iter_chunks_bounded(districts):
+    chunks = list(iter_chunks(stream=io.BytesIO(ndjson_body(districts)), content_type=NDJSON, chunk_rows=64))
+
+    assert [len(chunk) for chunk in chunks] == [64, 64, 64, 64, 44]
+
+
+def test_iter_chunks_keeps_quoted_csv_newlines_in_one_row(districts):
+    frame = districts.head(5).astype({"ocean_proximity": object})
+    frame.loc[1, "ocean_proximity"] = "NEAR\nBAY"
+    body = frame.to_csv(index=False).encode()
+
+    chunks = list(iter_chunks(stream=io.BytesIO(body), content_type=CSV, chunk_rows=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0]["ocean_proximity"].iloc[1] == "NEAR\nBAY"
+
+@pytest.mark.parametrize(
+    "body, content_type, status", [(b"", NDJSON, 400), (b"{not json}\n", NDJSON, 400), (b"a,b\n1,2\n", CSV, 400)]
+)
+def test_predict_stream_invalid(client, body, content_type, status):
+    assert client.post("/predict/stream", data=body, content_type=content_type).status_code == status
+
+
+def test_predict_stream_invalid_later_chunk(client, districts):
+    body = ndjson_body(districts.head(4)) + b"{not json}\n"
+
+    response = client.post("/predict/stream?chunk_rows=2", data=body, content_type=NDJSON)
+
+    lines = response.data.decode().splitlines()
+    assert response.status_code == 200
+    assert len(lines) == 5 and "error" in json.loads(lines[-1])
+
+
+def test_predict_stream_unsupported_media_type(client):
+    assert client.post("/predict/stream", data=b"{}", content_type="application/json").status_code == 415
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Test the fused kernel compiled from the CaliforniaPreprocessor."""
+import numpy
+import pytest
+
+from src.common.synthetic import make_districts
+from src.experiments.california_preprocessor import CaliforniaPreprocessor
+
+
+@pytest.fixture(scope="module", name="preprocessor")
+def get_preprocessor() -> CaliforniaPreprocessor:
+    preprocessor = CaliforniaPreprocessor()
+    preprocessor.preprocess(data=make_districts(n_rows=500), transform_data=False)
+
+    return preprocessor
+
+
+@pytest.mark.parametrize("n_rows", [1, 64, 1_000])
+def test_fused_preprocessor_matches_transformer(preprocessor, n_rows):
+    districts = make_districts(n_rows=n_rows, seed=n_rows)
+
+    expected = preprocessor.transformer.transform(X=districts)
+    fused = preprocessor.compile().transform(X=districts)
+
+    numpy.testing.assert_allclose(fused, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_fused_preprocessor_missing_and_unknown_values(preprocessor):
+    districts = make_districts(n_rows=200, seed=1)
+    districts.loc[::7, "total_bedrooms"] = numpy.nan
+    districts.loc[::11, "ocean_proximity"] = None
+    districts.loc[::17, "ocean_proximity"] = numpy.nan
+    districts.loc[::13, "ocean_proximity"] = "UNKNOWN"
+
+    expected = preprocessor.transformer.transform(X=districts)
+    fused = preprocessor.compile().transform(X=districts)
+
+    numpy.testing.assert_allclose(fused, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_fused_preprocessor_feature_names(preprocessor):
+    kernel = preprocessor.compile()
+
+    assert list(kernel.get_feature_names_out()) == list(preprocessor.transformer.get_feature_names_out())
+
+
+def test_fused_preprocessor_output_buffer(preprocessor):
+    kernel = preprocessor.compile()
+    first, second = make_districts(n_rows=8, seed=1), make_districts(n_rows=8, seed=2)
+
+    features = kernel.transform(X=first)
+    kernel.transform(X=second)
+    numpy.testing.assert_allclose(features, preprocessor.transformer.transform(X=first), rtol=1e-9, atol=1e-12)
+
+    out = numpy.empty((8, kernel.n_features_out))
+    assert kernel.transform(X=second, out=out) is out
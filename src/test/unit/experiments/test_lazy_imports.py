@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Test the lazy imports of the heavy optional dependencies."""
+import sys
+
+import pytest
+
+from exper.utils.lazy import LazyModule, lazy_import
+from src.benchmarks.import_time import BUDGETS, import_time
+
+
+def test_lazy_import_loads_on_first_access():
+    sys.modules.pop("colorsys", None)
+    colorsys = lazy_import("colorsys")
+
+    assert isinstance(colorsys, LazyModule)
+    assert "colorsys" not in sys.modules
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules
+
+
+@pytest.mark.parametrize("module", list(BUDGETS))
+def test_entry_point_does_not_import_heavy_dependencies(module):
+    _, _, forbidden = import_time(module=module)
+
+    assert forbidden == []
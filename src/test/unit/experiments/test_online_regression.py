@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Test the online SGD regression trained with partial_fit over chunks."""
+import argparse
+
+import numpy
+import pytest
+
+from sklearn.linear_model import LinearRegression
+
+from src.common.synthetic import make_districts, make_target
+from src.experiments.online_regression import OnlinePreprocessor, OnlineRegress
+from src.pipeline.online_training import train_online
+
+
+@pytest.fixture(name="districts")
+def get_districts():
+    districts = make_districts(n_rows=4_000)
+    districts.loc[::9, "total_bedrooms"] = numpy.nan
+
+    return districts
+
+
+def test_online_preprocessor_running_statistics(districts):
+    online = OnlinePreprocessor()
+    for start in range(0, len(districts), 500):
+        online.partial_fit(data=districts.iloc[start : start + 500])
+
+    whole = OnlinePreprocessor().partial_fit(data=districts)
+    transformed = online.transform(data=districts)
+
+    numpy.testing.assert_allclose(online.scaler.mean_, whole.scaler.mean_)
+    numpy.testing.assert_allclose(online.scaler.var_, whole.scaler.var_)
+    assert transformed.shape == (4_000, len(online.get_feature_names_out()))
+    assert not numpy.isnan(transformed).any()
+
+
+def test_online_regress_learns_from_chunks(districts):
+    target = make_target(districts)
+    model = OnlineRegress()
+
+    for start in range(0, len(districts), 500):
+        model.partial_fit(x=districts.iloc[start : start + 500], y=target.iloc[start : start + 500])
+
+    features = OnlinePreprocessor().partial_fit(data=districts).transform(data=districts)
+    batch = LinearRegression().fit(X=features, y=target)
+
+    error = numpy.abs(model.predict(x=districts) - target).mean()
+    batch_error = numpy.abs(batch.predict(X=features) - target).mean()
+
+    assert model.n_rows_seen == 4_000
+    assert error < 1.1 * batch_error
+
+
+def test_online_regress_fit_metrics_per_epoch(districts):
+    model = OnlineRegress()
+    model.fit(
+        x=districts, y=make_target(districts), param_range=[1, 2, 3], param="epochs", eval_metrics=["rmse", "mae"]
+    )
+
+    assert len(model.metrics.train["rmse"]) == len(model.metrics.test["mae"]) == 3
+    # the later epochs don't fold the rows into the statistics again
+    assert model.n_rows_seen == model.target_scaler.n_samples_seen_ == 2_800
+
+
+def test_train_online_folds_new_rows(tmp_path, districts):
+    data = districts.assign(median_house_value=make_target(districts))
+    data.iloc[:3_000].to_parquet(tmp_path / "rows.parquet")
+    data.iloc[3_000:].to_parquet(tmp_path / "new_rows.parquet")
+
+    args = dict(step_name="online", artifact_path=str(tmp_path), chunk_size=512, no_cache=True)
+    trained = train_online(args=argparse.Namespace(**args, input_file="rows.parquet", output_file="model.joblib"))
+    folded = train_online(
+        args=argparse.Namespace(
+            **args, input_file="new_rows.parquet", output_file="folded.joblib", base_model="model.joblib"
+        )
+    )
+
+    assert trained["n_rows_seen"] == 3_000
+    assert folded["n_rows_seen"] == 4_000
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Test Build Model.
+
+Tests the preprocessor saved with the classifier
+"""
+import numpy
+import pandas
+
+from sklearn.compose import ColumnTransformer
+
+from src.pipeline.build_model import get_model_preprocessor, get_search
+from src.pipeline.utils.regularization_path import RegularizationPathSearch
+
+
+def make_train_set(n_rows: int = 300) -> pandas.DataFrame:
+    rng = numpy.random.default_rng(0)
+    train_set = pandas.DataFrame(
+        {
+            "total_bedrooms": rng.normal(size=n_rows),
+            "median_income": rng.normal(size=n_rows),
+            "ocean_proximity": rng.choice(["INLAND", "NEAR BAY"], size=n_rows),
+        }
+    )
+    train_set.loc[:4, "total_bedrooms"] = 1_000.0
+
+    return train_set
+
+
+def test_model_preprocessor_without_outlier_filter():
+    assert isinstance(get_model_preprocessor(train_set=make_train_set()), ColumnTransformer)
+
+
+def test_saved_pipeline_keeps_outlier_bounds():
+    train_set = make_train_set()
+    target = pandas.Series(numpy.arange(len(train_set)) % 2)
+
+    preprocessor = get_model_preprocessor(train_set=train_set, outlier_columns=["total_bedrooms"])
+    search = get_search(preprocessor=preprocessor, search="path").set_params(l1_ratios=[0.5], Cs=[1.0], cv=3, n_jobs=1)
+    assert isinstance(search, RegularizationPathSearch)
+
+    outlier_filter = search.fit(X=train_set, y=target).best_estimator_["preprocessor"]["outliers"]
+    serving_rows = train_set.head(5)
+
+    assert outlier_filter.upper_[0] < 1_000.0
+    assert outlier_filter.outliers(X=serving_rows).all()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Test DAG runner.
+
+Tests the parallel execution of the pipeline steps declared in config.toml
+"""
+import graphlib
+import pathlib
+import shutil
+import time
+
+import joblib
+import numpy
+import pytest
+
+from pipeline.utils import pipe_args
+from src.common.synthetic import make_districts, make_target
+from src.pipeline.dag import ROOT_DIR, Step, critical_path, load_steps, run_dag
+
+CONFIG = """
+[data]
+artifact_dir = "artifacts/"
+
+[pipeline.steps.source]
+target = "src.test.unit.pipeline.test_dag:sleep_step"
+output_file = "source.joblib"
+args = { seconds = 0.1 }
+
+[pipeline.steps.slow]
+target = "src.test.unit.pipeline.test_dag:sleep_step"
+input_file = "source.joblib"
+output_file = "slow.joblib"
+args = { seconds = 0.6 }
+
+[pipeline.steps.fast]
+target = "src.test.unit.pipeline.test_dag:sleep_step"
+input_file = "source.joblib"
+output_file = "fast.joblib"
+args = { seconds = 0.2 }
+
+[pipeline.steps.report]
+target = "src.test.unit.pipeline.test_dag:sleep_step"
+depends_on = ["slow", "fast"]
+input_file = "fast.joblib"
+args = { seconds = 0.1 }
+"""
+
+
+@pipe_args
+def sleep_step(artifacts, args):
+    """Step sleeping `args.seconds` and appending its name to the artifacts."""
+    time.sleep(args.seconds)
+    if args.step_name == "broken":
+        raise ValueError("broken step")
+
+    return [*(artifacts or []), args.step_name]
+
+
+@pytest.fixture(name="config_file")
+def get_config_file(tmp_path):
+    (tmp_path / "config.toml").write_text(CONFIG)
+    return tmp_path / "config.toml"
+
+
+def test_load_steps_implicit_dependencies(config_file):
+    steps, artifact_dir = load_steps(cfg_file=config_file)
+
+    assert artifact_dir == str(config_file.parent / "artifacts/")
+    assert steps["slow"].depends_on == ["source"]
+    assert sorted(steps["report"].depends_on) == ["fast", "slow"]
+
+
+def test_run_dag_parallel(config_file):
+    steps, artifact_dir = load_steps(cfg_file=config_file)
+
+    report = run_dag(steps=steps, artifact_dir=artifact_dir, workers=2, no_cache=True)
+
+    assert report["status"] == "done"
+    assert report["critical_path"] == ["source", "slow", "report"]
+    # fast and slow overlap
+    assert report["steps"]["fast"]["start_seconds"] < report["steps"]["slow"]["end_seconds"]
+    assert report["steps"]["slow"]["start_seconds"] < report["steps"]["fast"]["end_seconds"]
+
+
+def test_run_dag_skips_after_failure(config_file):
+    steps, artifact_dir = load_steps(cfg_file=config_file)
+    steps["slow"].name = "broken"
+
+    report = run_dag(steps=steps, artifact_dir=artifact_dir, workers=2, no_cache=True)
+
+    assert report["status"] == "failed"
+    assert report["steps"]["slow"]["status"] == "failed"
+    assert report["steps"]["slow"]["wall_seconds"] >= 0.6
+    assert report["steps"]["slow"]["start_seconds"] >= report["steps"]["source"]["end_seconds"]
+    assert report["steps"]["report"]["status"] == "skipped"
+
+
+def test_run_dag_profile(config_file):
+    steps, artifact_dir = load_steps(cfg_file=config_file)
+
+    report = run_dag(steps=steps, artifact_dir=artifact_dir, workers=2, no_cache=True, profile=True)
+
+    profile = report["steps"]["slow"]["profile"]
+    assert profile["step"] == "slow" and profile["wall_seconds"] >= 0.6
+    assert profile["input"]["file"] == "source.joblib" and profile["output"]["rows"] is None
+
+
+def test_run_dag_cycle(tmp_path):
+    steps = {
+        "a": Step(name="a", target="x:y", depends_on=["b"]),
+        "b": Step(name="b", target="x:y", depends_on=["a"]),
+    }
+
+    with pytest.raises(graphlib.CycleError):
+        run_dag(steps=steps, artifact_dir=str(tmp_path))
+
+
+def test_critical_path():
+    steps = {
+        "a": Step(name="a", target="x:y"),
+        "b": Step(name="b", target="x:y", depends_on=["a"]),
+        "c": Step(name="c", target="x:y", depends_on=["a"]),
+    }
+
+    assert critical_path(steps=steps, durations={"a": 1.0, "b": 0.5, "c": 2.0}) == (["a", "c"], 3.0)
+
+
+def test_run_dag_config(tmp_path):
+    """The DAG of the config.toml of the repository runs end to end on synthetic districts."""
+    shutil.copy(ROOT_DIR / "config.toml", tmp_path / "config.toml")
+    steps, artifact_dir = load_steps(cfg_file=tmp_path / "config.toml")
+
+    districts = make_districts(n_rows=400)
+    noise = numpy.random.default_rng(0).normal(scale=30_000, size=len(districts))
+    raw = districts.assign(median_house_value=make_target(districts) + noise)
+    pathlib.Path(artifact_dir).mkdir()
+    raw.to_csv(pathlib.Path(artifact_dir) / steps["wrangle"].input_file, index=False)
+
+    report = run_dag(steps=steps, artifact_dir=artifact_dir, workers=2, no_cache=True)
+
+    assert report["status"] == "done", report["steps"]
+    assert set(report["steps"]) == {"wrangle", "preprocess", "modelling", "online"}
+    model = joblib.load(pathlib.Path(artifact_dir) / steps["modelling"].output_file)["classifier_pipeline"]
+    assert model.predict(districts.head(5)).shape == (5,)
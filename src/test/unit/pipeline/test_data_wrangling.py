@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Test Data Wrangling.
+
+Tests the in-memory and the chunked wrangle step
+"""
+import argparse
+
+import numpy
+import pandas
+import pytest
+
+from pyarrow import parquet
+
+from pipeline.utils import iter_artifact_chunks
+from src.pipeline.data_wrangling import wrangle
+
+
+@pytest.fixture(name="raw_file")
+def get_raw_file(tmp_path):
+    rng = numpy.random.default_rng(0)
+    raw = pandas.DataFrame(
+        {
+            " Median_Income": rng.integers(0, 10, size=1_000),
+            "Total_Bedrooms": rng.normal(size=1_000),
+            "Ocean_Proximity": rng.choice(["INLAND", "NEAR BAY", " ", "NaN"], size=1_000),
+        }
+    )
+    raw.loc[::7, "Total_Bedrooms"] = numpy.nan
+    raw.to_csv(tmp_path / "raw.csv", index=False)
+
+    return tmp_path / "raw.csv"
+
+
+def make_args(raw_file, output_file, chunk_size=None) -> argparse.Namespace:
+    return argparse.Namespace(
+        step_name="wrangle",
+        artifact_path=str(raw_file.parent),
+        input_file=raw_file.name,
+        output_file=output_file,
+        chunk_size=chunk_size,
+        no_cache=True,
+    )
+
+
+def test_wrangle_chunked_matches_in_memory(raw_file):
+    in_memory = wrangle(args=make_args(raw_file, output_file="in_memory.parquet"))
+    output = wrangle(args=make_args(raw_file, output_file="chunked.parquet", chunk_size=128))
+
+    chunked = pandas.read_parquet(output)
+
+    assert list(chunked.columns) == ["median_income", "total_bedrooms", "ocean_proximity"]
+    assert parquet.ParquetFile(output).num_row_groups == 8
+    assert chunked["ocean_proximity"].isna().sum() == in_memory["ocean_proximity"].isna().sum() > 0
+    pandas.testing.assert_frame_equal(chunked, in_memory, check_dtype=False)
+
+
+def test_iter_artifact_chunks_bounded(raw_file):
+    sizes = [len(chunk) for chunk in iter_artifact_chunks(filename=raw_file, chunk_size=300)]
+
+    assert sizes == [300, 300, 300, 100]
+
+
+def test_wrangle_chunked_needs_output(raw_file):
+    with pytest.raises(ValueError):
+        wrangle(args=make_args(raw_file, output_file=None, chunk_size=128))
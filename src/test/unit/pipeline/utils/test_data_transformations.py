@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Test Data Transformations.
+
+Tests the IQR outlier filter and its bounds reused by the fitted preprocessor
+"""
+import numpy
+import pandas
+import pytest
+
+from pipeline.utils.data_transformations import IQROutlierFilter, preprocess_data, remove_outliers_iqr
+
+
+@pytest.fixture(name="data")
+def get_data():
+    rng = numpy.random.default_rng(0)
+    data = pandas.DataFrame(
+        {
+            "total_bedrooms": rng.normal(500, 100, 500),
+            "median_income": rng.lognormal(1.0, 0.5, 500),
+            "ocean_proximity": rng.choice(["INLAND", "NEAR BAY"], 500).astype(object),
+        }
+    )
+    data.loc[[3, 10], "total_bedrooms"] = [5_000.0, -3_000.0]
+    data.loc[::13, "median_income"] = numpy.nan
+
+    return data
+
+
+def test_bounds_match_quantiles(data):
+    outlier_filter = IQROutlierFilter(whisker_width=1.5).fit(data)
+
+    q1, q3 = data["median_income"].quantile(0.25), data["median_income"].quantile(0.75)
+
+    assert outlier_filter.columns_ == ["total_bedrooms", "median_income"]
+    assert outlier_filter.lower_[1] == pytest.approx(q1 - 1.5 * (q3 - q1))
+    assert outlier_filter.upper_[1] == pytest.approx(q3 + 1.5 * (q3 - q1))
+
+
+@pytest.mark.parametrize("mode", ["mask", "clip", "drop"])
+def test_modes(data, mode):
+    original = data.copy()
+    outlier_filter = IQROutlierFilter(columns="total_bedrooms", mode=mode).fit(data)
+
+    filtered = outlier_filter.transform(data)
+
+    pandas.testing.assert_frame_equal(data, original)
+    if mode == "mask":
+        assert filtered.loc[[3, 10], "total_bedrooms"].isna().all()
+        assert filtered["median_income"].isna().sum() == data["median_income"].isna().sum()
+    elif mode == "clip":
+        assert filtered.loc[3, "total_bedrooms"] == outlier_filter.upper_[0]
+        assert filtered.loc[10, "total_bedrooms"] == outlier_filter.lower_[0]
+    else:
+        assert 3 not in filtered.index and 10 not in filtered.index
+        assert len(filtered) == len(data) - outlier_filter.outliers(data).any(axis=1).sum()
+
+
+def test_remove_outliers_iqr_doesnt_mutate(data):
+    original = data.copy()
+
+    filtered = remove_outliers_iqr(dataframe=data, columns=["total_bedrooms"])
+
+    pandas.testing.assert_frame_equal(data, original)
+    assert filtered.loc[[3, 10], "total_bedrooms"].isna().all()
+
+
+def test_invalid_mode(data):
+    with pytest.raises(ValueError):
+        IQROutlierFilter(mode="remove").fit(data)
+
+
+def test_preprocessor_reuses_training_bounds(data):
+    train, test = data.iloc[:400], data.iloc[400:].copy()
+    test.loc[450, "total_bedrooms"] = 10_000.0
+
+    _, _, preprocessor, _ = preprocess_data(
+        X=train, y=numpy.zeros(len(train)), variables_with_outliers=["total_bedrooms"]
+    )
+    bounds = preprocessor["outliers"].upper_.copy()
+    x_test, _, _, _ = preprocess_data(X=test, y=numpy.zeros(len(test)), preprocessor=preprocessor)
+
+    numpy.testing.assert_array_equal(preprocessor["outliers"].upper_, bounds)
+    # the outlier is masked and imputed with the training mean, so it's inside the scaled training range
+    assert 0.0 <= x_test.loc[50, "total_bedrooms"] <= 1.0
+    assert "total_bedrooms" in x_test.columns
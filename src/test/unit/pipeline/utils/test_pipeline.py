@@ -7,9 +7,11 @@ import argparse
 import unittest
 import pathlib
 
+import numpy
+import pandas
 import pytest
 
-from pipeline.utils import get_file_extension, load_artifacts
+from pipeline.utils import get_file_extension, load_artifacts, read_artifact, save_artifact
 from src.test.conftest import message_error_expected
 
 
@@ -46,5 +48,65 @@ def test_load_artifacts(args, expected):
         load_artifacts(args=test_args)
 
 
+@pytest.mark.parametrize("file_extension", [".parquet", ".feather", ".csv"])
+def test_tabular_artifacts_column_projection(tmp_path, file_extension):
+    frame = pandas.DataFrame({"a": [1.0, 2.0], "b": ["x", "y"], "c": [3, 4]})
+    save_artifact(artifacts=frame, filename=tmp_path / f"data{file_extension}")
+
+    test_args = argparse.Namespace(artifact_path=str(tmp_path), input_file=f"data{file_extension}", columns=["c", "a"])
+    loaded = load_artifacts(args=test_args)
+
+    assert sorted(loaded.columns) == ["a", "c"]
+    pandas.testing.assert_frame_equal(loaded[["a", "c"]], frame[["a", "c"]], check_dtype=False)
+
+
+@pytest.mark.parametrize("file_extension", [".npy", ".joblib"])
+def test_array_artifacts_mmap(tmp_path, file_extension):
+    array = numpy.arange(12, dtype=numpy.float64).reshape(3, 4)
+    save_artifact(artifacts=array, filename=tmp_path / f"array{file_extension}")
+
+    loaded = read_artifact(filename=tmp_path / f"array{file_extension}", mmap_mode="r")
+
+    assert isinstance(loaded, numpy.memmap)
+    numpy.testing.assert_array_equal(loaded, array)
+
+
+def test_npz_artifacts(tmp_path):
+    arrays = {"x": numpy.ones((2, 2)), "y": numpy.zeros(3)}
+    save_artifact(artifacts=arrays, filename=tmp_path / "arrays.npz")
+
+    loaded = read_artifact(filename=tmp_path / "arrays.npz")
+
+    assert sorted(loaded.files) == ["x", "y"]
+    numpy.testing.assert_array_equal(loaded["y"], arrays["y"])
+
+
+def test_save_artifact_wrong_type(tmp_path):
+    with pytest.raises(TypeError):
+        save_artifact(artifacts={"a": 1}, filename=tmp_path / "data.parquet")
+
+
+def test_save_artifact_chunks_first_all_missing(tmp_path):
+    chunks = [
+        pandas.DataFrame({"x": [1.0, 2.0], "text": [None, None]}),
+        pandas.DataFrame({"x": [3.0], "text": ["INLAND"]}),
+    ]
+
+    save_artifact(artifacts=iter(chunks), filename=tmp_path / "data.parquet")
+    loaded = read_artifact(filename=tmp_path / "data.parquet")
+
+    assert loaded["x"].tolist() == [1.0, 2.0, 3.0]
+    assert loaded["text"].isna().tolist() == [True, True, False] and loaded["text"].iloc[2] == "INLAND"
+
+
+@pytest.mark.parametrize("file_extension", [".parquet", ".csv"])
+def test_save_artifact_no_chunks(tmp_path, file_extension):
+    save_artifact(artifacts=iter([]), filename=tmp_path / f"data{file_extension}")
+
+    assert (tmp_path / f"data{file_extension}").exists()
+    if file_extension == ".parquet":
+        assert read_artifact(filename=tmp_path / "data.parquet").empty
+
+
 if __name__ == "__main__":
     unittest.main()
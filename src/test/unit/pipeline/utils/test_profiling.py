@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Test Profiling.
+
+Tests the resource profiles of the pipeline steps and the diff of two runs
+"""
+import argparse
+import json
+
+import numpy
+import pandas
+import pytest
+
+from pipeline.utils import pipe_args
+from pipeline.utils.profiling import diff_runs, load_run
+
+
+@pipe_args
+def grow(artifacts, args):
+    """Step making `args.factor` copies of its input rows."""
+    return pandas.concat([artifacts] * args.factor, ignore_index=True)
+
+
+@pytest.fixture(name="input_file")
+def get_input_file(tmp_path):
+    pandas.DataFrame({"a": numpy.arange(1_000.0)}).to_parquet(tmp_path / "input.parquet")
+    return tmp_path / "input.parquet"
+
+
+def run_grow(tmp_path, factor: int, report: str, **kwargs) -> dict:
+    args = argparse.Namespace(
+        step_name="grow",
+        artifact_path=str(tmp_path),
+        input_file="input.parquet",
+        output_file="output.parquet",
+        factor=factor,
+        profile_report=str(tmp_path / report),
+        **{"no_cache": True, **kwargs},
+    )
+    grow(args=args)
+
+    with open(tmp_path / report) as file:
+        return json.load(file)
+
+
+def test_profile_report(tmp_path, input_file):
+    profile = run_grow(tmp_path, factor=3, report="profile.json")
+
+    assert profile["step"] == "grow" and not profile["cached"]
+    assert profile["input"] == {"file": "input.parquet", "bytes": input_file.stat().st_size, "rows": 1_000}
+    assert profile["output"]["rows"] == 3_000
+    assert profile["wall_seconds"] > 0 and profile["peak_rss_mb"] > 0
+    assert not profile["memory_traced"] and "top_allocations" not in profile
+
+
+def test_profile_memory_report(tmp_path, input_file):
+    profile = run_grow(tmp_path, factor=3, report="profile.json", profile_memory=True)
+
+    assert profile["memory_traced"] and profile["tracemalloc_peak_mb"] > 0
+    assert profile["top_allocations"] and {"location", "size_mb", "count"} == profile["top_allocations"][0].keys()
+
+
+def test_profile_cached_step(tmp_path, input_file):
+    run_grow(tmp_path, factor=2, report="first.json", no_cache=False)
+    profile = run_grow(tmp_path, factor=2, report="second.json", no_cache=False)
+
+    assert profile["cached"] and profile["output"]["rows"] == 2_000
+
+
+def test_diff_runs(tmp_path, input_file):
+    run_grow(tmp_path, factor=1, report="before.json")
+    run_grow(tmp_path, factor=50, report="after.json")
+
+    changes = diff_runs(before=load_run(tmp_path / "before.json"), after=load_run(tmp_path / "after.json"))
+    by_metric = {change["metric"]: change for change in changes}
+
+    assert by_metric["output_rows"]["before"] == 1_000 and by_metric["output_rows"]["after"] == 50_000
+    assert not by_metric["output_rows"]["regression"]
+    assert "input_rows" not in by_metric
+
+
+def test_diff_runs_flags_regressions():
+    before = {"train": {"wall_seconds": 1.0, "peak_rss_mb": 100.0}}
+    after = {"train": {"wall_seconds": 1.05, "peak_rss_mb": 150.0}, "new": {"wall_seconds": 1.0}}
+
+    changes = diff_runs(before=before, after=after, threshold=10.0)
+
+    assert [(change["metric"], change["regression"]) for change in changes] == [
+        ("wall_seconds", False),
+        ("peak_rss_mb", True),
+    ]
+
+
+def test_diff_runs_skips_timings_of_traced_runs():
+    before = {"train": {"wall_seconds": 1.0, "peak_rss_mb": 100.0, "memory_traced": False}}
+    after = {"train": {"wall_seconds": 3.0, "peak_rss_mb": 150.0, "memory_traced": True}}
+
+    changes = diff_runs(before=before, after=after, threshold=10.0)
+
+    assert [change["metric"] for change in changes] == ["peak_rss_mb"]
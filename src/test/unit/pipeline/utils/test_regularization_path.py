@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Test Regularization Path Search.
+
+Tests the warm-started search against the brute-force grid of `modelling`
+"""
+import numpy
+import pandas
+import pytest
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+from sklearn.pipeline import Pipeline
+
+from pipeline.utils.data_transformations import get_preprocessor
+from pipeline.utils.regularization_path import RegularizationPathSearch, path_order
+
+L1_RATIOS = [0.0, 0.5, 1.0]
+CS = [10, 1.0, 0.1]
+
+
+@pytest.fixture(name="data")
+def get_data():
+    rng = numpy.random.default_rng(0)
+    x = pandas.DataFrame(
+        {
+            "median_income": rng.uniform(0.5, 15.0, 600),
+            "housing_median_age": rng.integers(1, 52, 600).astype(float),
+            "ocean_proximity": rng.choice(["INLAND", "NEAR BAY", "ISLAND"], 600).astype(object),
+        }
+    )
+    y = pandas.Series((x["median_income"] + rng.normal(scale=3.0, size=600) > 8).astype(int), name="target")
+
+    return x, y
+
+
+def make_preprocessor(x):
+    preprocessor = get_preprocessor(categorical_columns=["ocean_proximity"], numerical_columns=x.columns[:2].tolist())
+
+    return preprocessor.set_params(n_jobs=None, verbose=False, numerical__verbose=False, categorical__verbose=False)
+
+
+def test_path_order_walks_neighbours():
+    order = path_order(l1_ratios=L1_RATIOS, Cs=CS)
+
+    assert len(order) == 9 and order[0] == {"C": 0.1, "l1_ratio": 0.0}
+    for previous, current in zip(order, order[1:]):
+        assert sum(previous[key] != current[key] for key in ("C", "l1_ratio")) == 1
+
+
+def test_search_matches_grid(data):
+    x, y = data
+    search = RegularizationPathSearch(preprocessor=make_preprocessor(x), l1_ratios=L1_RATIOS, Cs=CS, cv=3).fit(x, y)
+
+    grid = Pipeline(
+        [
+            ("preprocessor", make_preprocessor(x)),
+            (
+                "classifier",
+                GridSearchCV(
+                    estimator=LogisticRegression(solver="saga", max_iter=1000, random_state=42),
+                    param_grid={"l1_ratio": L1_RATIOS, "C": CS},
+                    cv=3,
+                    scoring="roc_auc",
+                ),
+            ),
+        ]
+    ).fit(x, y)["classifier"]
+
+    assert search.best_params_ == grid.best_params_
+    assert search.cv_results_["params"] == grid.cv_results_["params"]
+    numpy.testing.assert_allclose(search.cv_results_["mean_test_score"], grid.cv_results_["mean_test_score"], atol=1e-2)
+    assert search.best_score_ == pytest.approx(grid.best_score_, abs=1e-2)
+
+
+def test_search_refits_best_estimator(data):
+    x, y = data
+    search = RegularizationPathSearch(preprocessor=make_preprocessor(x), l1_ratios=L1_RATIOS, Cs=CS, cv=3).fit(x, y)
+
+    classifier = search.best_estimator_["classifier"]
+
+    assert classifier.C == search.best_params_["C"] and classifier.l1_ratio == search.best_params_["l1_ratio"]
+    assert search.predict_proba(x).shape == (600, 2)
+    assert search.score(x, y) > 0.5
+
+
+def test_search_uses_elasticnet_penalty(data):
+    x, y = data
+    coefs = []
+    for l1_ratio in [0.0, 1.0]:
+        search = RegularizationPathSearch(preprocessor=make_preprocessor(x), l1_ratios=[l1_ratio], Cs=[0.1], cv=3)
+        classifier = search.fit(x, y).best_estimator_["classifier"]
+        coefs.append(classifier.coef_)
+
+    # "deprecated" is the default of scikit-learn >= 1.8, where l1_ratio alone sets the elastic-net penalty
+    assert classifier.penalty in ("elasticnet", "deprecated")
+    assert not numpy.allclose(coefs[0], coefs[1])
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Test Step Cache.
+
+Tests the content-hash cache of the outputs of the pipeline steps
+"""
+import argparse
+import importlib
+import sys
+
+import joblib
+import pandas
+import pytest
+
+from pipeline.utils import StepCache, parse_args, pipe_args
+from pipeline.utils.step_cache import fingerprint, module_files
+
+
+@pytest.fixture(name="step")
+def get_step():
+    """Step counting its executions."""
+    calls = []
+
+    @pipe_args
+    def double(artifacts, args):
+        calls.append(args.factor)
+        return artifacts * args.factor
+
+    double.calls = calls
+    return double
+
+
+def make_args(tmp_path, **kwargs) -> argparse.Namespace:
+    defaults = dict(step_name="double", artifact_path=str(tmp_path), input_file="input.csv", output_file="out.joblib")
+    return argparse.Namespace(**{**defaults, "factor": 2, "no_cache": False, **kwargs})
+
+
+@pytest.fixture(name="input_file")
+def get_input_file(tmp_path):
+    pandas.DataFrame({"a": [1.0, 2.0]}).to_csv(tmp_path / "input.csv", index=False)
+    return tmp_path / "input.csv"
+
+
+def test_pipe_args_reuses_cached_output(tmp_path, step, input_file):
+    first = step(args=make_args(tmp_path))
+    (tmp_path / "out.joblib").unlink()
+    second = step(args=make_args(tmp_path))
+
+    assert step.calls == [2]
+    pandas.testing.assert_frame_equal(first, second)
+    pandas.testing.assert_frame_equal(joblib.load(tmp_path / "out.joblib"), first)
+
+
+def test_pipe_args_invalidates_on_changes(tmp_path, step, input_file):
+    step(args=make_args(tmp_path))
+    step(args=make_args(tmp_path, factor=3))
+    pandas.DataFrame({"a": [5.0]}).to_csv(input_file, index=False)
+    result = step(args=make_args(tmp_path))
+
+    assert step.calls == [2, 3, 2]
+    assert result["a"].tolist() == [10.0]
+
+
+def test_pipe_args_caches_columnar_output(tmp_path, step, input_file):
+    first = step(args=make_args(tmp_path, output_file="out.parquet"))
+    second = step(args=make_args(tmp_path, output_file="out.parquet"))
+
+    assert step.calls == [2]
+    pandas.testing.assert_frame_equal(pandas.read_parquet(tmp_path / "out.parquet"), first)
+    pandas.testing.assert_frame_equal(second, first)
+
+
+def test_restored_output_does_not_share_the_entry(tmp_path, step, input_file):
+    step(args=make_args(tmp_path))
+    step(args=make_args(tmp_path))
+    (tmp_path / "out.joblib").write_bytes(b"overwritten in place")
+
+    assert step.calls == [2]
+    pandas.testing.assert_frame_equal(step(args=make_args(tmp_path)), pandas.DataFrame({"a": [2.0, 4.0]}))
+
+
+def test_pipe_args_no_cache(tmp_path, step, input_file):
+    step(args=make_args(tmp_path))
+    step(args=make_args(tmp_path, no_cache=True))
+
+    assert step.calls == [2, 2]
+
+
+def test_fingerprint_covers_side_inputs(tmp_path, step):
+    (tmp_path / "base.joblib").write_bytes(b"base model")
+    args = make_args(tmp_path, base_model="base.joblib")
+    key = fingerprint(step=step, args=args, input_path=None)
+
+    (tmp_path / "base.joblib").write_bytes(b"base model folded with new rows")
+
+    assert fingerprint(step=step, args=args, input_path=None) != key
+
+
+def test_fingerprint_covers_imported_helpers(tmp_path, monkeypatch):
+    (tmp_path / "helpers.py").write_text("def scale(x):\n    return x * 2\n")
+    (tmp_path / "steps.py").write_text(
+        "from helpers import scale\n\n\ndef step(artifacts, args):\n    return scale(artifacts)\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr("pipeline.utils.step_cache.SOURCE_ROOT", tmp_path)
+    monkeypatch.delitem(sys.modules, "helpers", raising=False)
+    monkeypatch.delitem(sys.modules, "steps", raising=False)
+    step = importlib.import_module("steps").step
+
+    key = fingerprint(step=step, args=argparse.Namespace(factor=2), input_path=None)
+    (tmp_path / "helpers.py").write_text("def scale(x):\n    return x * 3\n")
+
+    assert tmp_path / "helpers.py" in module_files(step=step)
+    assert fingerprint(step=step, args=argparse.Namespace(factor=2), input_path=None) != key
+
+
+def test_step_cache_evicts_least_recently_used(tmp_path):
+    cache = StepCache(directory=tmp_path, max_bytes=10**9)
+    for key in "abc":
+        cache.put(key=key, artifacts=bytes(1000))
+
+    cache.get(key="a")
+    cache.max_bytes = 2_500
+    evicted = cache.evict()
+
+    assert [path.stem for path in evicted] == ["b"]
+    assert cache.get(key="b") is None and cache.get(key="a") is not None
+
+
+def test_parse_args_cache_options(monkeypatch):
+    monkeypatch.setattr("sys.argv", ["step", "--no-cache", "--cache-max-mb", "10"])
+
+    args = parse_args()
+
+    assert args.no_cache and args.cache_max_mb == 10
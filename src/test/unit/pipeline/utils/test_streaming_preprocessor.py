@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Test Streaming Preprocessor.
+
+Tests the preprocessor fitted from chunks against `get_preprocessor` fitted in memory
+"""
+import numpy
+import pandas
+import pytest
+
+from scipy import sparse
+
+from pipeline.utils import iter_artifact_chunks
+from pipeline.utils.data_transformations import get_preprocessor
+from pipeline.utils.streaming_preprocessor import StreamingPreprocessor
+
+NUMERICAL = ["median_income", "total_bedrooms", "housing_median_age"]
+
+
+def make_frame(n_rows: int, n_categories: int, seed: int = 0) -> pandas.DataFrame:
+    rng = numpy.random.default_rng(seed)
+    frame = pandas.DataFrame(
+        {
+            "median_income": rng.uniform(0.5, 15.0, n_rows),
+            "total_bedrooms": rng.normal(500, 100, n_rows),
+            "housing_median_age": rng.integers(1, 52, n_rows),
+            "ocean_proximity": rng.choice([f"cat_{i}" for i in range(n_categories)], n_rows).astype(object),
+            "id": numpy.arange(n_rows, dtype=float),
+        }
+    )
+    frame.loc[::7, "total_bedrooms"] = numpy.nan
+    frame.loc[::11, "ocean_proximity"] = numpy.nan
+
+    return frame
+
+
+def fit_both(frame: pandas.DataFrame, chunk_size: int):
+    in_memory = get_preprocessor(categorical_columns=["ocean_proximity"], numerical_columns=NUMERICAL)
+    in_memory.set_params(n_jobs=None, verbose=False, numerical__verbose=False, categorical__verbose=False)
+    in_memory.fit(frame)
+
+    chunks = (frame.iloc[start : start + chunk_size] for start in range(0, len(frame), chunk_size))
+    streamed = StreamingPreprocessor(categorical_columns=["ocean_proximity"], numerical_columns=NUMERICAL)
+
+    return in_memory, streamed.fit(chunks=chunks).freeze()
+
+
+@pytest.mark.parametrize("n_categories", [5, 40])
+def test_streamed_matches_in_memory(n_categories):
+    frame = make_frame(n_rows=2_000, n_categories=n_categories)
+    in_memory, frozen = fit_both(frame=frame, chunk_size=300)
+
+    test = make_frame(n_rows=500, n_categories=n_categories + 2, seed=1)
+    expected, output = in_memory.transform(test), frozen.transform(test)
+
+    assert sparse.issparse(output) == sparse.issparse(expected) == (n_categories == 40)
+    if sparse.issparse(output):
+        expected, output = expected.toarray(), output.toarray()
+    numpy.testing.assert_allclose(output, expected, rtol=1e-12, atol=1e-12)
+    assert frozen.get_feature_names_out().tolist() == in_memory.get_feature_names_out().tolist()
+
+
+def test_streamed_from_parquet_chunks(tmp_path):
+    frame = make_frame(n_rows=1_000, n_categories=5)
+    frame.to_parquet(tmp_path / "data.parquet")
+
+    in_memory, _ = fit_both(frame=frame, chunk_size=1_000)
+    streamed = StreamingPreprocessor(categorical_columns=["ocean_proximity"], numerical_columns=NUMERICAL)
+    frozen = streamed.fit(chunks=iter_artifact_chunks(filename=tmp_path / "data.parquet", chunk_size=128)).freeze()
+
+    assert streamed.n_rows == 1_000
+    numpy.testing.assert_allclose(frozen.transform(frame), in_memory.transform(frame), rtol=1e-12, atol=1e-12)
+
+
+def test_freeze_unfitted():
+    with pytest.raises(ValueError):
+        StreamingPreprocessor(categorical_columns=[], numerical_columns=NUMERICAL).freeze()